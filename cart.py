@@ -0,0 +1,165 @@
+"""
+cart.py - Carrito de venta
+Líneas indexadas por id de producto con totales acumulados (en centavos);
+avisa qué línea cambió para que las vistas redibujen solo esa fila
+"""
+
+from money import a_decimal, importes_linea
+
+
+def totales_linea(linea):
+    """(bruto, descuento, subtotal) en centavos de una línea del carrito."""
+    return importes_linea(
+        linea["precio_unitario"], linea["cantidad"], linea["descuento_porcentaje"]
+    )
+
+
+def detalles_venta(lineas):
+    """Filas de detalle para DBManager.register_sale de un dict de líneas."""
+    detalles = []
+    for prod_id, linea in lineas.items():
+        _, descuento, subtotal = totales_linea(linea)
+        detalles.append(
+            (
+                prod_id,
+                linea["nombre"],
+                linea["cantidad"],
+                linea["precio_unitario"],
+                a_decimal(descuento),
+                a_decimal(subtotal),
+            )
+        )
+    return detalles
+
+
+class CartModel:
+    """Carrito de venta compartido por el POS y las ventas mayoristas.
+
+    Se lee como un dict de líneas por id de producto (cart[id], in, len,
+    items(), values()); cada línea es un dict con al menos id, nombre,
+    precio_unitario, cantidad y descuento_porcentaje. Los cambios se hacen
+    con add / update / remove / clear, que ajustan los totales (enteros, en
+    centavos) restando lo que aportaba la línea y sumando su valor nuevo, y
+    llaman a cada listener(evento, prod_id, linea) con evento "add",
+    "update", "remove" o "clear".
+    """
+
+    def __init__(self):
+        self._lines = {}
+        self._aportes = {}  # prod_id -> (bruto, descuento) sumados a los totales
+        self._listeners = []
+        self.bruto_centavos = 0
+        self.descuentos_centavos = 0
+        self.con_descuento = 0
+
+    @property
+    def total_centavos(self):
+        """Total a pagar en centavos (bruto menos descuentos)."""
+        return self.bruto_centavos - self.descuentos_centavos
+
+    @property
+    def total(self):
+        """Total a pagar (Decimal)."""
+        return a_decimal(self.total_centavos)
+
+    @property
+    def descuentos(self):
+        """Descuentos otorgados (Decimal)."""
+        return a_decimal(self.descuentos_centavos)
+
+    def subscribe(self, listener):
+        """Registra listener(evento, prod_id, linea) para cada cambio."""
+        self._listeners.append(listener)
+
+    # -------------------- Lectura (como dict) --------------------
+    def __contains__(self, prod_id):
+        return prod_id in self._lines
+
+    def __getitem__(self, prod_id):
+        return self._lines[prod_id]
+
+    def __iter__(self):
+        return iter(self._lines)
+
+    def __len__(self):
+        return len(self._lines)
+
+    def get(self, prod_id, default=None):
+        return self._lines.get(prod_id, default)
+
+    def items(self):
+        return self._lines.items()
+
+    def values(self):
+        return self._lines.values()
+
+    def snapshot(self):
+        """Copia independiente de las líneas (para recibos y ventas pendientes)."""
+        return {prod_id: dict(linea) for prod_id, linea in self._lines.items()}
+
+    # -------------------- Cambios --------------------
+    def add(self, prod_id, cantidad, **datos):
+        """Suma cantidad unidades; si la línea es nueva la crea con datos."""
+        linea = self._lines.get(prod_id)
+        if linea is None:
+            linea = {"id": prod_id, "descuento_porcentaje": 0.0}
+            linea.update(datos)
+            linea["cantidad"] = cantidad
+            self._lines[prod_id] = linea
+            evento = "add"
+        else:
+            linea.update(datos)
+            linea["cantidad"] += cantidad
+            evento = "update"
+        self._recalcular(prod_id)
+        self._notify(evento, prod_id, linea)
+
+    def update(self, prod_id, **cambios):
+        """Modifica campos de una línea existente (cantidad, descuento...)."""
+        linea = self._lines[prod_id]
+        linea.update(cambios)
+        self._recalcular(prod_id)
+        self._notify("update", prod_id, linea)
+
+    def remove(self, prod_id):
+        """Quita una línea del carrito."""
+        linea = self._lines.pop(prod_id)
+        self._restar(prod_id)
+        self._notify("remove", prod_id, linea)
+
+    def clear(self):
+        """Vacía el carrito."""
+        self._lines.clear()
+        self._aportes.clear()
+        self._reset_totales()
+        self._notify("clear", None, None)
+
+    # -------------------- Totales --------------------
+    def _recalcular(self, prod_id):
+        """Reemplaza en los totales el aporte de una línea por su valor actual."""
+        self._restar(prod_id)
+        bruto, descuento, _ = totales_linea(self._lines[prod_id])
+        self._aportes[prod_id] = (bruto, descuento)
+        self.bruto_centavos += bruto
+        self.descuentos_centavos += descuento
+        if descuento > 0:
+            self.con_descuento += 1
+
+    def _restar(self, prod_id):
+        aporte = self._aportes.pop(prod_id, None)
+        if aporte is None:
+            return
+        bruto, descuento = aporte
+        self.bruto_centavos -= bruto
+        self.descuentos_centavos -= descuento
+        if descuento > 0:
+            self.con_descuento -= 1
+
+    def _reset_totales(self):
+        self.bruto_centavos = 0
+        self.descuentos_centavos = 0
+        self.con_descuento = 0
+
+    def _notify(self, evento, prod_id, linea):
+        for listener in self._listeners:
+            listener(evento, prod_id, linea)
@@ -0,0 +1,214 @@
+"""
+catalog.py - Catálogo de productos en memoria
+Copia compartida de Productos indexada por id, código de barras y prefijos
+del nombre; se recarga cuando cambia el contador productos_version de
+Configuracion
+"""
+
+import re
+import threading
+import time
+import unicodedata
+from bisect import bisect_left
+
+
+def normalizar(texto):
+    """Minúsculas y sin acentos."""
+    texto = str(texto or "").lower()
+    if texto.isascii():
+        return texto
+    texto = unicodedata.normalize("NFKD", texto)
+    return "".join(c for c in texto if not unicodedata.combining(c))
+
+
+def palabras(texto):
+    """Palabras normalizadas de un texto."""
+    return re.findall(r"\w+", normalizar(texto))
+
+
+class Producto:
+    """Registro compacto de un producto del catálogo."""
+
+    __slots__ = (
+        "id",
+        "nombre",
+        "descripcion",
+        "precio",
+        "stock",
+        "proveedor_id",
+        "codigo_barras",
+    )
+
+    def __init__(
+        self, id, nombre, descripcion, precio, stock, proveedor_id, codigo_barras=None
+    ):
+        self.id = id
+        self.nombre = nombre
+        self.descripcion = descripcion
+        self.precio = precio
+        self.stock = stock
+        self.proveedor_id = proveedor_id
+        self.codigo_barras = codigo_barras
+
+    def __repr__(self):
+        return f"Producto({self.id}, {self.nombre!r}, stock={self.stock})"
+
+
+class ProductCatalog:
+    """Catálogo de productos compartido por todas las pantallas.
+
+    Los triggers de la migración 7 incrementan productos_version en cada
+    alta, baja o modificación (incluido el stock). El catálogo compara esa
+    versión antes de responder: de inmediato si este proceso escribió en la
+    base desde la última verificación (db.write_serial) y, si no, como mucho
+    cada MAX_AGE segundos para ver cambios de otras terminales.
+    """
+
+    MAX_AGE = 2.0
+
+    def __init__(self, db):
+        self.db = db
+        self.version = None
+        self._lock = threading.RLock()
+        self._reload_lock = threading.Lock()  # una sola recarga a la vez
+        self._checked_at = 0.0
+        self._checked_serial = None
+        self._by_id = {}
+        self._by_code = {}  # codigo_barras -> producto
+        self._ordered = []  # productos ordenados por nombre
+        self._rank = {}  # id -> posición en _ordered
+        self._tokens = []  # palabras del nombre, ordenadas (búsqueda por prefijo)
+        self._token_ids = {}  # palabra -> ids de productos
+
+    # -------------------- Sincronización --------------------
+    def ensure_fresh(self, force=False):
+        """Recarga el catálogo si la versión en la base cambió.
+
+        Los índices nuevos se arman sin tomar _lock y se reemplazan de una vez:
+        mientras tanto las consultas siguen respondiendo con los anteriores. Si
+        otro hilo ya está recargando no se lo espera, salvo con force o en la
+        primera carga.
+        """
+        with self._lock:
+            now = time.monotonic()
+            if (
+                not force
+                and self.version is not None
+                and self._checked_serial == self.db.write_serial
+                and now - self._checked_at < self.MAX_AGE
+            ):
+                return
+            self._checked_serial = self.db.write_serial
+            self._checked_at = now
+        if not self._reload_lock.acquire(blocking=force or self.version is None):
+            return
+        try:
+            version = self.db.get_config("productos_version", "0")
+            if version == self.version:
+                return
+            indices = self._load()
+            with self._lock:
+                (
+                    self._by_id,
+                    self._by_code,
+                    self._ordered,
+                    self._rank,
+                    self._token_ids,
+                    self._tokens,
+                ) = indices
+                self.version = version
+        finally:
+            self._reload_lock.release()
+
+    def invalidate(self):
+        """Fuerza la verificación de la versión en la próxima consulta."""
+        with self._lock:
+            self._checked_at = 0.0
+
+    def _load(self):
+        """Lee Productos completo y arma índices nuevos (sin tocar los actuales)."""
+        rows = self.db.query(
+            "SELECT id, nombre, descripcion, precio, stock, proveedor_id, codigo_barras"
+            " FROM Productos"
+        )
+        by_id = {row[0]: Producto(*row) for row in rows}
+        by_code = {p.codigo_barras: p for p in by_id.values() if p.codigo_barras}
+        nombres = {p.id: normalizar(p.nombre) for p in by_id.values()}
+        ordered = sorted(by_id.values(), key=lambda p: (nombres[p.id], p.id))
+        token_ids = {}
+        for producto in ordered:
+            for palabra in set(re.findall(r"\w+", nombres[producto.id])):
+                token_ids.setdefault(palabra, []).append(producto.id)
+
+        rank = {p.id: i for i, p in enumerate(ordered)}
+        return by_id, by_code, ordered, rank, token_ids, sorted(token_ids)
+
+    # -------------------- Consultas --------------------
+    def get(self, producto_id):
+        """Producto por id, o None."""
+        self.ensure_fresh()
+        try:
+            producto_id = int(producto_id)
+        except (TypeError, ValueError):
+            return None
+        with self._lock:
+            return self._by_id.get(producto_id)
+
+    def by_code(self, codigo):
+        """Producto con ese código de barras, o None."""
+        codigo = str(codigo or "").strip()
+        if not codigo:
+            return None
+        self.ensure_fresh()
+        with self._lock:
+            return self._by_code.get(codigo)
+
+    def all(self, solo_con_stock=False):
+        """Todos los productos ordenados por nombre."""
+        self.ensure_fresh()
+        with self._lock:
+            if solo_con_stock:
+                return [p for p in self._ordered if p.stock > 0]
+            return list(self._ordered)
+
+    def _ids_with_prefix(self, prefijo):
+        """Ids de productos con alguna palabra que empieza con prefijo (con _lock)."""
+        ids = set()
+        i = bisect_left(self._tokens, prefijo)
+        while i < len(self._tokens) and self._tokens[i].startswith(prefijo):
+            ids.update(self._token_ids[self._tokens[i]])
+            i += 1
+        return ids
+
+    def search(self, texto, limit=None, solo_con_stock=False):
+        """Productos cuyo nombre contiene palabras que empiezan con cada palabra buscada.
+
+        Un término numérico también encuentra el producto con ese id y un
+        código de barras completo, su producto. El resultado se ordena por
+        nombre.
+        """
+        buscadas = palabras(texto)
+        if not buscadas:
+            return self.all(solo_con_stock)[:limit]
+
+        self.ensure_fresh()
+        with self._lock:
+            ids = None
+            for buscada in buscadas:
+                encontrados = self._ids_with_prefix(buscada)
+                ids = encontrados if ids is None else ids & encontrados
+                if not ids:
+                    break
+            ids = ids or set()
+            # isdecimal y no isdigit: int() no acepta dígitos como "²"
+            if texto.strip().isdecimal() and int(texto) in self._by_id:
+                ids.add(int(texto))
+            if texto.strip() in self._by_code:
+                ids.add(self._by_code[texto.strip()].id)
+
+            productos = sorted(
+                (self._by_id[i] for i in ids), key=lambda p: self._rank[p.id]
+            )
+            if solo_con_stock:
+                productos = [p for p in productos if p.stock > 0]
+            return productos[:limit]
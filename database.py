@@ -3,137 +3,173 @@ database.py - Gestor de Base de Datos SQLite
 Maneja todas las operaciones CRUD y estructura de la base de datos
 """
 
+import itertools
+import logging
+import os
+import queue
+import re
+import socket
 import sqlite3
-from tkinter import messagebox
+import threading
+from concurrent.futures import ThreadPoolExecutor
+from contextlib import contextmanager
+
+from catalog import ProductCatalog
+from migrations import INDICES_FTS, MIGRATIONS
+from money import a_centavos, a_decimal
+
+logger = logging.getLogger(__name__)
+
+
+class InsufficientStockError(Exception):
+    """Una venta pide más unidades de las disponibles de uno o más productos.
+
+    faltantes: [(producto_id, nombre, solicitado, disponible), ...]
+    """
+
+    def __init__(self, faltantes):
+        self.faltantes = faltantes
+        detalle = "\n".join(
+            f"- {nombre}: solicitado {solicitado}, disponible {disponible}"
+            for _, nombre, solicitado, disponible in faltantes
+        )
+        super().__init__(f"Stock insuficiente:\n{detalle}")
 
 
 class DBManager:
     """Maneja la conexión a SQLite y operaciones CRUD/Setup."""
 
-    def __init__(self, db_name="erp_profesional.db"):
-        self.conn = sqlite3.connect(db_name)
-        self.cursor = self.conn.cursor()
-        self.create_tables()
+    # Perfil de PRAGMAs por defecto; cada valor puede sobrescribirse con la
+    # clave pragma_<nombre> en la tabla Configuracion.
+    PRAGMA_PROFILE = {
+        "journal_mode": "WAL",
+        "synchronous": "NORMAL",
+        "cache_size": "-20000",  # ~20 MB
+        "mmap_size": "268435456",  # 256 MB
+        "temp_store": "MEMORY",
+        "busy_timeout": "5000",
+    }
 
-    def create_tables(self):
-        """Crea todas las tablas necesarias del sistema."""
+    # Valores simbólicos que SQLite reporta como números
+    PRAGMA_ALIASES = {
+        "synchronous": {"OFF": "0", "NORMAL": "1", "FULL": "2", "EXTRA": "3"},
+        "temp_store": {"DEFAULT": "0", "FILE": "1", "MEMORY": "2"},
+    }
 
-        # Tabla de Clientes
-        self.cursor.execute(
-            """
-            CREATE TABLE IF NOT EXISTS Clientes (
-                id INTEGER PRIMARY KEY AUTOINCREMENT,
-                nombre TEXT NOT NULL,
-                apellido TEXT NOT NULL,
-                dni TEXT UNIQUE,
-                telefono TEXT,
-                email TEXT,
-                direccion TEXT,
-                fecha_registro TEXT NOT NULL,
-                activo INTEGER DEFAULT 1
-            )
-        """
-        )
+    # Unidades de un producto que pueden venderse: stock menos lo reservado
+    # por carritos vigentes de otras cajas. Parámetros: caja, producto_id.
+    STOCK_DISPONIBLE_SQL = """
+        SELECT p.stock - IFNULL((
+            SELECT SUM(r.cantidad) FROM ReservasStock r
+            WHERE r.producto_id = p.id AND r.caja <> ? AND r.expira > datetime('now')
+        ), 0)
+        FROM Productos p WHERE p.id = ?
+    """
 
-        # Tabla de Productos
-        self.cursor.execute(
-            """
-            CREATE TABLE IF NOT EXISTS Productos (
-                id INTEGER PRIMARY KEY AUTOINCREMENT,
-                nombre TEXT NOT NULL,
-                descripcion TEXT,
-                precio REAL NOT NULL,
-                stock INTEGER NOT NULL,
-                proveedor_id INTEGER,
-                FOREIGN KEY (proveedor_id) REFERENCES Proveedores(id)
-            )
-        """
-        )
+    # Segundos que dura la reserva de stock de un carrito si no se configura
+    # reserva_stock_segundos (0 desactiva las reservas)
+    RESERVA_SEGUNDOS = 300
 
-        # Tabla de Proveedores
-        self.cursor.execute(
-            """
-            CREATE TABLE IF NOT EXISTS Proveedores (
-                id INTEGER PRIMARY KEY AUTOINCREMENT,
-                nombre TEXT NOT NULL,
-                contacto TEXT,
-                telefono TEXT
-            )
-        """
-        )
+    # Total vendido en un rango [desde, hasta) de fechas 'YYYY-MM-DD[ HH:MM:SS]'.
+    # Comparar fecha directamente (sin DATE()/strftime) permite usar el índice.
+    VENTAS_RANGO_SQL = (
+        "SELECT SUM(total_centavos) FROM Ventas WHERE fecha >= ? AND fecha < ?"
+    )
 
-        # Tabla de Usuarios
-        self.cursor.execute(
-            """
-            CREATE TABLE IF NOT EXISTS Usuarios (
-                id INTEGER PRIMARY KEY AUTOINCREMENT,
-                nombre TEXT NOT NULL,
-                usuario TEXT UNIQUE NOT NULL,
-                contrasena TEXT NOT NULL,
-                rol TEXT NOT NULL
-            )
-        """
-        )
+    def __init__(
+        self, db_name="erp_profesional.db", max_readers=4, interactive=True
+    ):
+        self.db_name = db_name
+        # Sin interfaz (línea de comandos) los errores de fetch()/execute()
+        # siempre se propagan en vez de mostrarse en un messagebox
+        self.interactive = interactive
 
-        # Tabla de Descuentos
-        self.cursor.execute(
-            """
-            CREATE TABLE IF NOT EXISTS Descuentos (
-                id INTEGER PRIMARY KEY AUTOINCREMENT,
-                nombre TEXT NOT NULL,
-                tipo TEXT,
-                porcentaje REAL NOT NULL
-            )
-        """
+        # Conexión de escritura única, compartida entre hilos y serializada
+        # con _write_lock. isolation_level=None: las transacciones se
+        # controlan con transaction().
+        self.conn = sqlite3.connect(
+            db_name, isolation_level=None, check_same_thread=False
         )
+        self.cursor = self.conn.cursor()
+        self._write_lock = threading.RLock()
+        self._tx_depth = 0
+        self._tx_owner = None
+        # Aumenta con cada escritura confirmada desde este proceso
+        self.write_serial = 0
 
-        # Tabla de Configuración
-        self.cursor.execute(
-            """
-            CREATE TABLE IF NOT EXISTS Configuracion (
-                clave TEXT PRIMARY KEY,
-                valor TEXT
-            )
-        """
-        )
+        # Conexiones de solo lectura, creadas a demanda hasta max_readers
+        self.max_readers = max_readers
+        self._readers = queue.LifoQueue()
+        self._reader_slots = threading.BoundedSemaphore(max_readers)
+        self._all_readers = []
+        self._readers_lock = threading.Lock()
 
-        # Tabla de Ventas
-        self.cursor.execute(
-            """
-            CREATE TABLE IF NOT EXISTS Ventas (
-                id TEXT PRIMARY KEY,
-                fecha TEXT NOT NULL,
-                total REAL NOT NULL,
-                monto_pagado REAL,
-                vuelto REAL,
-                usuario_id INTEGER,
-                id_cliente INTEGER,
-                tipo_recibo TEXT,
-                FOREIGN KEY (id_cliente) REFERENCES Clientes(id)
-            )
-        """
-        )
+        # Consultas en segundo plano (run_async): los resultados se encolan y
+        # el hilo de Tk los entrega con process_async_results().
+        self._executor = None
+        self._async_results = queue.SimpleQueue()
+        # key -> número del trabajo vigente; la entrada se borra al entregar
+        # su resultado o al cancelarlo, así no crece con keys de un solo uso
+        self._async_generation = {}
+        self._async_numbers = itertools.count(1)
+        self._async_conns = {}
+        self._async_lock = threading.Lock()
+        self._local = threading.local()
 
-        # Tabla de Detalle de Venta
-        self.cursor.execute(
-            """
-            CREATE TABLE IF NOT EXISTS DetalleVenta (
-                id INTEGER PRIMARY KEY AUTOINCREMENT,
-                venta_id TEXT,
-                producto_id INTEGER,
-                nombre_producto TEXT,
-                cantidad INTEGER,
-                precio_unitario REAL,
-                descuento REAL DEFAULT 0,
-                subtotal REAL,
-                FOREIGN KEY (venta_id) REFERENCES Ventas(id)
-            )
-        """
-        )
+        self.pragma_profile = dict(self.PRAGMA_PROFILE)
+        self.apply_pragmas(self.pragma_profile)
+        self.create_tables()
+
+        # Perfil definitivo: el guardado en Configuracion
+        profile = self.load_pragma_profile()
+        if profile != self.pragma_profile:
+            self.pragma_profile = profile
+            self.apply_pragmas(profile)
+            self.reset_readers()
+
+        # Catálogo de productos en memoria, compartido por las pantallas
+        self.catalog = ProductCatalog(self)
+        self._sale_prefixes = {}  # caja -> prefijo de facturación
 
-        self.conn.commit()
+    def create_tables(self):
+        """Crea o actualiza el esquema aplicando las migraciones pendientes."""
+        self.migrate()
+        self.fts_unavailable = self.ensure_fts_indexes()
         self.insert_initial_data()
 
+    def schema_version(self):
+        """Versión de esquema aplicada (PRAGMA user_version)."""
+        return self.conn.execute("PRAGMA user_version").fetchone()[0]
+
+    def migrate(self):
+        """Aplica, en orden y una sola vez, las migraciones pendientes."""
+        version = self.schema_version()
+        for numero, descripcion, pasos in MIGRATIONS:
+            if numero <= version:
+                continue
+            with self.transaction():
+                for paso in pasos:
+                    if callable(paso):
+                        paso(self)
+                    else:
+                        self.cursor.execute(paso)
+                self.cursor.execute(f"PRAGMA user_version = {int(numero)}")
+            logger.info("Migración %s aplicada: %s", numero, descripcion)
+
+    def ensure_fts_indexes(self):
+        """Crea los índices FTS5 que falten (migración aplicada sin FTS5).
+
+        Retorna las tablas que siguen sin índice y buscan con LIKE.
+        """
+        sin_fts = []
+        for tabla, crear in INDICES_FTS.items():
+            if self.table_exists(f"{tabla}FTS"):
+                continue
+            with self.transaction():
+                if not crear(self):
+                    sin_fts.append(tabla)
+        return sin_fts
+
     def insert_initial_data(self):
         """Inserta datos iniciales si las tablas están vacías."""
 
@@ -168,6 +204,14 @@ class DBManager:
         ):
             self.set_config("recibo_template", self.default_receipt_template())
 
+        # Perfil de PRAGMAs editable
+        with self.transaction():
+            for nombre, valor in self.PRAGMA_PROFILE.items():
+                self.execute(
+                    "INSERT OR IGNORE INTO Configuracion (clave, valor) VALUES (?, ?)",
+                    (f"pragma_{nombre}", valor),
+                )
+
         # Productos de ejemplo
         if not self.fetch("SELECT * FROM Productos"):
             productos_ejemplo = [
@@ -176,11 +220,11 @@ class DBManager:
                 ("Mouse Gamer", "RGB, 16000 DPI", 35.00, 50, 1),
                 ("Laptop HP", "i5, 8GB RAM, 256GB SSD", 650.00, 8, 1),
             ]
-            self.cursor.executemany(
-                "INSERT INTO Productos (nombre, descripcion, precio, stock, proveedor_id) VALUES (?, ?, ?, ?, ?)",
-                productos_ejemplo,
-            )
-            self.conn.commit()
+            with self.transaction():
+                self.cursor.executemany(
+                    "INSERT INTO Productos (nombre, descripcion, precio, stock, proveedor_id) VALUES (?, ?, ?, ?, ?)",
+                    productos_ejemplo,
+                )
 
         # Clientes de ejemplo
         if not self.fetch("SELECT * FROM Clientes"):
@@ -230,11 +274,11 @@ class DBManager:
                     1,
                 ),
             ]
-            self.cursor.executemany(
-                "INSERT INTO Clientes (nombre, apellido, dni, telefono, email, direccion, fecha_registro, activo) VALUES (?, ?, ?, ?, ?, ?, ?, ?)",
-                clientes_ejemplo,
-            )
-            self.conn.commit()
+            with self.transaction():
+                self.cursor.executemany(
+                    "INSERT INTO Clientes (nombre, apellido, dni, telefono, email, direccion, fecha_registro, activo) VALUES (?, ?, ?, ?, ?, ?, ?, ?)",
+                    clientes_ejemplo,
+                )
 
     def default_receipt_template(self):
         """Plantilla HTML por defecto para recibos."""
@@ -295,25 +339,615 @@ class DBManager:
             (clave, valor),
         )
 
+    def load_pragma_profile(self):
+        """Lee el perfil de PRAGMAs guardado en Configuracion."""
+        profile = dict(self.PRAGMA_PROFILE)
+        for nombre in profile:
+            valor = self.get_config(f"pragma_{nombre}")
+            if valor:
+                profile[nombre] = valor.strip()
+        return profile
+
+    def apply_pragmas(self, profile, conn=None):
+        """Aplica un perfil de PRAGMAs a la conexión (por defecto la de escritura)."""
+        conn = conn or self.conn
+        for nombre, valor in profile.items():
+            # Los PRAGMA no admiten parámetros: solo se aceptan valores simples
+            if nombre not in self.PRAGMA_PROFILE or not re.fullmatch(
+                r"-?\w+", valor
+            ):
+                logger.warning("PRAGMA ignorado: %s = %r", nombre, valor)
+                continue
+            conn.execute(f"PRAGMA {nombre} = {valor}").fetchall()
+
+    def check_pragmas(self):
+        """Compara el perfil solicitado con los valores efectivos de la conexión.
+
+        Retorna una lista de (nombre, solicitado, efectivo, coincide).
+        """
+        report = []
+        for nombre, solicitado in self.pragma_profile.items():
+            efectivo = str(self.conn.execute(f"PRAGMA {nombre}").fetchone()[0])
+            esperado = self.PRAGMA_ALIASES.get(nombre, {}).get(
+                solicitado.upper(), solicitado
+            )
+            report.append(
+                (nombre, solicitado, efectivo, efectivo.lower() == esperado.lower())
+            )
+        return report
+
+    def explain(self, query, params=()):
+        """Retorna los pasos de EXPLAIN QUERY PLAN de una consulta."""
+        return [row[3] for row in self.query(f"EXPLAIN QUERY PLAN {query}", params)]
+
+    def table_exists(self, nombre):
+        """Indica si existe una tabla (o tabla virtual) en el esquema."""
+        return bool(
+            self.query(
+                "SELECT 1 FROM sqlite_master WHERE type = 'table' AND name = ?",
+                (nombre,),
+            )
+        )
+
+    @staticmethod
+    def fts_query(texto):
+        """Convierte lo escrito por el usuario en una expresión MATCH de FTS5.
+
+        Cada palabra se busca como prefijo y todas deben aparecer. Las palabras
+        van entre comillas para que los operadores de FTS5 (OR, NOT, *, ...)
+        se traten como texto. Retorna None si no hay nada que buscar.
+        """
+        palabras = [p.replace('"', '""') for p in texto.split()]
+        return " ".join(f'"{p}"*' for p in palabras) or None
+
+    def _product_search(self, texto):
+        """Arma FROM/WHERE/ORDER BY y parámetros de la búsqueda de productos."""
+        match = self.fts_query(texto)
+        if not match:
+            return "FROM Productos p", "ORDER BY p.id DESC", ()
+        if self.table_exists("ProductosFTS"):
+            # CROSS JOIN: primero el índice FTS, luego Productos por id
+            return (
+                "FROM ProductosFTS f CROSS JOIN Productos p ON p.id = f.rowid"
+                " WHERE ProductosFTS MATCH ?",
+                "ORDER BY f.rank",
+                (match,),
+            )
+        patron = f"%{texto.strip()}%"
+        return (
+            "FROM Productos p WHERE p.nombre LIKE ? OR p.descripcion LIKE ?",
+            "ORDER BY p.nombre",
+            (patron, patron),
+        )
+
+    def search_products(self, texto="", limit=100, offset=0):
+        """Busca productos por nombre o descripción, paginado en SQL.
+
+        Retorna filas (id, nombre, precio, stock, proveedor_id). Sin texto
+        lista los más recientes primero; con texto usa el índice FTS5 (ordenado
+        por relevancia) o LIKE si no existe.
+        """
+        origen, orden, params = self._product_search(texto)
+        return self.query(
+            "SELECT p.id, p.nombre, p.precio, p.stock, p.proveedor_id "
+            f"{origen} {orden} LIMIT ? OFFSET ?",
+            params + (limit, offset),
+        )
+
+    def count_products(self, texto=""):
+        """Cantidad de productos que encuentra search_products(texto)."""
+        origen, _, params = self._product_search(texto)
+        return self.query(f"SELECT COUNT(*) {origen}", params)[0][0]
+
+    def sales_total_between(self, desde, hasta):
+        """Total vendido (Decimal) con fecha en [desde, hasta)."""
+        return a_decimal(self.query(self.VENTAS_RANGO_SQL, (desde, hasta))[0][0] or 0)
+
+    @contextmanager
+    def transaction(self):
+        """Agrupa varias escrituras en una unidad de trabajo con un solo commit.
+
+        Dentro del bloque execute() no confirma cada sentencia y los errores se
+        propagan; si ocurre una excepción se revierte todo el bloque. Las
+        transacciones anidadas se implementan con SAVEPOINT. Mientras dure,
+        las escrituras de otros hilos esperan su turno.
+        """
+        with self._write_lock:
+            savepoint = f"sp_{self._tx_depth}"
+            if self._tx_depth == 0:
+                self.conn.execute("BEGIN")
+                self._tx_owner = threading.get_ident()
+            else:
+                self.conn.execute(f"SAVEPOINT {savepoint}")
+            self._tx_depth += 1
+
+            try:
+                yield self
+            except BaseException:
+                self._tx_depth -= 1
+                if self._tx_depth == 0:
+                    self._tx_owner = None
+                    self.conn.execute("ROLLBACK")
+                else:
+                    self.conn.execute(f"ROLLBACK TO {savepoint}")
+                    self.conn.execute(f"RELEASE {savepoint}")
+                raise
+
+            self._tx_depth -= 1
+            if self._tx_depth == 0:
+                self._tx_owner = None
+                self.conn.execute("COMMIT")
+                self.write_serial += 1
+            else:
+                self.conn.execute(f"RELEASE {savepoint}")
+
+    def in_transaction(self):
+        """Indica si el hilo actual tiene una transacción abierta."""
+        return self._tx_owner == threading.get_ident()
+
+    def register_sale(self, venta, detalles, caja=None, reservas=None):
+        """Registra cabecera, detalle y descuento de stock de una venta en una sola transacción.
+
+        venta: (id, fecha, total, monto_pagado, vuelto, usuario_id, id_cliente, tipo_recibo)
+        detalles: [(producto_id, nombre_producto, cantidad, precio_unitario, descuento, subtotal), ...]
+
+        La venta se registra a nombre de caja (por defecto terminal_name()):
+        con id None se asigna el siguiente número de factura de esa caja
+        dentro de la misma transacción y si la venta falla, el número no se
+        consume. Retorna el id con que quedó registrada. Los importes
+        (Decimal, float o str) se guardan en centavos y, como copia, en las
+        columnas REAL.
+
+        El stock se descuenta solo si alcanza, sin contar lo reservado por
+        otros carritos; reservas es el carrito que vende (por defecto caja,
+        ver reserve_stock) y sus reservas de estos productos se liberan. Si
+        falta stock en alguna línea no se registra nada y se lanza
+        InsufficientStockError con todas las líneas que fallaron. Una cantidad
+        que no es un entero positivo lanza ValueError antes de escribir nada.
+        """
+        venta_id, fecha, total, pagado, vuelto, usuario_id, id_cliente, tipo = venta
+        solicitado = {}
+        for detalle in detalles:
+            producto_id, nombre, cantidad = detalle[:3]
+            self.check_quantity(cantidad, nombre)
+            anterior = solicitado.get(producto_id, (nombre, 0))[1]
+            solicitado[producto_id] = (nombre, anterior + cantidad)
+        caja = caja or self.terminal_name()
+        reservas = reservas or caja
+        prefijo = self.sale_prefix(caja) if venta_id is None else None
+        importes = [a_centavos(total), a_centavos(pagado), a_centavos(vuelto)]
+        filas_detalle = []
+        for producto_id, nombre, cantidad, precio, descuento, subtotal in detalles:
+            centavos = [a_centavos(precio), a_centavos(descuento), a_centavos(subtotal)]
+            filas_detalle.append(
+                (producto_id, nombre, cantidad)
+                + tuple(c / 100 for c in centavos)
+                + tuple(centavos)
+            )
+        with self.transaction():
+            self._take_stock(solicitado, reservas)
+            if venta_id is None:
+                venta_id = self.format_sale_id(
+                    prefijo, self._allocate_sale_number(prefijo)
+                )
+            self.cursor.execute(
+                "INSERT INTO Ventas (id, fecha, total, monto_pagado, vuelto, usuario_id, id_cliente, tipo_recibo, total_centavos, pagado_centavos, vuelto_centavos) VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?)",
+                (venta_id, fecha)
+                + tuple(c / 100 for c in importes)
+                + (usuario_id, id_cliente, tipo)
+                + tuple(importes),
+            )
+            self.cursor.executemany(
+                "INSERT INTO DetalleVenta (venta_id, producto_id, nombre_producto, cantidad, precio_unitario, descuento, subtotal, precio_centavos, descuento_centavos, subtotal_centavos) VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?)",
+                [(venta_id,) + fila for fila in filas_detalle],
+            )
+            # Lo vendido ya no necesita reserva
+            self.cursor.executemany(
+                "DELETE FROM ReservasStock WHERE producto_id = ? AND caja = ?",
+                [(producto_id, reservas) for producto_id in solicitado],
+            )
+        return venta_id
+
+    @staticmethod
+    def check_quantity(cantidad, producto=None):
+        """Lanza ValueError si cantidad no es un entero mayor que 0.
+
+        Una cantidad negativa sumaría stock en vez de descontarlo.
+        """
+        if isinstance(cantidad, bool) or not isinstance(cantidad, int) or cantidad <= 0:
+            detalle = f" de {producto}" if producto is not None else ""
+            raise ValueError(
+                f"Cantidad inválida{detalle}: {cantidad!r} "
+                "(debe ser un entero mayor que 0)"
+            )
+
+    def _take_stock(self, solicitado, caja):
+        """Descuenta el stock de cada producto si alcanza (dentro de transaction()).
+
+        solicitado: {producto_id: (nombre, cantidad)}. El UPDATE condicional
+        verifica y descuenta en un solo paso, sin bloquear otras filas.
+        """
+        faltantes = []
+        for producto_id, (nombre, cantidad) in solicitado.items():
+            actualizado = self.cursor.execute(
+                """
+                UPDATE Productos SET stock = stock - ?
+                WHERE id = ? AND stock - IFNULL((
+                    SELECT SUM(r.cantidad) FROM ReservasStock r
+                    WHERE r.producto_id = Productos.id AND r.caja <> ?
+                      AND r.expira > datetime('now')
+                ), 0) >= ?
+                """,
+                (cantidad, producto_id, caja, cantidad),
+            ).rowcount
+            if not actualizado:
+                fila = self.cursor.execute(
+                    self.STOCK_DISPONIBLE_SQL, (caja, producto_id)
+                ).fetchone()
+                faltantes.append(
+                    (producto_id, nombre, cantidad, max(0, fila[0]) if fila else 0)
+                )
+        if faltantes:
+            # El catálogo en memoria pudo mostrar un stock ya vendido en otra caja
+            self.catalog.invalidate()
+            raise InsufficientStockError(faltantes)
+
+    def reservation_seconds(self):
+        """Duración de las reservas de stock (reserva_stock_segundos; 0 = sin reservas)."""
+        try:
+            return int(self.get_config("reserva_stock_segundos", self.RESERVA_SEGUNDOS))
+        except (TypeError, ValueError):
+            return self.RESERVA_SEGUNDOS
+
+    def reserve_stock(self, producto_id, cantidad, caja=None):
+        """Reserva para un carrito cantidad unidades (el total de la línea).
+
+        caja identifica el carrito (por defecto terminal_name()); cada
+        pantalla de venta usa la suya para no pisar las reservas de la otra
+        en el mismo equipo. Retorna (True, disponible) si alcanzó o (False, disponible) si no; en
+        ese caso la reserva anterior de la caja queda como estaba. Con las
+        reservas desactivadas retorna (True, None) sin escribir nada. Una
+        cantidad que no es un entero positivo lanza ValueError.
+        """
+        self.check_quantity(cantidad, producto_id)
+        segundos = self.reservation_seconds()
+        if segundos <= 0:
+            return True, None
+        caja = caja or self.terminal_name()
+        with self.transaction():
+            # Escribir primero (limpieza de vencidas) toma el bloqueo de
+            # escritura: la verificación y la reserva no se intercalan con otra caja
+            self.cursor.execute(
+                "DELETE FROM ReservasStock WHERE expira <= datetime('now')"
+            )
+            fila = self.cursor.execute(
+                self.STOCK_DISPONIBLE_SQL, (caja, producto_id)
+            ).fetchone()
+            disponible = max(0, fila[0]) if fila else 0
+            if cantidad > disponible:
+                return False, disponible
+            self.cursor.execute(
+                """
+                INSERT INTO ReservasStock (producto_id, caja, cantidad, expira)
+                VALUES (?, ?, ?, datetime('now', ?))
+                ON CONFLICT(producto_id, caja) DO UPDATE SET
+                    cantidad = excluded.cantidad, expira = excluded.expira
+                """,
+                (producto_id, caja, cantidad, f"+{segundos} seconds"),
+            )
+        return True, disponible
+
+    def release_stock(self, producto_id=None, caja=None):
+        """Libera la reserva de un carrito para un producto, o todas si es None."""
+        if self.reservation_seconds() <= 0:
+            return
+        caja = caja or self.terminal_name()
+        if producto_id is None:
+            self.execute("DELETE FROM ReservasStock WHERE caja = ?", (caja,))
+        else:
+            self.execute(
+                "DELETE FROM ReservasStock WHERE producto_id = ? AND caja = ?",
+                (producto_id, caja),
+            )
+
+    # -------------------- Numeración de ventas --------------------
+    @staticmethod
+    def terminal_name():
+        """Nombre de esta caja: ERP_TERMINAL o, si no está definida, el del equipo."""
+        return os.environ.get("ERP_TERMINAL") or socket.gethostname() or "caja"
+
+    def sale_prefix(self, caja=None):
+        """Prefijo de facturación de una caja, por defecto esta (C001, C002...).
+
+        La primera vez que una caja vende se le asigna el siguiente prefijo
+        libre, que queda en Configuracion como caja_prefijo:<terminal>. Puede
+        cambiarse ahí por el prefijo fiscal de cada punto de emisión.
+        """
+        caja = caja or self.terminal_name()
+        if caja not in self._sale_prefixes:
+            clave = f"caja_prefijo:{caja}"
+            with self.transaction():
+                # Una sola sentencia: dos cajas nuevas no toman el mismo prefijo
+                self.cursor.execute(
+                    """
+                    INSERT OR IGNORE INTO Configuracion (clave, valor)
+                    SELECT ?, printf('C%03d', COUNT(*) + 1) FROM Configuracion
+                    WHERE clave LIKE 'caja_prefijo:%'
+                    """,
+                    (clave,),
+                )
+                self._sale_prefixes[caja] = self.query(
+                    "SELECT valor FROM Configuracion WHERE clave = ?", (clave,)
+                )[0][0]
+        return self._sale_prefixes[caja]
+
+    @staticmethod
+    def format_sale_id(prefijo, numero):
+        """Número de factura: prefijo de la caja y correlativo de 8 dígitos."""
+        return f"{prefijo}-{numero:08d}"
+
+    def _allocate_sale_number(self, prefijo):
+        """Toma el siguiente correlativo del prefijo (dentro de transaction())."""
+        # Escribir antes de leer: la transacción toma el bloqueo de escritura
+        # de inmediato y ninguna otra caja puede leer el mismo valor
+        self.cursor.execute(
+            """
+            INSERT INTO SecuenciasFactura (prefijo, ultimo) VALUES (?, 1)
+            ON CONFLICT(prefijo) DO UPDATE SET ultimo = ultimo + 1
+            """,
+            (prefijo,),
+        )
+        return self.cursor.execute(
+            "SELECT ultimo FROM SecuenciasFactura WHERE prefijo = ?", (prefijo,)
+        ).fetchone()[0]
+
+    def peek_sale_id(self):
+        """Número que recibirá la próxima venta de esta caja (vistas previas)."""
+        prefijo = self.sale_prefix()
+        row = self.query(
+            "SELECT ultimo FROM SecuenciasFactura WHERE prefijo = ?", (prefijo,)
+        )
+        return self.format_sale_id(prefijo, (row[0][0] if row else 0) + 1)
+
+    def _open_reader(self):
+        """Abre una conexión de solo lectura con el perfil de PRAGMAs vigente."""
+        conn = sqlite3.connect(
+            self.db_name, isolation_level=None, check_same_thread=False
+        )
+        self.apply_pragmas(
+            {k: v for k, v in self.pragma_profile.items() if k != "journal_mode"},
+            conn,
+        )
+        conn.execute("PRAGMA query_only = 1")
+        with self._readers_lock:
+            self._all_readers.append(conn)
+        return conn
+
+    @contextmanager
+    def reader(self):
+        """Presta una conexión de lectura del pool; espera si están todas en uso."""
+        self._reader_slots.acquire()
+        try:
+            try:
+                conn = self._readers.get_nowait()
+            except queue.Empty:
+                conn = self._open_reader()
+            # Si es una consulta en segundo plano, registrar la conexión para
+            # poder interrumpirla al cancelar
+            job = getattr(self._local, "job", None)
+            if job:
+                with self._async_lock:
+                    self._async_conns[job] = conn
+            try:
+                yield conn
+            finally:
+                if job:
+                    with self._async_lock:
+                        self._async_conns.pop(job, None)
+                self._readers.put(conn)
+        finally:
+            self._reader_slots.release()
+
+    def reset_readers(self):
+        """Cierra las conexiones de lectura libres; se reabren a demanda."""
+        while True:
+            try:
+                conn = self._readers.get_nowait()
+            except queue.Empty:
+                break
+            with self._readers_lock:
+                self._all_readers.remove(conn)
+            conn.close()
+
+    def query(self, query, params=()):
+        """Ejecuta un SELECT y retorna las filas; los errores se propagan.
+
+        Dentro de una transacción del hilo actual usa la conexión de escritura
+        (para ver sus cambios sin confirmar); si no, una conexión de lectura.
+        """
+        if self.in_transaction():
+            with self._write_lock:
+                return self.conn.execute(query, params).fetchall()
+        with self.reader() as conn:
+            return conn.execute(query, params).fetchall()
+
+    def iter_query(self, query, params=(), block_size=1000):
+        """Recorre un SELECT en listas de hasta block_size filas (fetchmany).
+
+        La conexión de lectura queda prestada hasta terminar de recorrer, así
+        que las tablas grandes no se cargan enteras en memoria.
+        """
+        with self.reader() as conn:
+            cursor = conn.execute(query, params)
+            while True:
+                filas = cursor.fetchmany(block_size)
+                if not filas:
+                    return
+                yield filas
+
     def fetch(self, query, params=()):
         """Ejecuta una consulta SELECT y retorna los resultados."""
         try:
-            self.cursor.execute(query, params)
-            return self.cursor.fetchall()
+            return self.query(query, params)
         except sqlite3.Error as e:
-            messagebox.showerror("Error de DB", f"Error en consulta: {e}")
+            if not self._can_show_errors():
+                raise
+            self._show_error("Error de DB", f"Error en consulta: {e}")
             return []
 
     def execute(self, query, params=()):
-        """Ejecuta una consulta INSERT/UPDATE/DELETE."""
+        """Ejecuta una consulta INSERT/UPDATE/DELETE.
+
+        Fuera de transaction() cada sentencia se confirma automáticamente.
+        """
         try:
-            self.cursor.execute(query, params)
-            self.conn.commit()
-            return self.cursor.lastrowid
+            with self._write_lock:
+                lastrowid = self.conn.execute(query, params).lastrowid
+                if not self.in_transaction():
+                    self.write_serial += 1
+                return lastrowid
         except sqlite3.Error as e:
-            messagebox.showerror("Error de DB", f"Error en operación: {e}")
+            if not self._can_show_errors():
+                raise
+            self._show_error("Error de DB", f"Error en operación: {e}")
             return None
 
+    def run_async(self, func, callback=None, key=None, owner=None, errback=None):
+        """Ejecuta func() en un hilo de fondo y entrega el resultado al hilo de Tk.
+
+        callback(resultado) o errback(excepcion) se invocan desde
+        process_async_results(). Un trabajo nuevo con la misma key reemplaza al
+        anterior: si aún corre se interrumpe y su resultado se descarta. Si se
+        indica owner (un widget) y ya fue destruido, el resultado se descarta.
+        """
+        with self._async_lock:
+            generation = next(self._async_numbers)
+            self._async_generation[key] = generation
+            self._interrupt_superseded(key, generation)
+            if self._executor is None:
+                self._executor = ThreadPoolExecutor(
+                    max_workers=self.max_readers, thread_name_prefix="db-async"
+                )
+        job = (key, generation)
+        return self._executor.submit(
+            self._run_job, job, func, callback, owner, errback
+        )
+
+    def report_progress(self, callback, valor):
+        """Entrega callback(valor) en el hilo de Tk desde un trabajo de run_async.
+
+        Los avisos de un trabajo reemplazado o cancelado se descartan. Fuera
+        de run_async (hilo de Tk o uso sin interfaz) se llama directamente.
+        """
+        job = getattr(self._local, "job", None)
+        if job is None:
+            callback(valor)
+            return
+        self._async_results.put((job, valor, None, callback, None, None, False))
+
+    def fetch_async(
+        self, query, params=(), callback=None, key=None, owner=None, errback=None
+    ):
+        """Versión en segundo plano de fetch(); callback recibe las filas."""
+        return self.run_async(
+            lambda: self.query(query, params), callback, key, owner, errback
+        )
+
+    def cancel_async(self, key):
+        """Cancela el trabajo pendiente o en curso asociado a key."""
+        with self._async_lock:
+            self._async_generation.pop(key, None)
+            self._interrupt_superseded(key, next(self._async_numbers))
+
+    def _interrupt_superseded(self, key, generation):
+        """Interrumpe las consultas en curso de generaciones anteriores (con _async_lock)."""
+        for (job_key, job_generation), conn in self._async_conns.items():
+            if job_key == key and job_generation < generation:
+                conn.interrupt()
+
+    def _is_current(self, job):
+        """Indica si el trabajo no fue reemplazado ni cancelado."""
+        key, generation = job
+        return self._async_generation.get(key) == generation
+
+    def _finish_job(self, job):
+        """Olvida la key de un trabajo terminado si nadie la reutilizó."""
+        key, generation = job
+        with self._async_lock:
+            if self._async_generation.get(key) == generation:
+                del self._async_generation[key]
+
+    def _run_job(self, job, func, callback, owner, errback):
+        """Cuerpo de un trabajo en segundo plano (hilo del executor)."""
+        if not self._is_current(job):
+            return
+        self._local.job = job
+        try:
+            result, error = func(), None
+        except Exception as e:
+            result, error = None, e
+        finally:
+            self._local.job = None
+        self._async_results.put((job, result, error, callback, owner, errback, True))
+
+    def process_async_results(self):
+        """Entrega los resultados de fondo terminados; llamar desde el hilo de Tk."""
+        while True:
+            try:
+                job, result, error, callback, owner, errback, final = (
+                    self._async_results.get_nowait()
+                )
+            except queue.Empty:
+                return
+            if not self._is_current(job):
+                continue
+            if final:
+                self._finish_job(job)
+            if owner is not None and not owner.winfo_exists():
+                continue
+            if error is None:
+                if callback:
+                    callback(result)
+            elif errback:
+                errback(error)
+            else:
+                self._show_error("Error de DB", f"Error en consulta: {error}")
+
+    @staticmethod
+    def _is_main_thread():
+        """Los messagebox solo pueden mostrarse desde el hilo de Tk."""
+        return threading.current_thread() is threading.main_thread()
+
+    def _can_show_errors(self):
+        """Indica si un error de fetch()/execute() se muestra en vez de propagarse."""
+        return self.interactive and not self.in_transaction() and self._is_main_thread()
+
+    @staticmethod
+    def _show_error(titulo, mensaje):
+        # tkinter se importa recién aquí: la línea de comandos no lo carga
+        from tkinter import messagebox
+
+        messagebox.showerror(titulo, mensaje)
+
+    def backup(self, destino):
+        """Copia consistente de la base a destino, sin detener a los demás usuarios."""
+        with self.reader() as conn:
+            copia = sqlite3.connect(destino)
+            try:
+                conn.backup(copia)
+            finally:
+                copia.close()
+
     def close(self):
-        """Cierra la conexión a la base de datos."""
-        self.conn.close()
+        """Cierra todas las conexiones a la base de datos."""
+        if self._executor is not None:
+            self._executor.shutdown(wait=False, cancel_futures=True)
+        with self._async_lock:
+            for conn in self._async_conns.values():
+                conn.interrupt()
+        with self._readers_lock:
+            for conn in self._all_readers:
+                conn.close()
+            self._all_readers.clear()
+        with self._write_lock:
+            self.conn.close()
@@ -0,0 +1,265 @@
+"""
+erp.py - Línea de comandos del ERP
+Importaciones, exportaciones, reportes, respaldos y ventas sin abrir la
+interfaz ni cargar tkinter, para tareas programadas (cron) y servidores sin
+pantalla:
+
+    python -m erp exportar Ventas ventas.csv.gz
+    python -m erp importar-clientes clientes.csv
+    python -m erp importar-productos catalogo.csv --validar
+    python -m erp reporte --desde 2025-10-01 --hasta 2025-11-01
+    python -m erp respaldo respaldo.db
+    python -m erp venta 7501031311309:2 15 --pagado 100
+"""
+
+import argparse
+import logging
+import sys
+from datetime import date, datetime, timedelta
+from decimal import InvalidOperation
+
+from cart import CartModel, detalles_venta
+from database import DBManager
+from file_manager import FileManager
+from money import a_centavos, a_decimal
+
+
+class ProgressPrinter:
+    """Avance de una importación o exportación en la terminal (stderr).
+
+    En cron, sin terminal, no imprime nada. done() termina la línea antes de
+    mostrar el resultado.
+    """
+
+    def __init__(self, unidad):
+        self.unidad = unidad
+        self.en_linea = False
+
+    def __call__(self, valor):
+        if not sys.stderr.isatty():
+            return
+        if isinstance(valor, tuple):  # (filas, segundos) de export_table
+            valor = valor[0]
+        texto = f"{valor:.0%}" if isinstance(valor, float) else f"{valor:,}"
+        print(f"\r{texto} {self.unidad}", end="", file=sys.stderr, flush=True)
+        self.en_linea = True
+
+    def done(self):
+        if self.en_linea:
+            print(file=sys.stderr)
+            self.en_linea = False
+
+
+def cmd_migrar(db, fm, args):
+    """Las migraciones se aplican al abrir la base; solo informa la versión."""
+    print(f"Esquema en la versión {db.schema_version()}")
+
+
+def cmd_importar_clientes(db, fm, args):
+    progreso = ProgressPrinter("filas")
+    resumen = fm.import_clients(args.archivo, progreso)
+    progreso.done()
+    print(
+        f"Clientes nuevos: {resumen['insertados']:,}, "
+        f"actualizados: {resumen['actualizados']:,}, "
+        f"rechazados: {resumen['rechazados']:,}"
+    )
+
+
+def cmd_importar_productos(db, fm, args):
+    progreso = ProgressPrinter("leído")
+    if not args.validar:
+        resumen = fm.import_products_file(args.archivo, progress=progreso)
+        progreso.done()
+        print(
+            f"Productos importados: {resumen['importados']:,}, "
+            f"omitidos: {resumen['rechazados']:,}"
+        )
+        return 0
+
+    resumen = fm.scan_products(args.archivo, progreso, sample_size=0)
+    progreso.done()
+    print(f"Filas válidas: {resumen['validas']:,}")
+    for motivo, (cantidad, lineas) in resumen["errores"].items():
+        print(f"- {motivo}: {cantidad:,} (líneas {', '.join(map(str, lineas))})")
+    return 1 if resumen["errores"] else 0
+
+
+def cmd_exportar(db, fm, args):
+    progreso = ProgressPrinter("filas")
+    filas, segundos = fm.export_table(args.tabla, args.archivo, progreso)
+    progreso.done()
+    print(
+        f"{filas:,} filas exportadas a {args.archivo} en {segundos:.2f} s "
+        f"({fm.export_rate(filas, segundos)})"
+    )
+
+
+def cmd_reporte(db, fm, args):
+    desde = args.desde or date.today()
+    hasta = args.hasta or desde + timedelta(days=1)
+    dias = db.query(
+        "SELECT dia, cantidad, total_centavos FROM VentasDiarias "
+        "WHERE dia >= ? AND dia < ? ORDER BY dia",
+        (desde.isoformat(), hasta.isoformat()),
+    )
+    print(f"Ventas del {desde.isoformat()} al {hasta.isoformat()} (sin incluir)")
+    print(f"{'Día':<12}{'Ventas':>8}{'Total':>16}")
+    for dia, cantidad, total_centavos in dias:
+        print(f"{dia:<12}{cantidad:>8}{a_decimal(total_centavos):>16,.2f}")
+    total = db.sales_total_between(desde.isoformat(), hasta.isoformat())
+    print(f"{'TOTAL':<12}{sum(d[1] for d in dias):>8}{total:>16,.2f}")
+
+
+def cmd_respaldo(db, fm, args):
+    destino = args.destino or datetime.now().strftime("respaldo_%Y%m%d_%H%M%S.db")
+    db.backup(destino)
+    print(f"Respaldo guardado en {destino}")
+
+
+def monto(texto):
+    """Importe (Decimal) de un argumento como --pagado; no admite negativos."""
+    try:
+        centavos = a_centavos(texto)
+    except (InvalidOperation, ValueError):
+        raise argparse.ArgumentTypeError(f"monto inválido: {texto!r}") from None
+    if centavos < 0:
+        raise argparse.ArgumentTypeError(f"monto negativo: {texto!r}")
+    return a_decimal(centavos)
+
+
+def parse_item(item):
+    """(código, cantidad) de un argumento CODIGO[:CANTIDAD] de venta.
+
+    La cantidad debe ser un entero mayor que 0; sin ella se vende 1.
+    """
+    codigo, separador, cantidad = item.partition(":")
+    codigo, cantidad = codigo.strip(), cantidad.strip()
+    if not codigo:
+        raise ValueError(f"Falta el código del producto en {item!r}")
+    if not separador:
+        return codigo, 1
+    if not cantidad.isdecimal() or int(cantidad) <= 0:
+        raise ValueError(
+            f"Cantidad inválida en {item!r}: debe ser un entero mayor que 0"
+        )
+    return codigo, int(cantidad)
+
+
+def cmd_venta(db, fm, args):
+    items = [parse_item(item) for item in args.items]
+    cart = CartModel()
+    for codigo, cantidad in items:
+        producto = db.catalog.by_code(codigo)
+        if producto is None and codigo.isdecimal():
+            producto = db.catalog.get(int(codigo))
+        if producto is None:
+            raise ValueError(f"Producto no encontrado: {codigo}")
+        cart.add(
+            producto.id,
+            cantidad,
+            nombre=producto.nombre,
+            precio_unitario=producto.precio,
+        )
+
+    total = cart.total
+    pagado = total if args.pagado is None else args.pagado
+    if pagado < total:
+        raise ValueError(f"El pago ({pagado:.2f}) no cubre el total ({total:.2f})")
+
+    venta_id = db.register_sale(
+        (
+            None,
+            datetime.now().strftime("%Y-%m-%d %H:%M:%S"),
+            total,
+            pagado,
+            pagado - total,
+            args.usuario,
+            args.cliente,
+            "CLI",
+        ),
+        detalles_venta(cart),
+        caja=args.caja,
+    )
+    print(
+        f"Venta {venta_id} registrada: total {total:.2f}, vuelto {pagado - total:.2f}"
+    )
+
+
+def build_parser():
+    parser = argparse.ArgumentParser(
+        prog="python -m erp", description="Operaciones del ERP sin interfaz gráfica."
+    )
+    parser.add_argument(
+        "--db", default="erp_profesional.db", help="archivo de la base de datos"
+    )
+    sub = parser.add_subparsers(dest="comando", required=True)
+
+    p = sub.add_parser("migrar", help="aplica las migraciones pendientes")
+    p.set_defaults(func=cmd_migrar)
+
+    p = sub.add_parser(
+        "importar-clientes", help="importa clientes de un CSV (actualiza por DNI)"
+    )
+    p.add_argument("archivo")
+    p.set_defaults(func=cmd_importar_clientes)
+
+    p = sub.add_parser("importar-productos", help="importa productos de un CSV")
+    p.add_argument("archivo")
+    p.add_argument(
+        "--validar", action="store_true", help="solo valida el archivo, sin importar"
+    )
+    p.set_defaults(func=cmd_importar_productos)
+
+    p = sub.add_parser("exportar", help="exporta una tabla a CSV (.gz comprime)")
+    p.add_argument("tabla", choices=sorted(FileManager.EXPORTS))
+    p.add_argument("archivo")
+    p.set_defaults(func=cmd_exportar)
+
+    p = sub.add_parser("reporte", help="ventas por día en un rango de fechas")
+    p.add_argument("--desde", type=date.fromisoformat, help="YYYY-MM-DD (hoy)")
+    p.add_argument(
+        "--hasta", type=date.fromisoformat, help="YYYY-MM-DD, sin incluir (desde + 1)"
+    )
+    p.set_defaults(func=cmd_reporte)
+
+    p = sub.add_parser("respaldo", help="copia consistente de la base de datos")
+    p.add_argument("destino", nargs="?")
+    p.set_defaults(func=cmd_respaldo)
+
+    p = sub.add_parser("venta", help="registra una venta")
+    p.add_argument(
+        "items", nargs="+", metavar="CODIGO[:CANTIDAD]", help="código de barras o id"
+    )
+    p.add_argument(
+        "--pagado", type=monto, help="monto recibido (por defecto, el total)"
+    )
+    p.add_argument("--cliente", type=int)
+    p.add_argument("--usuario", type=int, default=1)
+    p.add_argument(
+        "--caja",
+        default="CLI",
+        help="caja a cuyo nombre se registra (reservas y numeración propias)",
+    )
+    p.set_defaults(func=cmd_venta)
+
+    return parser
+
+
+def main(argv=None):
+    args = build_parser().parse_args(argv)
+    # Solo avisos y errores, en stderr: stdout queda para los resultados
+    # (python -m erp reporte > archivo)
+    logging.basicConfig(level=logging.WARNING, format="%(levelname)s: %(message)s")
+    db = DBManager(args.db, interactive=False)
+    try:
+        return args.func(db, FileManager(db), args) or 0
+    except Exception as e:
+        print(f"Error: {e}", file=sys.stderr)
+        return 1
+    finally:
+        db.close()
+
+
+if __name__ == "__main__":
+    sys.exit(main())
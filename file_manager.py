@@ -4,9 +4,12 @@ Maneja la importación/exportación de datos en formato CSV
 """
 
 import csv
-from tkinter import filedialog, messagebox, Toplevel
-from tkinter import ttk
-import tkinter as tk
+import gzip
+import os
+import re
+import time
+from datetime import datetime
+from itertools import islice
 
 
 class FileManager:
@@ -17,32 +20,182 @@ class FileManager:
         "Proveedores": "Proveedores.csv",
         "Usuarios": "Usuarios.csv",
         "Descuentos": "Descuentos.csv",
+        "Clientes": "Clientes.csv",
+        "Ventas": "Ventas.csv",
+        "DetalleVenta": "DetalleVenta.csv",
     }
 
+    # Consulta y encabezados de cada tabla exportable. Los importes de ventas
+    # salen de las columnas en centavos (n / 100.0 se escribe sin error de
+    # redondeo: 12.5, 0.3)
+    EXPORTS = {
+        "Productos": (
+            "SELECT id, nombre, descripcion, precio, stock, proveedor_id, codigo_barras FROM Productos",
+            [
+                "id",
+                "nombre",
+                "descripcion",
+                "precio",
+                "stock",
+                "proveedor_id",
+                "codigo_barras",
+            ],
+        ),
+        "Proveedores": (
+            "SELECT id, nombre, contacto, telefono FROM Proveedores",
+            ["id", "nombre", "contacto", "telefono"],
+        ),
+        "Usuarios": (
+            "SELECT id, nombre, usuario, rol FROM Usuarios",
+            ["id", "nombre", "usuario", "rol"],
+        ),
+        "Descuentos": (
+            "SELECT id, nombre, tipo, porcentaje FROM Descuentos",
+            ["id", "nombre", "tipo", "porcentaje"],
+        ),
+        # Mismos encabezados que lee import_clients
+        "Clientes": (
+            "SELECT * FROM Clientes ORDER BY apellido, nombre",
+            [
+                "ID",
+                "Nombre",
+                "Apellido",
+                "DNI",
+                "Teléfono",
+                "Email",
+                "Dirección",
+                "Fecha Registro",
+                "Activo",
+            ],
+        ),
+        "Ventas": (
+            """
+            SELECT id, fecha, total_centavos / 100.0, pagado_centavos / 100.0,
+                   vuelto_centavos / 100.0, usuario_id, id_cliente, tipo_recibo
+            FROM Ventas ORDER BY numero
+            """,
+            [
+                "id",
+                "fecha",
+                "total",
+                "monto_pagado",
+                "vuelto",
+                "usuario_id",
+                "id_cliente",
+                "tipo_recibo",
+            ],
+        ),
+        "DetalleVenta": (
+            """
+            SELECT id, venta_id, producto_id, nombre_producto, cantidad,
+                   precio_centavos / 100.0, descuento_centavos / 100.0,
+                   subtotal_centavos / 100.0
+            FROM DetalleVenta ORDER BY id
+            """,
+            [
+                "id",
+                "venta_id",
+                "producto_id",
+                "nombre_producto",
+                "cantidad",
+                "precio_unitario",
+                "descuento",
+                "subtotal",
+            ],
+        ),
+    }
+
+    # Filas por fetchmany al exportar
+    EXPORT_BLOCK_SIZE = 2000
+
+    # Alta o actualización de un cliente por DNI; los datos de contacto
+    # vacíos en el archivo no borran los que ya estaban
+    CLIENT_UPSERT_SQL = """
+        INSERT INTO Clientes (nombre, apellido, dni, telefono, email, direccion, fecha_registro, activo)
+        VALUES (?, ?, ?, ?, ?, ?, ?, ?)
+        ON CONFLICT(dni) DO UPDATE SET
+            nombre = excluded.nombre,
+            apellido = excluded.apellido,
+            telefono = COALESCE(excluded.telefono, telefono),
+            email = COALESCE(excluded.email, email),
+            direccion = COALESCE(excluded.direccion, direccion),
+            activo = excluded.activo
+    """
+
+    # Filas por executemany (y por aviso de progreso) en las importaciones
+    IMPORT_CHUNK_SIZE = 1000
+
+    # Filas válidas que se muestran antes de confirmar una importación
+    PREVIEW_SAMPLE_SIZE = 50
+
+    # OR IGNORE: un código de barras ya registrado omite la fila sin
+    # abortar el bloque
+    PRODUCT_INSERT_SQL = """
+        INSERT OR IGNORE INTO Productos
+            (nombre, descripcion, precio, stock, proveedor_id, codigo_barras)
+        VALUES (?, ?, ?, ?, ?, ?)
+    """
+
     def __init__(self, db_manager):
         self.db = db_manager
 
-    def get_data_from_db(self, table_name):
-        """Obtiene datos de la DB para exportar."""
-        if table_name == "Productos":
-            return self.db.fetch(
-                "SELECT id, nombre, descripcion, precio, stock, proveedor_id FROM Productos"
-            )
-        elif table_name == "Proveedores":
-            return self.db.fetch(
-                "SELECT id, nombre, contacto, telefono FROM Proveedores"
-            )
-        elif table_name == "Usuarios":
-            return self.db.fetch("SELECT id, nombre, usuario, rol FROM Usuarios")
-        elif table_name == "Descuentos":
-            return self.db.fetch("SELECT id, nombre, tipo, porcentaje FROM Descuentos")
-        return []
-
-    def export_data(self, table_name):
-        """Exporta datos a un archivo CSV."""
-        data = self.get_data_from_db(table_name)
+    @staticmethod
+    def open_export(file_path, comprimido=False):
+        """Abre el archivo de exportación en texto, comprimido con gzip si se pide."""
+        if comprimido:
+            return gzip.open(file_path, "wt", newline="", encoding="utf-8")
+        return open(file_path, "w", newline="", encoding="utf-8")
+
+    def export_table(
+        self, table_name, file_path, progress=None, block_size=EXPORT_BLOCK_SIZE
+    ):
+        """Escribe una tabla en CSV a medida que se lee, sin cargarla entera.
+
+        No usa la interfaz, así que puede correr en un hilo de fondo. Se
+        escribe en file_path + ".part" y se renombra al terminar, para no dejar
+        un archivo a medias; si file_path termina en .gz se comprime. Tras
+        cada bloque llama a progress((filas, segundos)). Retorna (filas,
+        segundos).
+        """
+        query, headers = self.EXPORTS[table_name]
+        temporal = file_path + ".part"
+        inicio = time.perf_counter()
+        filas = 0
+        try:
+            with self.open_export(temporal, file_path.endswith(".gz")) as f:
+                writer = csv.writer(f)
+                writer.writerow(headers)
+                for bloque in self.db.iter_query(query, block_size=block_size):
+                    writer.writerows(bloque)
+                    filas += len(bloque)
+                    if progress:
+                        progress((filas, time.perf_counter() - inicio))
+            os.replace(temporal, file_path)
+        except BaseException:
+            if os.path.exists(temporal):
+                os.remove(temporal)
+            raise
+        return filas, time.perf_counter() - inicio
+
+    @staticmethod
+    def export_rate(filas, segundos):
+        """Velocidad de exportación para mostrar (filas por segundo)."""
+        return f"{filas / segundos:,.0f} filas/s" if segundos > 0 else ""
+
+    def export_data(self, table_name, status=None):
+        """Exporta una tabla a CSV (o .csv.gz) en segundo plano.
+
+        Si se indica status (un Label), muestra ahí las filas escritas y la
+        velocidad mientras avanza.
+        """
+        # tkinter se importa solo en los métodos con interfaz: la línea de
+        # comandos usa esta clase sin cargarlo
+        from tkinter import filedialog, messagebox
+
+        if table_name not in self.EXPORTS:
+            return
 
-        if not data:
+        if not self.db.fetch(f"SELECT 1 FROM {table_name} LIMIT 1"):
             messagebox.showinfo(
                 "Exportar", f"No hay datos en {table_name} para exportar."
             )
@@ -50,7 +203,11 @@ class FileManager:
 
         file_path = filedialog.asksaveasfilename(
             defaultextension=".csv",
-            filetypes=[("CSV files", "*.csv"), ("All files", "*.*")],
+            filetypes=[
+                ("CSV files", "*.csv"),
+                ("CSV comprimido", "*.csv.gz"),
+                ("All files", "*.*"),
+            ],
             initialfile=self.TABLE_MAP.get(table_name, "data.csv"),
             title=f"Guardar datos de {table_name}",
         )
@@ -58,35 +215,265 @@ class FileManager:
         if not file_path:
             return
 
-        try:
-            with open(file_path, "w", newline="", encoding="utf-8") as f:
-                writer = csv.writer(f)
+        def show_status(avance):
+            filas, segundos = avance
+            status.config(
+                text=f"Exportando {table_name}... {filas:,} filas "
+                f"({self.export_rate(filas, segundos)})"
+            )
 
-                # Escribir encabezados según la tabla
-                headers = {
-                    "Productos": [
-                        "id",
-                        "nombre",
-                        "descripcion",
-                        "precio",
-                        "stock",
-                        "proveedor_id",
-                    ],
-                    "Proveedores": ["id", "nombre", "contacto", "telefono"],
-                    "Usuarios": ["id", "nombre", "usuario", "rol"],
-                    "Descuentos": ["id", "nombre", "tipo", "porcentaje"],
-                }
+        def progress(avance):
+            if status is not None:
+                self.db.report_progress(show_status, avance)
+
+        def done(resultado):
+            filas, segundos = resultado
+            if status is not None:
+                status.config(text="")
+            messagebox.showinfo(
+                "Éxito",
+                f"{filas:,} filas exportadas a:\n{file_path}\n\n"
+                f"{segundos:.2f} s ({self.export_rate(filas, segundos)})",
+            )
+
+        def failed(error):
+            if status is not None:
+                status.config(text="")
+            messagebox.showerror("Error", f"Error al exportar: {error}")
 
-                writer.writerow(headers.get(table_name, []))
-                writer.writerows(data)
+        self.db.run_async(
+            lambda: self.export_table(table_name, file_path, progress),
+            callback=done,
+            key=f"exportar_{table_name}",
+            errback=failed,
+        )
 
-            messagebox.showinfo("Éxito", f"Datos exportados a:\n{file_path}")
+    @staticmethod
+    def chunks(rows, size):
+        """Recorre rows en listas de hasta size elementos."""
+        rows = iter(rows)
+        while True:
+            bloque = list(islice(rows, size))
+            if not bloque:
+                return
+            yield bloque
+
+    @staticmethod
+    def parse_client_row(row, fecha_registro):
+        """Fila para CLIENT_UPSERT_SQL de una fila del CSV, o None si es inválida.
+
+        Se validan los mismos datos que en el formulario de clientes: nombre y
+        apellido obligatorios, DNI de 13 dígitos y email con formato válido.
+        """
+        valores = {k: (v or "").strip() for k, v in row.items() if k}
+        nombre, apellido = valores.get("Nombre"), valores.get("Apellido")
+        dni, email = valores.get("DNI"), valores.get("Email")
+        if not nombre or not apellido:
+            return None
+        if dni and not re.match(r"^[0-9]{13}$", dni):
+            return None
+        if email and not re.match(r"^[^@]+@[^@]+\.[^@]+$", email):
+            return None
+        return (
+            nombre,
+            apellido,
+            dni or None,
+            valores.get("Teléfono") or None,
+            email or None,
+            valores.get("Dirección") or None,
+            fecha_registro,
+            0 if valores.get("Activo", "1") == "0" else 1,
+        )
 
-        except Exception as e:
-            messagebox.showerror("Error", f"Error al exportar: {e}")
+    def existing_client_dnis(self, dnis):
+        """Subconjunto de dnis que ya están registrados."""
+        existentes = set()
+        dnis = list(dnis)
+        # Bloques por debajo del límite de parámetros de SQLite
+        for bloque in self.chunks(dnis, 500):
+            marcas = ", ".join("?" * len(bloque))
+            existentes.update(
+                fila[0]
+                for fila in self.db.query(
+                    f"SELECT dni FROM Clientes WHERE dni IN ({marcas})", bloque
+                )
+            )
+        return existentes
+
+    def import_clients(self, file_path, progress=None, chunk_size=IMPORT_CHUNK_SIZE):
+        """Importa clientes de un CSV, actualizando los que ya existen por DNI.
+
+        No usa la interfaz, así que puede correr en un hilo de fondo. Cada
+        bloque de chunk_size filas se guarda con un executemany en su propia
+        transacción: entre bloques se libera la escritura y la interfaz u
+        otras cajas pueden escribir. Si el archivo falla a la mitad quedan
+        guardados los bloques anteriores (reimportarlo es seguro, el upsert
+        actualiza por DNI). Tras cada bloque se llama progress(filas_leidas).
+        Retorna un dict con las filas insertadas, actualizadas y rechazadas.
+        """
+        resumen = {"insertados": 0, "actualizados": 0, "rechazados": 0}
+        fecha_registro = datetime.now().strftime("%Y-%m-%d %H:%M:%S")
+        vistos = set()  # DNIs ya importados desde este archivo
+        leidas = 0
+
+        with open(file_path, "r", encoding="utf-8-sig", newline="") as f:
+            reader = csv.DictReader(f)
+            for bloque in self.chunks(reader, chunk_size):
+                filas = []
+                for row in bloque:
+                    fila = self.parse_client_row(row, fecha_registro)
+                    if fila is None:
+                        resumen["rechazados"] += 1
+                    else:
+                        filas.append(fila)
+
+                existentes = self.existing_client_dnis(
+                    {fila[2] for fila in filas if fila[2]} - vistos
+                )
+                for fila in filas:
+                    dni = fila[2]
+                    if dni and (dni in vistos or dni in existentes):
+                        resumen["actualizados"] += 1
+                    else:
+                        resumen["insertados"] += 1
+                    if dni:
+                        vistos.add(dni)
+
+                if filas:
+                    with self.db.transaction():
+                        self.db.cursor.executemany(self.CLIENT_UPSERT_SQL, filas)
+                leidas += len(bloque)
+                if progress:
+                    progress(leidas)
+        return resumen
+
+    @staticmethod
+    def parse_product_row(row, proveedores):
+        """Fila para PRODUCT_INSERT_SQL de una fila del CSV de productos.
+
+        Formato del CSV exportado: id, nombre, descripcion, precio, stock,
+        proveedor_id[, codigo_barras]; el id se ignora y sin proveedor se usa
+        el 1. Lanza ValueError con el motivo si la fila no es válida.
+        """
+        if len(row) < 5:
+            raise ValueError("columnas faltantes")
+        nombre = row[1].strip()
+        if not nombre:
+            raise ValueError("nombre vacío")
+        try:
+            precio = float(row[3])
+        except ValueError:
+            raise ValueError("precio inválido") from None
+        if precio < 0:
+            raise ValueError("precio inválido")
+        try:
+            stock = int(row[4])
+        except ValueError:
+            raise ValueError("stock inválido") from None
+        if stock < 0:
+            raise ValueError("stock inválido")
+        proveedor = row[5].strip() if len(row) > 5 else ""
+        try:
+            proveedor_id = int(proveedor) if proveedor else 1
+        except ValueError:
+            raise ValueError("proveedor inválido") from None
+        if proveedor_id not in proveedores:
+            raise ValueError("proveedor inexistente")
+        codigo_barras = row[6].strip() if len(row) > 6 else ""
+        return (
+            nombre,
+            row[2].strip(),
+            precio,
+            stock,
+            proveedor_id,
+            codigo_barras or None,
+        )
+
+    def read_products(self, file_path, cambios=None, progress=None):
+        """Recorre el CSV de productos fila por fila, sin cargarlo entero.
+
+        Genera (línea, fila, None) por cada fila válida y (línea, None,
+        motivo) por cada inválida; cambios {línea: fila CSV} reemplaza filas
+        editadas en la vista previa. Cada IMPORT_CHUNK_SIZE filas llama a
+        progress(fracción del archivo leída).
+        """
+        cambios = cambios or {}
+        proveedores = {fila[0] for fila in self.db.query("SELECT id FROM Proveedores")}
+        codigos = {
+            fila[0]
+            for fila in self.db.query(
+                "SELECT codigo_barras FROM Productos WHERE codigo_barras IS NOT NULL"
+            )
+        }
+        tamano = os.path.getsize(file_path) or 1
+
+        with open(file_path, "r", encoding="utf-8-sig", newline="") as f:
+            reader = csv.reader(f)
+            next(reader, None)  # Encabezados
+            for leidas, row in enumerate(reader, 1):
+                linea = reader.line_num
+                try:
+                    fila = self.parse_product_row(cambios.get(linea, row), proveedores)
+                    codigo_barras = fila[5]
+                    if codigo_barras:
+                        if codigo_barras in codigos:
+                            raise ValueError("código de barras repetido")
+                        codigos.add(codigo_barras)
+                    yield linea, fila, None
+                except ValueError as e:
+                    yield linea, None, str(e)
+                if progress and leidas % self.IMPORT_CHUNK_SIZE == 0:
+                    progress(min(1.0, f.buffer.tell() / tamano))
+
+    def scan_products(self, file_path, progress=None, sample_size=PREVIEW_SAMPLE_SIZE):
+        """Valida el CSV de productos sin importarlo.
+
+        Retorna {"validas": n, "muestra": [(línea, fila)] con las primeras
+        sample_size filas válidas, "errores": {motivo: [cantidad, primeras
+        líneas]}}.
+        """
+        resumen = {"validas": 0, "muestra": [], "errores": {}}
+        for linea, fila, motivo in self.read_products(file_path, progress=progress):
+            if motivo:
+                error = resumen["errores"].setdefault(motivo, [0, []])
+                error[0] += 1
+                if len(error[1]) < 5:
+                    error[1].append(linea)
+            else:
+                resumen["validas"] += 1
+                if len(resumen["muestra"]) < sample_size:
+                    resumen["muestra"].append((linea, fila))
+        return resumen
+
+    def import_products_file(
+        self, file_path, cambios=None, progress=None, chunk_size=IMPORT_CHUNK_SIZE
+    ):
+        """Importa el CSV de productos en transacciones de chunk_size filas.
+
+        No usa la interfaz, así que puede correr en un hilo de fondo. Las
+        filas inválidas se saltan; un código de barras que otra caja registró
+        mientras tanto hace que se omita esa fila. Retorna {"importados",
+        "rechazados"}.
+        """
+        resumen = {"importados": 0, "rechazados": 0}
+        filas = self.read_products(file_path, cambios, progress)
+        for bloque in self.chunks(filas, chunk_size):
+            validas = [fila for _, fila, motivo in bloque if not motivo]
+            insertados = 0
+            if validas:
+                with self.db.transaction():
+                    self.db.cursor.executemany(self.PRODUCT_INSERT_SQL, validas)
+                    insertados = self.db.cursor.rowcount
+            resumen["importados"] += insertados
+            resumen["rechazados"] += len(bloque) - insertados
+        if progress:
+            progress(1.0)
+        return resumen
 
     def import_products(self, app_reference):
-        """Importa productos desde un archivo CSV."""
+        """Importa productos desde un archivo CSV (validación y guardado en segundo plano)."""
+        from tkinter import Toplevel, filedialog, messagebox, ttk
+
         file_path = filedialog.askopenfilename(
             defaultextension=".csv",
             filetypes=[("CSV files", "*.csv"), ("All files", "*.*")],
@@ -96,84 +483,129 @@ class FileManager:
         if not file_path:
             return
 
-        try:
-            with open(file_path, "r", encoding="utf-8") as f:
-                reader = csv.reader(f)
-                header = next(reader)
-
-                product_list = []
-                for row in reader:
-                    if len(row) >= 5:
-                        # nombre, desc, precio, stock, prov_id
-                        product_list.append(
-                            (
-                                row[1],  # nombre
-                                row[2],  # descripcion
-                                float(row[3]),  # precio
-                                int(row[4]),  # stock
-                                int(row[5]) if len(row) > 5 else 1,  # proveedor_id
-                            )
-                        )
-
-            if product_list:
-                self.show_import_preview(product_list, app_reference)
-            else:
-                messagebox.showwarning(
-                    "Importar", "No se encontraron productos válidos en el archivo."
-                )
+        preview_window = Toplevel()
+        preview_window.title("Vista Previa de Importación")
+        preview_window.geometry("800x550")
+
+        title = ttk.Label(
+            preview_window,
+            text="Analizando archivo...",
+            font=("Arial", 14, "bold"),
+        )
+        title.pack(pady=10)
 
-        except Exception as e:
+        progress_bar = ttk.Progressbar(
+            preview_window, mode="determinate", maximum=1.0, length=500
+        )
+        progress_bar.pack(pady=5)
+
+        def set_progress(fraccion):
+            self.db.report_progress(
+                lambda valor: progress_bar.config(value=valor), fraccion
+            )
+
+        def show_error(error):
+            preview_window.destroy()
             messagebox.showerror(
                 "Error de Importación",
                 f"Error al leer el archivo.\n\nAsegúrese de que:\n"
                 f"- El formato sea correcto (CSV)\n"
                 f"- Precio y stock sean números válidos\n\n"
-                f"Error: {e}",
+                f"Error: {error}",
             )
 
-    def show_import_preview(self, product_list, app_reference):
-        """Muestra vista previa de productos a importar."""
-        preview_window = Toplevel()
-        preview_window.title("Vista Previa de Importación")
-        preview_window.geometry("800x500")
+        def show_preview(resumen):
+            progress_bar.config(value=1.0)
+            if not resumen["validas"]:
+                preview_window.destroy()
+                messagebox.showwarning(
+                    "Importar", "No se encontraron productos válidos en el archivo."
+                )
+                return
+            self.show_import_preview(
+                preview_window,
+                title,
+                progress_bar,
+                file_path,
+                resumen,
+                set_progress,
+                app_reference,
+            )
+
+        self.db.run_async(
+            lambda: self.scan_products(file_path, set_progress),
+            callback=show_preview,
+            key="importar_productos",
+            owner=preview_window,
+            errback=show_error,
+        )
+
+    def show_import_preview(
+        self,
+        preview_window,
+        title,
+        progress_bar,
+        file_path,
+        resumen,
+        set_progress,
+        app_reference,
+    ):
+        """Muestra una muestra de los productos a importar y el resumen de errores."""
+        import tkinter as tk
+        from tkinter import Toplevel, messagebox, ttk
+
+        errores = sum(cantidad for cantidad, _ in resumen["errores"].values())
+        title.config(text=f"Productos a importar: {resumen['validas']:,}")
+
+        if errores:
+            detalle = "\n".join(
+                f"- {motivo}: {cantidad:,} (líneas {', '.join(map(str, lineas))}"
+                f"{'...' if cantidad > len(lineas) else ''})"
+                for motivo, (cantidad, lineas) in resumen["errores"].items()
+            )
+            ttk.Label(
+                preview_window,
+                text=f"Filas con errores (no se importarán): {errores:,}\n{detalle}",
+                foreground="#dc3545",
+                justify="left",
+            ).pack(padx=10, anchor="w")
 
-        # Encabezado
         ttk.Label(
             preview_window,
-            text=f"Productos a importar: {len(product_list)}",
-            font=("Arial", 14, "bold"),
-        ).pack(pady=10)
+            text=f"Primeras {len(resumen['muestra'])} filas válidas:",
+            foreground="#666",
+        ).pack(padx=10, pady=(10, 0), anchor="w")
 
-        # Treeview con productos
+        # Treeview con la muestra (iid = línea del archivo)
         tree = ttk.Treeview(
             preview_window,
-            columns=("Nombre", "Precio", "Stock", "Proveedor"),
+            columns=("Nombre", "Precio", "Stock", "Proveedor", "Código"),
             show="headings",
-            height=15,
+            height=12,
         )
         tree.heading("Nombre", text="Nombre")
         tree.heading("Precio", text="Precio")
         tree.heading("Stock", text="Stock")
         tree.heading("Proveedor", text="Proveedor ID")
+        tree.heading("Código", text="Código de barras")
 
-        tree.column("Nombre", width=300)
-        tree.column("Precio", width=100)
-        tree.column("Stock", width=100)
-        tree.column("Proveedor", width=100)
+        tree.column("Nombre", width=280)
+        tree.column("Precio", width=90)
+        tree.column("Stock", width=80)
+        tree.column("Proveedor", width=90)
+        tree.column("Código", width=140)
 
         tree.pack(fill="both", expand=True, padx=10, pady=5)
 
-        # Cargar datos
-        for i, (nombre, desc, precio, stock, prov_id, img_path) in enumerate(
-            product_list
-        ):
-            tree.insert(
-                "",
-                "end",
-                iid=i,
-                values=(nombre, f"${precio:.2f}", stock, prov_id),
-                tags=(nombre, desc, precio, stock, prov_id, img_path),
-            )
+        muestra = dict(resumen["muestra"])
+        cambios = {}  # línea -> fila CSV editada
+
+        def row_values(fila):
+            nombre, _, precio, stock, prov_id, codigo_barras = fila
+            return (nombre, f"${precio:.2f}", stock, prov_id, codigo_barras or "")
+
+        for linea, fila in resumen["muestra"]:
+            tree.insert("", "end", iid=linea, values=row_values(fila))
 
         def edit_selected():
             """Permite editar un producto antes de importar."""
@@ -182,20 +614,22 @@ class FileManager:
                 messagebox.showwarning("Editar", "Seleccione un producto primero.")
                 return
 
-            data = tree.item(selected, "tags")
+            linea = int(selected)
+            nombre, desc, precio, stock, prov_id, codigo_barras = muestra[linea]
 
             edit_win = Toplevel(preview_window)
             edit_win.title("Editar Producto")
             edit_win.geometry("400x300")
 
-            vars_list = [tk.StringVar(value=str(x)) for x in data]
+            values = [nombre, desc, precio, stock, prov_id, codigo_barras or ""]
+            vars_list = [tk.StringVar(value=str(x)) for x in values]
             fields = [
                 "Nombre",
                 "Descripción",
                 "Precio",
                 "Stock",
                 "Proveedor ID",
-                "Imagen",
+                "Código de barras",
             ]
 
             for i, field in enumerate(fields):
@@ -207,30 +641,19 @@ class FileManager:
                 )
 
             def save_changes():
+                row = [""] + [var.get() for var in vars_list]
+                proveedores = {
+                    fila[0] for fila in self.db.fetch("SELECT id FROM Proveedores")
+                }
                 try:
-                    new_data = (
-                        vars_list[0].get(),
-                        vars_list[1].get(),
-                        float(vars_list[2].get()),
-                        int(vars_list[3].get()),
-                        int(vars_list[4].get()),
-                        vars_list[5].get(),
-                    )
-                    tree.item(selected, tags=new_data)
-                    tree.item(
-                        selected,
-                        values=(
-                            new_data[0],
-                            f"${new_data[2]:.2f}",
-                            new_data[3],
-                            new_data[4],
-                        ),
-                    )
-                    edit_win.destroy()
-                except ValueError:
-                    messagebox.showerror(
-                        "Error", "Precio, Stock y Proveedor deben ser números."
-                    )
+                    new_data = self.parse_product_row(row, proveedores)
+                except ValueError as e:
+                    messagebox.showerror("Error", f"Dato inválido: {e}")
+                    return
+                cambios[linea] = row
+                muestra[linea] = new_data
+                tree.item(selected, values=row_values(new_data))
+                edit_win.destroy()
 
             ttk.Button(edit_win, text="Guardar", command=save_changes).grid(
                 row=len(fields), column=0, columnspan=2, pady=20
@@ -238,43 +661,53 @@ class FileManager:
 
         def confirm_import():
             """Guarda los productos en la base de datos."""
-            final_products = []
-            for item in tree.get_children():
-                final_products.append(tree.item(item, "tags"))
+            for button in (edit_button, confirm_button, cancel_button):
+                button.config(state="disabled")
+            title.config(text="Importando productos...")
+            progress_bar.config(value=0)
 
-            if not final_products:
-                messagebox.showwarning("Importar", "No hay productos para importar.")
-                return
-
-            query = """INSERT INTO Productos 
-                       (nombre, descripcion, precio, stock, proveedor_id) 
-                       VALUES (?, ?, ?, ?, ?)"""
-
-            try:
-                self.db.cursor.executemany(query, final_products)
-                self.db.conn.commit()
+            def done(resultado):
+                preview_window.destroy()
                 messagebox.showinfo(
-                    "Éxito", f"{len(final_products)} productos importados."
+                    "Éxito",
+                    f"{resultado['importados']:,} productos importados.\n"
+                    f"Filas omitidas: {resultado['rechazados']:,}",
                 )
-                preview_window.destroy()
-
                 # Refrescar la vista de productos si existe
                 if hasattr(app_reference, "refresh_products"):
                     app_reference.refresh_products()
 
-            except Exception as e:
-                messagebox.showerror("Error", f"Error al guardar: {e}")
+            def failed(error):
+                # Sin reintentar: se duplicarían los bloques ya guardados
+                title.config(text="Importación interrumpida")
+                cancel_button.config(state="normal", text="Cerrar")
+                messagebox.showerror(
+                    "Error",
+                    f"Error al guardar: {error}\n\n"
+                    "Los bloques ya confirmados quedaron guardados.",
+                )
+
+            self.db.run_async(
+                lambda: self.import_products_file(file_path, cambios, set_progress),
+                callback=done,
+                key="importar_productos",
+                owner=preview_window,
+                errback=failed,
+            )
 
         # Botones
         btn_frame = ttk.Frame(preview_window)
         btn_frame.pack(fill="x", padx=10, pady=10)
 
-        ttk.Button(btn_frame, text="Editar Seleccionado", command=edit_selected).pack(
-            side="left", padx=5
+        edit_button = ttk.Button(
+            btn_frame, text="Editar Seleccionado", command=edit_selected
         )
-        ttk.Button(
+        edit_button.pack(side="left", padx=5)
+        confirm_button = ttk.Button(
             btn_frame, text="Confirmar Importación", command=confirm_import
-        ).pack(side="right", padx=5)
-        ttk.Button(btn_frame, text="Cancelar", command=preview_window.destroy).pack(
-            side="right", padx=5
         )
+        confirm_button.pack(side="right", padx=5)
+        cancel_button = ttk.Button(
+            btn_frame, text="Cancelar", command=preview_window.destroy
+        )
+        cancel_button.pack(side="right", padx=5)
@@ -1,20 +1,33 @@
 """
 frames/__init__.py
-Hace que frames sea un paquete importable
+Hace que frames sea un paquete importable.
+Cada frame se importa recién la primera vez que se pide (frames.SalesFrame o
+from frames import SalesFrame), así el login no espera a que carguen todas
+las pantallas ni matplotlib.
 """
 
-from .dashboard import DashboardFrame
-from .products import ProductFrame
-from .suppliers import SupplierFrame
-from .config import ConfigFrame
-from .sales import SalesFrame
-from .clients import ClientsFrame
+import importlib
 
-__all__ = [
-    "DashboardFrame",
-    "ProductFrame",
-    "SupplierFrame",
-    "ConfigFrame",
-    "SalesFrame",
-    "ClientsFrame",
-]
+# Frame -> módulo que lo define
+_MODULOS = {
+    "DashboardFrame": ".dashboard",
+    "ProductFrame": ".products",
+    "SupplierFrame": ".suppliers",
+    "ConfigFrame": ".config",
+    "SalesFrame": ".sales",
+    "ClientsFrame": ".clients",
+}
+
+__all__ = list(_MODULOS)
+
+
+def __getattr__(nombre):
+    if nombre not in _MODULOS:
+        raise AttributeError(f"module {__name__!r} has no attribute {nombre!r}")
+    clase = getattr(importlib.import_module(_MODULOS[nombre], __name__), nombre)
+    globals()[nombre] = clase  # las siguientes búsquedas no pasan por aquí
+    return clase
+
+
+def __dir__():
+    return sorted(set(globals()) | set(_MODULOS))
@@ -7,9 +7,11 @@ import tkinter as tk
 from tkinter import ttk, messagebox
 from tkinter import filedialog
 from datetime import datetime
-import csv
 import re
 
+from .search_controller import SearchController
+from .virtual_tree import VirtualTreeview
+
 
 class ClientsFrame(ttk.Frame):
     """Frame para gestión completa de clientes."""
@@ -18,7 +20,16 @@ class ClientsFrame(ttk.Frame):
         super().__init__(parent, padding="10")
         self.app = app
         self.db = app.db
+        # Índice FTS5 (migración 5); sin él se busca con LIKE
+        self.use_fts = self.db.table_exists("ClientesFTS")
         self.setup_ui()
+        self.search = SearchController(
+            self,
+            self.search_var,
+            self.db,
+            on_term=lambda term: self.load_clients(),
+            on_empty=self.load_clients,
+        )
         self.load_clients()
 
     def setup_ui(self):
@@ -134,7 +145,6 @@ class ClientsFrame(ttk.Frame):
         search_frame.pack(fill=tk.X, pady=(0, 10))
 
         self.search_var = tk.StringVar()
-        self.search_var.trace("w", self.search_clients)
         ttk.Label(search_frame, text="Buscar:").pack(side=tk.LEFT, padx=5)
         search_entry = ttk.Entry(search_frame, textvariable=self.search_var, width=25)
         search_entry.pack(side=tk.LEFT, padx=5, fill=tk.X, expand=True)
@@ -158,11 +168,17 @@ class ClientsFrame(ttk.Frame):
         list_frame = ttk.LabelFrame(right_frame, text="Lista de Clientes", padding=10)
         list_frame.pack(fill=tk.BOTH, expand=True)
 
-        # Configurar Treeview
+        # Configurar Treeview (virtual: solo crea las filas visibles)
         columns = ("ID", "Nombre", "Apellido", "DNI", "Teléfono", "Email", "Estado")
-        self.tree = ttk.Treeview(
-            list_frame, columns=columns, show="headings", height=12
+        self.client_list = VirtualTreeview(
+            list_frame,
+            columns,
+            db=self.db,
+            height=12,
+            formatter=self.format_client,
+            xscroll=True,
         )
+        self.tree = self.client_list.tree
 
         # Configurar encabezados
         self.tree.heading("ID", text="ID")
@@ -182,27 +198,14 @@ class ClientsFrame(ttk.Frame):
         self.tree.column("Email", width=150)
         self.tree.column("Estado", width=80)
 
-        # Scrollbars
-        v_scrollbar = ttk.Scrollbar(
-            list_frame, orient=tk.VERTICAL, command=self.tree.yview
-        )
-        h_scrollbar = ttk.Scrollbar(
-            list_frame, orient=tk.HORIZONTAL, command=self.tree.xview
-        )
-        self.tree.configure(
-            yscrollcommand=v_scrollbar.set, xscrollcommand=h_scrollbar.set
-        )
-
-        # Empaquetar tree y scrollbars
-        self.tree.grid(row=0, column=0, sticky="nsew")
-        v_scrollbar.grid(row=0, column=1, sticky="ns")
-        h_scrollbar.grid(row=1, column=0, sticky="ew")
+        # Colores según estado
+        self.tree.tag_configure("activo", foreground="black")
+        self.tree.tag_configure("inactivo", foreground="gray")
 
-        list_frame.rowconfigure(0, weight=1)
-        list_frame.columnconfigure(0, weight=1)
+        self.client_list.pack(fill=tk.BOTH, expand=True)
 
         # Eventos del tree
-        self.tree.bind("<<TreeviewSelect>>", self.on_client_select)
+        self.client_list.on_select(self.on_client_select)
         self.tree.bind("<Double-1>", lambda e: self.edit_client())
 
         # Botones de exportación/importación
@@ -212,18 +215,22 @@ class ClientsFrame(ttk.Frame):
         ttk.Button(
             export_frame, text="📤 Exportar CSV", command=self.export_to_csv
         ).pack(side=tk.LEFT, padx=5)
-        ttk.Button(
+        self.import_button = ttk.Button(
             export_frame, text="📥 Importar CSV", command=self.import_from_csv
-        ).pack(side=tk.LEFT, padx=5)
+        )
+        self.import_button.pack(side=tk.LEFT, padx=5)
+        self.transfer_status = ttk.Label(export_frame, text="", foreground="#666")
+        self.transfer_status.pack(side=tk.LEFT, padx=5)
         ttk.Button(
             export_frame, text="📊 Estadísticas", command=self.show_statistics
         ).pack(side=tk.RIGHT, padx=5)
 
     def load_clients(self):
-        """Carga la lista de clientes desde la base de datos."""
-        # Limpiar lista actual
-        for item in self.tree.get_children():
-            self.tree.delete(item)
+        """Carga la lista de clientes (búsqueda o filtro por estado), paginada."""
+        search_term = self.search_var.get().strip()
+        if search_term:
+            self.client_list.set_query(*self.search_query(search_term))
+            return
 
         # Construir consulta según filtro
         filter_estado = self.filter_var.get()
@@ -234,54 +241,52 @@ class ClientsFrame(ttk.Frame):
         else:
             query = "SELECT * FROM Clientes ORDER BY apellido, nombre"
 
-        clientes = self.db.fetch(query)
-
-        for cliente in clientes:
-            (
-                id_cliente,
-                nombre,
-                apellido,
-                dni,
-                telefono,
-                email,
-                direccion,
-                fecha_registro,
-                activo,
-            ) = cliente
-            estado = "Activo" if activo else "Inactivo"
-
-            # Insertar en el tree con tags según estado
-            tag = "activo" if activo else "inactivo"
-            self.tree.insert(
-                "",
-                tk.END,
-                values=(
-                    id_cliente,
-                    nombre,
-                    apellido,
-                    dni or "N/A",
-                    telefono or "N/A",
-                    email or "N/A",
-                    estado,
-                ),
-                tags=(tag,),
-            )
-
-        # Configurar colores según estado
-        self.tree.tag_configure("activo", foreground="black")
-        self.tree.tag_configure("inactivo", foreground="gray")
-
-    def search_clients(self, *args):
-        """Busca clientes en tiempo real."""
-        search_term = self.search_var.get().lower()
+        self.client_list.set_query(query)
+
+    def format_client(self, cliente):
+        """Valores y tags con que se muestra un cliente en la lista."""
+        (
+            id_cliente,
+            nombre,
+            apellido,
+            dni,
+            telefono,
+            email,
+            direccion,
+            fecha_registro,
+            activo,
+        ) = cliente
+        estado = "Activo" if activo else "Inactivo"
+        tag = "activo" if activo else "inactivo"
+        values = (
+            id_cliente,
+            nombre,
+            apellido,
+            dni or "N/A",
+            telefono or "N/A",
+            email or "N/A",
+            estado,
+        )
+        return values, (tag,)
 
-        # Limpiar lista actual
-        for item in self.tree.get_children():
-            self.tree.delete(item)
+    def search_query(self, search_term):
+        """(consulta, parámetros) de la búsqueda de clientes, sin LIMIT.
 
-        if not search_term:
-            self.load_clients()
-            return
+        La lista la pagina con set_query, así se recorre completa aunque
+        encuentre miles de clientes.
+        """
+        if self.use_fts:
+            # Prefijos de palabra, sin distinguir mayúsculas ni acentos.
+            # CROSS JOIN fija el orden: primero el índice FTS y luego Clientes
+            # por id (si no, SQLite recorre Clientes por el ORDER BY y evalúa
+            # el MATCH fila por fila).
+            query = """
+                SELECT c.* FROM ClientesFTS f
+                CROSS JOIN Clientes c ON c.id = f.rowid
+                WHERE ClientesFTS MATCH ?
+                ORDER BY c.apellido, c.nombre
+            """
+            return query, (self.db.fts_query(search_term),)
 
         # Buscar en nombre, apellido, DNI, teléfono y email
         query = """
@@ -293,50 +298,7 @@ class ClientsFrame(ttk.Frame):
             OR LOWER(email) LIKE ?
             ORDER BY apellido, nombre
         """
-        search_pattern = f"%{search_term}%"
-        clientes = self.db.fetch(
-            query,
-            (
-                search_pattern,
-                search_pattern,
-                search_pattern,
-                search_pattern,
-                search_pattern,
-            ),
-        )
-
-        for cliente in clientes:
-            (
-                id_cliente,
-                nombre,
-                apellido,
-                dni,
-                telefono,
-                email,
-                direccion,
-                fecha_registro,
-                activo,
-            ) = cliente
-            estado = "Activo" if activo else "Inactivo"
-            tag = "activo" if activo else "inactivo"
-            self.tree.insert(
-                "",
-                tk.END,
-                values=(
-                    id_cliente,
-                    nombre,
-                    apellido,
-                    dni or "N/A",
-                    telefono or "N/A",
-                    email or "N/A",
-                    estado,
-                ),
-                tags=(tag,),
-            )
-
-        # Aplicar colores
-        self.tree.tag_configure("activo", foreground="black")
-        self.tree.tag_configure("inactivo", foreground="gray")
+        return query, (f"%{search_term.lower()}%",) * 5
 
     def on_client_select(self, event):
         """Maneja la selección de un cliente en la lista."""
@@ -516,21 +478,25 @@ class ClientsFrame(ttk.Frame):
                     "Confirmación",
                     "⚠️ ADVERTENCIA: Se eliminarán también todas las ventas asociadas.\n¿Continuar?",
                 ):
-                    self.db.execute(
-                        "DELETE FROM DetalleVenta WHERE venta_id IN (SELECT id FROM Ventas WHERE id_cliente = ?)",
-                        (self.cliente_id_seleccionado,),
-                    )
-                    self.db.execute(
-                        "DELETE FROM Ventas WHERE id_cliente = ?",
-                        (self.cliente_id_seleccionado,),
-                    )
-                    self.db.execute(
-                        "DELETE FROM Clientes WHERE id = ?",
-                        (self.cliente_id_seleccionado,),
-                    )
-                    messagebox.showinfo(
-                        "Éxito", "Cliente y ventas asociadas eliminados"
-                    )
+                    try:
+                        with self.db.transaction():
+                            self.db.execute(
+                                "DELETE FROM DetalleVenta WHERE venta_id IN (SELECT id FROM Ventas WHERE id_cliente = ?)",
+                                (self.cliente_id_seleccionado,),
+                            )
+                            self.db.execute(
+                                "DELETE FROM Ventas WHERE id_cliente = ?",
+                                (self.cliente_id_seleccionado,),
+                            )
+                            self.db.execute(
+                                "DELETE FROM Clientes WHERE id = ?",
+                                (self.cliente_id_seleccionado,),
+                            )
+                        messagebox.showinfo(
+                            "Éxito", "Cliente y ventas asociadas eliminados"
+                        )
+                    except Exception as e:
+                        messagebox.showerror("Error", f"Error al eliminar cliente: {e}")
         else:
             # Cliente sin ventas, eliminación simple
             if messagebox.askyesno(
@@ -561,101 +527,64 @@ class ClientsFrame(ttk.Frame):
 
     def export_to_csv(self):
         """Exporta la lista de clientes a CSV."""
-        filename = filedialog.asksaveasfilename(
-            defaultextension=".csv",
-            filetypes=[("CSV files", "*.csv"), ("All files", "*.*")],
-            title="Exportar Clientes",
-        )
-
-        if filename:
-            try:
-                clientes = self.db.fetch(
-                    "SELECT * FROM Clientes ORDER BY apellido, nombre"
-                )
-
-                with open(filename, "w", newline="", encoding="utf-8") as csvfile:
-                    writer = csv.writer(csvfile)
-                    # Encabezados
-                    writer.writerow(
-                        [
-                            "ID",
-                            "Nombre",
-                            "Apellido",
-                            "DNI",
-                            "Teléfono",
-                            "Email",
-                            "Dirección",
-                            "Fecha Registro",
-                            "Activo",
-                        ]
-                    )
-
-                    # Datos
-                    for cliente in clientes:
-                        writer.writerow(cliente)
-
-                messagebox.showinfo("Éxito", f"Clientes exportados a {filename}")
-
-            except Exception as e:
-                messagebox.showerror("Error", f"Error al exportar: {e}")
+        self.app.file_manager.export_data("Clientes", self.transfer_status)
 
     def import_from_csv(self):
-        """Importa clientes desde un archivo CSV."""
+        """Importa clientes desde un archivo CSV (los DNI existentes se actualizan)."""
         filename = filedialog.askopenfilename(
             filetypes=[("CSV files", "*.csv"), ("All files", "*.*")],
             title="Importar Clientes",
         )
 
         if filename:
-            try:
-                imported_count = 0
-                skipped_count = 0
-
-                with open(filename, "r", encoding="utf-8") as csvfile:
-                    reader = csv.DictReader(csvfile)
-
-                    for row in reader:
-                        try:
-                            # Validar campos obligatorios
-                            if not row.get("Nombre") or not row.get("Apellido"):
-                                skipped_count += 1
-                                continue
-
-                            fecha_registro = datetime.now().strftime(
-                                "%Y-%m-%d %H:%M:%S"
-                            )
-
-                            query = """
-                                INSERT INTO Clientes (nombre, apellido, dni, telefono, email, direccion, fecha_registro, activo)
-                                VALUES (?, ?, ?, ?, ?, ?, ?, ?)
-                            """
-                            self.db.execute(
-                                query,
-                                (
-                                    row["Nombre"],
-                                    row["Apellido"],
-                                    row.get("DNI") or None,
-                                    row.get("Teléfono") or None,
-                                    row.get("Email") or None,
-                                    row.get("Dirección") or None,
-                                    fecha_registro,
-                                    1 if row.get("Activo", "1") == "1" else 0,
-                                ),
-                            )
-                            imported_count += 1
+            self.import_button.config(state="disabled")
+            self.transfer_status.config(text="Importando clientes...")
+            self.import_leidas = 0  # filas de los bloques ya confirmados
+
+            def progress(leidas):
+                self.import_leidas = leidas
+                self.db.report_progress(
+                    lambda n: self.transfer_status.config(
+                        text=f"Importando clientes... {n:,} filas"
+                    ),
+                    leidas,
+                )
 
-                        except Exception as e:
-                            if "UNIQUE constraint failed" not in str(e):
-                                skipped_count += 1
+            self.db.run_async(
+                lambda: self.app.file_manager.import_clients(filename, progress),
+                callback=self.on_import_done,
+                key="importar_clientes",
+                owner=self,
+                errback=self.on_import_error,
+            )
 
-                self.load_clients()
-                messagebox.showinfo(
-                    "Importación Completa",
-                    f"Clientes importados: {imported_count}\nRegistros omitidos: {skipped_count}",
-                )
+    def on_import_done(self, resumen):
+        """Muestra el resumen de la importación de clientes."""
+        self.import_button.config(state="normal")
+        self.transfer_status.config(text="")
+        self.load_clients()
+        messagebox.showinfo(
+            "Importación Completa",
+            f"Clientes nuevos: {resumen['insertados']}\n"
+            f"Clientes actualizados: {resumen['actualizados']}\n"
+            f"Registros rechazados: {resumen['rechazados']}",
+        )
 
-            except Exception as e:
-                messagebox.showerror("Error", f"Error al importar: {e}")
+    def on_import_error(self, error):
+        """La importación falló; los bloques confirmados antes quedan guardados."""
+        self.import_button.config(state="normal")
+        self.transfer_status.config(text="")
+        self.load_clients()
+        guardados = (
+            f"Las primeras {self.import_leidas:,} filas del archivo quedaron guardadas."
+            if self.import_leidas
+            else "No se guardó ningún cliente."
+        )
+        messagebox.showerror(
+            "Error",
+            f"Error al importar: {error}\n\n{guardados}\n"
+            "Puede importar el archivo de nuevo: los DNI existentes se actualizan.",
+        )
 
     def show_statistics(self):
         """Muestra estadísticas de clientes."""
@@ -6,6 +6,8 @@ from tkinter import ttk, messagebox
 import tkinter as tk
 from datetime import datetime
 
+from receipts import FILA_RECIBO_HTML, compilar
+
 
 class ConfigFrame(ttk.Frame):
     """Frame de configuración del sistema."""
@@ -260,21 +262,20 @@ class ConfigFrame(ttk.Frame):
         """Muestra una vista previa del recibo."""
         template_content = self.template_text.get(1.0, tk.END).strip()
         
-        # Datos de ejemplo
-        html_preview = template_content
-        html_preview = html_preview.replace("{{NOMBRE_NEGOCIO}}", "Mi Negocio ERP")
-        html_preview = html_preview.replace("{{ID_VENTA}}", "V-20250929-001")
-        html_preview = html_preview.replace("{{FECHA}}", datetime.now().strftime("%d/%m/%Y %H:%M"))
-        html_preview = html_preview.replace("{{TOTAL}}", "150.00")
-        html_preview = html_preview.replace("{{MONTO_PAGADO}}", "200.00")
-        html_preview = html_preview.replace("{{VUELTO}}", "50.00")
-        
-        # Items de ejemplo
-        items_html = """
-            <div class="item"><span>Monitor 27"</span><span>1 / $120.00</span></div>
-            <div class="item"><span>Mouse Gamer</span><span>2 / $30.00</span></div>
-        """
-        html_preview = html_preview.replace("<!-- ITEMS_PLACEHOLDER -->", items_html)
+        # Datos e items de ejemplo
+        items = [
+            {"PRODUCTO": 'Monitor 27"', "CANT": 1, "SUBTOTAL": "120.00"},
+            {"PRODUCTO": "Mouse Gamer", "CANT": 2, "SUBTOTAL": "30.00"},
+        ]
+        html_preview = compilar(template_content).render({
+            "NOMBRE_NEGOCIO": "Mi Negocio ERP",
+            "ID_VENTA": "C001-00000001",
+            "FECHA": datetime.now().strftime("%d/%m/%Y %H:%M"),
+            "TOTAL": "150.00",
+            "MONTO_PAGADO": "200.00",
+            "VUELTO": "50.00",
+            "ITEMS": FILA_RECIBO_HTML.render_items(items),
+        })
         
         # Ventana de vista previa
         preview_win = tk.Toplevel(self.app)
@@ -7,8 +7,19 @@ import tkinter as tk
 from tkinter import ttk
 import threading
 import time
-from matplotlib.backends.backend_tkagg import FigureCanvasTkAgg
-from matplotlib.figure import Figure
+from datetime import date, timedelta
+
+from money import a_decimal
+
+
+def matplotlib_classes():
+    """(Figure, FigureCanvasTkAgg); matplotlib tarda en importarse, así que se
+    carga recién al dibujar la primera gráfica y no al iniciar la aplicación."""
+    from matplotlib.backends.backend_tkagg import FigureCanvasTkAgg
+    from matplotlib.figure import Figure
+
+    return Figure, FigureCanvasTkAgg
+
 
 class DashboardFrame(ttk.Frame):
     """Dashboard profesional con KPIs, alertas y gráficas modernas."""
@@ -68,46 +79,78 @@ class DashboardFrame(ttk.Frame):
 
         # ------------------ Datos ------------------
         self.load_data()
-        self.render_dashboard()
 
     # -------------------- Cargar datos --------------------
     def load_data(self):
-        """Carga los datos desde la base de datos."""
-        self.total_sales = self.db.fetch("SELECT SUM(total) FROM Ventas")[0][0] or 0
-        self.daily_sales = self.db.fetch("SELECT SUM(total) FROM Ventas WHERE DATE(fecha)=DATE('now')")[0][0] or 0
-        self.monthly_sales = self.db.fetch("SELECT SUM(total) FROM Ventas WHERE strftime('%m', fecha)=strftime('%m','now')")[0][0] or 0
+        """Carga los datos en segundo plano y dibuja el dashboard al terminar."""
+        self.loading_label = ttk.Label(
+            self.scrollable_frame, text="Cargando datos...", font=("Segoe UI", 11)
+        )
+        self.loading_label.grid(row=0, column=0, padx=10, pady=10, sticky="w")
+        self.db.run_async(
+            self.query_data, self.on_data_loaded, key="dashboard", owner=self
+        )
 
-        self.low_stock = self.db.fetch(
+    def query_data(self):
+        """Consulta los datos del dashboard (se ejecuta fuera del hilo de Tk)."""
+        data = {}
+        # Total, gráficas y más vendido salen de los resúmenes (VentasMensuales,
+        # VentasDiarias, VentasProducto) que mantienen los triggers
+        data["total_sales"] = a_decimal(
+            self.db.query("SELECT SUM(total_centavos) FROM VentasMensuales")[0][0] or 0
+        )
+        # Hoy y mes actual: rangos [inicio, fin) sobre fecha (usa el índice)
+        hoy = date.today()
+        inicio_mes = hoy.replace(day=1)
+        proximo_mes = (inicio_mes + timedelta(days=32)).replace(day=1)
+        data["daily_sales"] = self.db.sales_total_between(
+            hoy.isoformat(), (hoy + timedelta(days=1)).isoformat()
+        )
+        data["monthly_sales"] = self.db.sales_total_between(
+            inicio_mes.isoformat(), proximo_mes.isoformat()
+        )
+
+        data["low_stock"] = self.db.query(
             "SELECT nombre, stock FROM Productos WHERE stock <= 10 ORDER BY stock ASC"
         )
 
-        best_seller_data = self.db.fetch("""
-            SELECT nombre_producto, SUM(cantidad)
-            FROM DetalleVenta
-            GROUP BY nombre_producto
-            ORDER BY SUM(cantidad) DESC
+        best_seller_data = self.db.query("""
+            SELECT nombre_producto, cantidad
+            FROM VentasProducto
+            ORDER BY cantidad DESC
             LIMIT 1
         """)
-        self.best_seller = best_seller_data[0] if best_seller_data else ("N/A", 0)
-
-        self.total_products = self.db.fetch("SELECT COUNT(*) FROM Productos")[0][0] or 0
-
-        # Ventas por mes y por día
-        ventas_mes = self.db.fetch("""
-            SELECT strftime('%m', fecha), SUM(total)
-            FROM Ventas
-            GROUP BY strftime('%m', fecha)
-            ORDER BY strftime('%m', fecha)
+        data["best_seller"] = best_seller_data[0] if best_seller_data else ("N/A", 0)
+
+        data["total_products"] = self.db.query("SELECT COUNT(*) FROM Productos")[0][0] or 0
+
+        # Ventas por mes (últimos 12) y por día del mes actual
+        ventas_mes = self.db.query("""
+            SELECT mes, total_centavos / 100.0 FROM (
+                SELECT mes, total_centavos FROM VentasMensuales
+                WHERE cantidad > 0
+                ORDER BY mes DESC
+                LIMIT 12
+            )
+            ORDER BY mes
         """)
-        self.ventas_por_mes = ventas_mes or []
+        data["ventas_por_mes"] = ventas_mes or []
 
-        ventas_dia = self.db.fetch("""
-            SELECT strftime('%d', fecha), SUM(total)
-            FROM Ventas
-            WHERE strftime('%m', fecha)=strftime('%m','now')
-            GROUP BY strftime('%d', fecha)
+        ventas_dia = self.db.query("""
+            SELECT substr(dia, 9, 2), total_centavos / 100.0
+            FROM VentasDiarias
+            WHERE dia >= date('now', 'localtime', 'start of month') AND cantidad > 0
+            ORDER BY dia
         """)
-        self.ventas_por_dia = ventas_dia or []
+        data["ventas_por_dia"] = ventas_dia or []
+        return data
+
+    def on_data_loaded(self, data):
+        """Recibe los datos consultados y dibuja el dashboard."""
+        self.loading_label.destroy()
+        for nombre, valor in data.items():
+            setattr(self, nombre, valor)
+        self.render_dashboard()
 
     # -------------------- Render del Dashboard --------------------
     def render_dashboard(self):
@@ -150,8 +193,14 @@ class DashboardFrame(ttk.Frame):
         self.create_line_chart(self.ventas_por_dia, "📊 Ventas Diarias", "Día", "Monto ($)", row=3, column=2, columnspan=1)
         self.create_pie_chart(self.low_stock, "🚨 Stock Bajo", "# Productos", row=4, column=0, columnspan=1)
 
-        # -------------------- Botón actualizar --------------------
-        ttk.Button(self.scrollable_frame, text="🔄 Actualizar Dashboard", command=self.refresh_dashboard).grid(row=5, column=0, columnspan=3, pady=20)
+        # -------------------- Botones --------------------
+        btn_frame = ttk.Frame(self.scrollable_frame)
+        btn_frame.grid(row=5, column=0, columnspan=3, pady=20)
+        ttk.Button(btn_frame, text="🔄 Actualizar Dashboard", command=self.refresh_dashboard).pack(side="left", padx=5)
+        ttk.Button(btn_frame, text="📤 Exportar Ventas", command=lambda: self.app.file_manager.export_data("Ventas", self.export_status)).pack(side="left", padx=5)
+        ttk.Button(btn_frame, text="📤 Exportar Detalle de Ventas", command=lambda: self.app.file_manager.export_data("DetalleVenta", self.export_status)).pack(side="left", padx=5)
+        self.export_status = ttk.Label(btn_frame, text="", foreground="#666")
+        self.export_status.pack(side="left", padx=5)
 
     # -------------------- Animación KPIs --------------------
     def animate_counter(self, label, target_value):
@@ -186,6 +235,7 @@ class DashboardFrame(ttk.Frame):
 
         # Ajustamos el tamaño de la figura al frame (más ancho si hay muchos datos)
         fig_width = max(6, len(data) * 0.5)  # Ajusta según cantidad de datos
+        Figure, FigureCanvasTkAgg = matplotlib_classes()
         fig = Figure(figsize=(fig_width,3), dpi=70)
         ax = fig.add_subplot(111)
         x = [d[0] for d in data]
@@ -209,6 +259,7 @@ class DashboardFrame(ttk.Frame):
             return
 
         fig_width = max(5, len(data) * 0.5)
+        Figure, FigureCanvasTkAgg = matplotlib_classes()
         fig = Figure(figsize=(fig_width,3), dpi=70)
         ax = fig.add_subplot(111)
         x = [d[0] for d in data]
@@ -239,6 +290,7 @@ class DashboardFrame(ttk.Frame):
             ttk.Label(inner_frame, text="No hay datos", font=("Segoe UI",10)).pack()
             return
 
+        Figure, FigureCanvasTkAgg = matplotlib_classes()
         fig = Figure(figsize=(4,3), dpi=80)
         ax = fig.add_subplot(111)
         labels = [d[0] for d in data]
@@ -255,7 +307,6 @@ class DashboardFrame(ttk.Frame):
         for widget in self.scrollable_frame.winfo_children():
             widget.destroy()
         self.load_data()
-        self.render_dashboard()
 # -------------------- Gráficas ajustadas --------------------
 def create_bar_chart(self, data, title, xlabel, ylabel, row=0, column=0, columnspan=1):
     chart_frame = ttk.LabelFrame(self.scrollable_frame, text=title, padding=10)
@@ -265,6 +316,7 @@ def create_bar_chart(self, data, title, xlabel, ylabel, row=0, column=0, columns
         ttk.Label(chart_frame, text="No hay datos", font=("Segoe UI", 10)).pack()
         return
 
+    Figure, FigureCanvasTkAgg = matplotlib_classes()
     fig = Figure(figsize=(6, 4), dpi=80)
     ax = fig.add_subplot(111)
     x = [d[0] for d in data]
@@ -293,6 +345,7 @@ def create_line_chart(self, data, title, xlabel, ylabel, row=0, column=0, column
         ttk.Label(chart_frame, text="No hay datos", font=("Segoe UI", 10)).pack()
         return
 
+    Figure, FigureCanvasTkAgg = matplotlib_classes()
     fig = Figure(figsize=(6, 4), dpi=80)
     ax = fig.add_subplot(111)
     x = [d[0] for d in data]
@@ -320,6 +373,7 @@ def create_pie_chart(self, data, title, label_field, row=0, column=0, columnspan
         ttk.Label(chart_frame, text="No hay datos", font=("Segoe UI", 10)).pack()
         return
 
+    Figure, FigureCanvasTkAgg = matplotlib_classes()
     fig = Figure(figsize=(4, 4), dpi=80)
     ax = fig.add_subplot(111)
     labels = [d[0] for d in data]
@@ -340,4 +394,3 @@ def create_pie_chart(self, data, title, label_field, row=0, column=0, columnspan
         for widget in self.scrollable_frame.winfo_children():
             widget.destroy()
         self.load_data()
-        self.render_dashboard()
@@ -7,6 +7,9 @@ from tkinter import ttk, messagebox
 import tkinter as tk
 import os
 
+from .search_controller import SearchController
+from .virtual_tree import VirtualTreeview
+
 
 class ProductFrame(ttk.Frame):
     """Frame para gestión de productos con CRUD completo."""
@@ -44,15 +47,15 @@ class ProductFrame(ttk.Frame):
         self.search_var = tk.StringVar()
         search_entry = ttk.Entry(search_frame, textvariable=self.search_var, width=30)
         search_entry.pack(side="left", padx=5, fill="x", expand=True)
-        search_entry.bind("<KeyRelease>", self.filter_products)
 
-        # Treeview de productos
-        self.tree = ttk.Treeview(
+        # Treeview de productos (virtual: pide páginas al desplazarse)
+        self.product_list = VirtualTreeview(
             self.list_frame,
-            columns=("ID", "Nombre", "Precio", "Stock", "Proveedor"),
-            show="headings",
+            ("ID", "Nombre", "Precio", "Stock", "Proveedor"),
+            db=self.db,
             height=15,
         )
+        self.tree = self.product_list.tree
 
         self.tree.heading("ID", text="ID")
         self.tree.heading("Nombre", text="Nombre del Producto")
@@ -66,14 +69,18 @@ class ProductFrame(ttk.Frame):
         self.tree.column("Stock", width=80, anchor="center")
         self.tree.column("Proveedor", width=100, anchor="center")
 
-        self.tree.bind("<<TreeviewSelect>>", self.select_product)
-        self.tree.pack(fill="both", expand=True, pady=5)
-
-        # Scrollbar
-        scrollbar = ttk.Scrollbar(
-            self.list_frame, orient="vertical", command=self.tree.yview
+        self.product_list.on_select(self.select_product)
+        self.product_list.pack(fill="both", expand=True, pady=5)
+
+        # Búsqueda al escribir: el resultado se pagina igual que el listado
+        # completo, así se puede recorrer entero por grande que sea
+        self.search = SearchController(
+            self,
+            self.search_var,
+            self.db,
+            on_term=lambda term: self.load_products(),
+            on_empty=self.load_products,
         )
-        self.tree.configure(yscrollcommand=scrollbar.set)
 
         # Botones de acción
         btn_frame = ttk.Frame(self.list_frame)
@@ -111,6 +118,7 @@ class ProductFrame(ttk.Frame):
         self.precio = tk.StringVar()
         self.stock = tk.StringVar()
         self.proveedor_id = tk.StringVar(value="1")
+        self.codigo_barras = tk.StringVar()
 
         # Campos del formulario
         fields = [
@@ -118,6 +126,7 @@ class ProductFrame(ttk.Frame):
             ("Precio (USD):", self.precio),
             ("Stock:", self.stock),
             ("Proveedor ID:", self.proveedor_id),
+            ("Código de barras:", self.codigo_barras),
         ]
 
         row = 1
@@ -146,36 +155,14 @@ class ProductFrame(ttk.Frame):
         ).grid(row=row, column=0, columnspan=2, pady=20, sticky="ew")
 
     def load_products(self):
-        """Carga todos los productos en el Treeview."""
-        for item in self.tree.get_children():
-            self.tree.delete(item)
-
-        products = self.db.fetch(
-            "SELECT id, nombre, precio, stock, proveedor_id FROM Productos ORDER BY id DESC"
-        )
-
-        for prod in products:
-            self.tree.insert("", "end", values=prod)
-
-    def filter_products(self, event=None):
-        """Filtra productos según búsqueda."""
-        search_term = self.search_var.get().lower()
-
-        for item in self.tree.get_children():
-            self.tree.delete(item)
-
-        if not search_term:
-            self.load_products()
-            return
-
-        products = self.db.fetch(
-            "SELECT id, nombre, precio, stock, proveedor_id FROM Productos"
+        """Carga los productos (filtrados por la búsqueda) en el Treeview."""
+        search_term = self.search_var.get().strip()
+        self.search.clear_cache()
+        self.product_list.set_source(
+            lambda: self.db.count_products(search_term),
+            lambda offset, limit: self.db.search_products(search_term, limit, offset),
         )
 
-        for prod in products:
-            if search_term in prod[1].lower():
-                self.tree.insert("", "end", values=prod)
-
     def select_product(self, event):
         """Carga datos del producto seleccionado en el formulario."""
         selected_item = self.tree.focus()
@@ -186,7 +173,8 @@ class ProductFrame(ttk.Frame):
         product_id = values[0]
 
         full_data = self.db.fetch(
-            "SELECT nombre, precio, stock, descripcion, proveedor_id FROM Productos WHERE id = ?",
+            "SELECT nombre, precio, stock, descripcion, proveedor_id, codigo_barras "
+            "FROM Productos WHERE id = ?",
             (product_id,),
         )
 
@@ -200,6 +188,7 @@ class ProductFrame(ttk.Frame):
         self.precio.set(full_data[1])
         self.stock.set(full_data[2])
         self.proveedor_id.set(full_data[4])
+        self.codigo_barras.set(full_data[5] or "")
 
         self.desc_text.delete(1.0, tk.END)
         self.desc_text.insert(tk.END, full_data[3] or "")
@@ -211,6 +200,7 @@ class ProductFrame(ttk.Frame):
         self.precio.set("")
         self.stock.set("")
         self.proveedor_id.set("1")
+        self.codigo_barras.set("")
         self.desc_text.delete(1.0, tk.END)
 
     def save_product(self):
@@ -220,6 +210,7 @@ class ProductFrame(ttk.Frame):
         stock = self.stock.get()
         descripcion = self.desc_text.get(1.0, tk.END).strip()
         proveedor_id = self.proveedor_id.get()
+        codigo_barras = self.codigo_barras.get().strip() or None
 
         if not all([nombre, precio, stock, proveedor_id]):
             messagebox.showerror("Error", "Complete todos los campos obligatorios.")
@@ -235,31 +226,57 @@ class ProductFrame(ttk.Frame):
             )
             return
 
+        otro = self.db.catalog.by_code(codigo_barras)
+        if otro is not None and str(otro.id) != self.product_id.get():
+            messagebox.showerror(
+                "Error",
+                f"El código de barras ya pertenece a '{otro.nombre}' (ID {otro.id}).",
+            )
+            return
+
         if self.product_id.get():
             # Actualizar
             query = """UPDATE Productos 
-                       SET nombre=?, precio=?, stock=?, descripcion=?, proveedor_id=? 
+                       SET nombre=?, precio=?, stock=?, descripcion=?, proveedor_id=?,
+                           codigo_barras=?
                        WHERE id=?"""
-            self.db.execute(
-                query,
-                (
-                    nombre,
-                    precio_val,
-                    stock_val,
-                    descripcion,
-                    prov_id_val,
-                    self.product_id.get(),
-                ),
-            )
+            if (
+                self.db.execute(
+                    query,
+                    (
+                        nombre,
+                        precio_val,
+                        stock_val,
+                        descripcion,
+                        prov_id_val,
+                        codigo_barras,
+                        self.product_id.get(),
+                    ),
+                )
+                is None
+            ):
+                return
             messagebox.showinfo("Éxito", "Producto actualizado correctamente.")
         else:
             # Insertar
             query = """INSERT INTO Productos 
-                       (nombre, precio, stock, descripcion, proveedor_id) 
-                       VALUES (?, ?, ?, ?, ?)"""
-            self.db.execute(
-                query, (nombre, precio_val, stock_val, descripcion, prov_id_val)
-            )
+                       (nombre, precio, stock, descripcion, proveedor_id, codigo_barras) 
+                       VALUES (?, ?, ?, ?, ?, ?)"""
+            if (
+                self.db.execute(
+                    query,
+                    (
+                        nombre,
+                        precio_val,
+                        stock_val,
+                        descripcion,
+                        prov_id_val,
+                        codigo_barras,
+                    ),
+                )
+                is None
+            ):
+                return
             messagebox.showinfo("Éxito", "Producto agregado correctamente.")
 
         self.load_products()
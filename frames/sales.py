@@ -6,9 +6,25 @@ Sistema POS (Point of Sale) para gestión de ventas
 from tkinter import ttk, messagebox, Toplevel, filedialog
 import tkinter as tk
 from datetime import datetime
-import random
 import os
 
+from cart import CartModel, detalles_venta, totales_linea
+from database import InsufficientStockError
+from money import a_centavos, a_decimal, importe_en_palabras
+from receipts import (
+    ENCABEZADO_HTML,
+    FACTURA_HTML,
+    FILA_FACTURA_HTML,
+    cliente_html,
+    encabezado_texto,
+    impuestos,
+    lineas_venta,
+    numero_factura,
+    resumen_impuestos_texto,
+)
+
+from .search_controller import SearchController
+
 
 class SalesFrame(ttk.Frame):
     """Frame de ventas POS."""
@@ -17,7 +33,12 @@ class SalesFrame(ttk.Frame):
         super().__init__(parent, padding="10")
         self.app = app
         self.db = app.db
-        self.cart = {}
+        # Carrito dueño de las reservas de stock: propio de esta pantalla,
+        # así no se mezcla con el de ventas mayoristas del mismo equipo
+        self.reservas = f"{self.db.terminal_name()}-POS"
+        self.cart = CartModel()
+        self.cart.subscribe(self.on_cart_change)
+        self.cart.subscribe(self.release_reservations)
         self.discount_data = {}
 
         self.grid_columnconfigure(0, weight=2)
@@ -33,6 +54,7 @@ class SalesFrame(ttk.Frame):
         self.create_cart_ui()
         self.create_checkout_ui()
         self.update_cart_display()
+        self.scan_entry.focus_set()
 
         # Atajos de teclado
         self.app.bind("<F1>", lambda e: self.open_product_search())
@@ -85,11 +107,27 @@ class SalesFrame(ttk.Frame):
             self.cart_frame, text="Carrito de Compras", font=("Arial", 14, "bold")
         ).pack(pady=(0, 10))
 
+        # Ingreso por escáner: código de barras (o ID) + Enter, sin ventanas
+        scan_frame = ttk.Frame(self.cart_frame)
+        scan_frame.pack(fill="x", pady=5)
+
+        ttk.Label(scan_frame, text="Código:").pack(side="left", padx=(0, 5))
+        self.scan_var = tk.StringVar()
+        self.scan_entry = ttk.Entry(
+            scan_frame, textvariable=self.scan_var, font=("Arial", 12), width=25
+        )
+        self.scan_entry.pack(side="left", padx=5)
+        self.scan_entry.bind("<Return>", self.scan_product)
+        self.scan_entry.bind("<KP_Enter>", self.scan_product)
+
+        self.scan_status = ttk.Label(scan_frame, text="", font=("Arial", 10))
+        self.scan_status.pack(side="left", padx=10)
+
         ttk.Button(
-            self.cart_frame,
+            scan_frame,
             text="Buscar Producto (F1)",
             command=self.open_product_search,
-        ).pack(fill="x", pady=5)
+        ).pack(side="right")
 
         self.cart_tree = ttk.Treeview(
             self.cart_frame,
@@ -238,6 +276,76 @@ class SalesFrame(ttk.Frame):
         )
         self.status_label.pack(pady=10)
 
+    def scan_product(self, event=None):
+        """Agrega al carrito el producto del código escaneado.
+
+        Acepta 'cantidad*código' para varias unidades; si el código no es un
+        código de barras conocido se prueba como ID del producto.
+        """
+        entrada = self.scan_var.get().strip()
+        self.scan_var.set("")
+        if not entrada:
+            return "break"
+
+        quantity = 1
+        cantidad, separador, codigo = entrada.partition("*")
+        if separador:
+            cantidad = cantidad.strip()
+            if not cantidad.isdecimal() or int(cantidad) <= 0:
+                self.show_scan_status(f"Cantidad inválida: {cantidad}", error=True)
+                return "break"
+            quantity, entrada = int(cantidad), codigo.strip()
+
+        producto = self.db.catalog.by_code(entrada)
+        if producto is None and entrada.isdecimal():
+            producto = self.db.catalog.get(entrada)
+        if producto is None:
+            self.show_scan_status(f"Código no encontrado: {entrada}", error=True)
+            return "break"
+
+        error = self.add_product_to_cart(producto, quantity)
+        if error:
+            self.show_scan_status(error, error=True)
+        else:
+            self.show_scan_status(f"+{quantity} {producto.nombre}")
+        return "break"
+
+    def show_scan_status(self, text, error=False):
+        """Muestra el resultado del último escaneo junto al campo de código."""
+        self.scan_status.config(
+            text=text, foreground="#dc3545" if error else "#28a745"
+        )
+        if error:
+            self.bell()
+
+    def add_product_to_cart(self, producto, quantity):
+        """Suma quantity unidades de un producto del catálogo al carrito.
+
+        Retorna un mensaje de error, o None si se agregó.
+        """
+        current_qty = self.cart.get(producto.id, {}).get("cantidad", 0)
+        if (current_qty + quantity) > producto.stock:
+            return f"Solo hay {producto.stock} unidades disponibles de {producto.nombre}"
+
+        # Reservar contra el stock actual de la base (otras cajas pueden
+        # haber vendido o reservado desde que se cargó el catálogo)
+        reservado, disponible = self.db.reserve_stock(
+            producto.id, current_qty + quantity, caja=self.reservas
+        )
+        if not reservado:
+            return (
+                f"Solo hay {disponible} unidades disponibles de {producto.nombre} "
+                "(el resto está vendido o reservado en otra caja)"
+            )
+
+        self.cart.add(
+            producto.id,
+            quantity,
+            nombre=producto.nombre,
+            precio_unitario=producto.precio,
+        )
+        return None
+
     def open_product_search(self):
         """Abre ventana de búsqueda de productos."""
         search_win = Toplevel(self.app)
@@ -259,9 +367,6 @@ class SalesFrame(ttk.Frame):
         ttk.Label(search_frame, text="Buscar:").pack(side="left", padx=5)
         search_entry = ttk.Entry(search_frame, textvariable=search_var, width=40)
         search_entry.pack(side="left", fill="x", expand=True, padx=5)
-        search_entry.bind(
-            "<KeyRelease>", lambda e: self.filter_search(tree, search_var.get())
-        )
 
         tree = ttk.Treeview(
             search_win,
@@ -310,83 +415,61 @@ class SalesFrame(ttk.Frame):
             command=lambda: self.add_from_search(tree, qty_var.get(), search_win),
         ).pack(fill="x", pady=5)
 
+        SearchController(
+            search_win,
+            search_var,
+            self.db,
+            fetch=self.search_products_pos,
+            on_results=lambda products: self.show_products_search(tree, products),
+            on_empty=lambda: self.load_products_search(tree),
+        )
         self.load_products_search(tree)
 
     def load_products_search(self, tree):
-        """Carga productos en la ventana de búsqueda."""
+        """Carga productos con stock en la ventana de búsqueda (desde el catálogo)."""
+        self.db.run_async(
+            lambda: self.db.catalog.all(solo_con_stock=True),
+            lambda products: self.show_products_search(tree, products),
+            key="pos_busqueda",
+            owner=tree,
+        )
+
+    def search_products_pos(self, search_term, limit):
+        """Productos con stock que coinciden con el término (catálogo en memoria)."""
+        return self.db.catalog.search(search_term, limit, solo_con_stock=True)
+
+    def show_products_search(self, tree, products):
+        """Muestra los productos en la ventana de búsqueda (iid = id del producto)."""
         for item in tree.get_children():
             tree.delete(item)
 
-        products = self.db.fetch(
-            "SELECT id, nombre, stock, precio, descripcion FROM Productos WHERE stock > 0"
-        )
-
         for prod in products:
             tree.insert(
                 "",
                 "end",
-                values=(prod[0], prod[1], prod[2], f"${prod[3]:.2f}"),
-                tags=(prod,),
+                iid=str(prod.id),
+                values=(prod.id, prod.nombre, prod.stock, f"${prod.precio:.2f}"),
             )
 
-    def filter_search(self, tree, search_term):
-        """Filtra productos en búsqueda."""
-        for item in tree.get_children():
-            tree.delete(item)
-
-        if not search_term:
-            self.load_products_search(tree)
-            return
-
-        products = self.db.fetch(
-            "SELECT id, nombre, stock, precio, descripcion FROM Productos WHERE stock > 0"
-        )
-
-        search_lower = search_term.lower()
-        for prod in products:
-            if search_lower in prod[1].lower():
-                tree.insert(
-                    "",
-                    "end",
-                    values=(prod[0], prod[1], prod[2], f"${prod[3]:.2f}"),
-                    tags=(prod,),
-                )
-
     def show_product_detail(self, tree, detail_frame):
         """Muestra detalle del producto seleccionado."""
         selected = tree.focus()
         if not selected:
             return
 
-        try:
-            values = tree.item(selected, "values")
-
-            if not values or len(values) < 4:
-                self.detail_label.config(
-                    text="Error: No se pudieron cargar los datos del producto"
-                )
-                return
-
-            nombre = values[1]
-            stock = values[2]
-            precio_str = values[3].replace("$", "").replace(",", "")
-            precio = float(precio_str)
-
-            prod_id = values[0]
-            result = self.db.fetch(
-                "SELECT descripcion FROM Productos WHERE id = ?", (prod_id,)
+        producto = self.db.catalog.get(selected)
+        if producto is None:
+            self.detail_label.config(
+                text="Error: No se pudieron cargar los datos del producto"
             )
-            desc = result[0][0] if result and result[0] else "Sin descripción"
-
-            detail_text = f"Nombre: {nombre}\n\n"
-            detail_text += f"Stock: {stock} unidades\n\n"
-            detail_text += f"Precio: ${precio:.2f}\n\n"
-            detail_text += f"Descripción:\n{desc or 'Sin descripción'}"
+            return
 
-            self.detail_label.config(text=detail_text)
+        detail_text = f"Nombre: {producto.nombre}\n\n"
+        detail_text += f"Stock: {producto.stock} unidades\n\n"
+        detail_text += f"Precio: ${producto.precio:.2f}\n\n"
+        detail_text += f"Descripción:\n{producto.descripcion or 'Sin descripción'}"
 
-        except (ValueError, IndexError, TypeError) as e:
-            self.detail_label.config(text=f"Error al cargar datos del producto: {e}")
+        self.detail_label.config(text=detail_text)
 
     def add_from_search(self, tree, quantity, window):
         """Añade producto al carrito desde búsqueda."""
@@ -400,86 +483,75 @@ class SalesFrame(ttk.Frame):
             return
 
         try:
-            item_values = tree.item(selected, "values")
+            producto = self.db.catalog.get(selected)
 
-            if not item_values or len(item_values) < 4:
+            if producto is None:
                 messagebox.showerror("Error", "No se encontraron datos del producto")
                 return
 
-            prod_id = int(item_values[0])
-            nombre = str(item_values[1])
-            stock = int(item_values[2])
-            precio_str = item_values[3].replace("$", "").replace(",", "")
-            precio = float(precio_str)
-
-            current_qty = self.cart.get(prod_id, {}).get("cantidad", 0)
-            if (current_qty + quantity) > stock:
-                messagebox.showerror(
-                    "Stock Insuficiente", f"Solo hay {stock} unidades disponibles"
-                )
+            error = self.add_product_to_cart(producto, quantity)
+            if error:
+                messagebox.showerror("Stock Insuficiente", error)
                 return
 
-            if prod_id in self.cart:
-                self.cart[prod_id]["cantidad"] += quantity
-            else:
-                self.cart[prod_id] = {
-                    "id": prod_id,
-                    "nombre": nombre,
-                    "precio_unitario": precio,
-                    "cantidad": quantity,
-                    "descuento_porcentaje": 0.0,
-                }
             window.destroy()
-            self.update_cart_display()
-            messagebox.showinfo("Éxito", f"{nombre} añadido al carrito")
+            messagebox.showinfo("Éxito", f"{producto.nombre} añadido al carrito")
+            self.scan_entry.focus_set()
 
         except (IndexError, ValueError, TypeError) as e:
             error_msg = f"Error al obtener datos del producto: {e}"
-            if "item_values" in locals():
-                error_msg += f"\nValues: {item_values}"
             error_msg += "\nIntente seleccionar el producto nuevamente."
             messagebox.showerror("Error", error_msg)
 
-    def update_cart_display(self):
-        """Actualiza la visualización del carrito."""
-        for item in self.cart_tree.get_children():
-            self.cart_tree.delete(item)
-
-        total = 0.0
-        total_descuentos = 0.0
-        productos_con_descuento = 0
-
-        for prod_id, data in self.cart.items():
-            cant = data["cantidad"]
-            precio = data["precio_unitario"]
-            desc_pct = data["descuento_porcentaje"]
+    def cart_row_values(self, prod_id, data):
+        """Valores de la fila del carrito para una línea."""
+        _, _, subtotal = totales_linea(data)
+        return (
+            prod_id,
+            data["nombre"],
+            data["cantidad"],
+            f"${data['precio_unitario']:.2f}",
+            f"{int(data['descuento_porcentaje']*100)}%",
+            f"${a_decimal(subtotal):.2f}",
+        )
 
-            desc_monto = (precio * cant) * desc_pct
-            subtotal = (precio * cant) - desc_monto
-            total += subtotal
-            total_descuentos += desc_monto
+    def on_cart_change(self, evento, prod_id, data):
+        """Redibuja solo la fila afectada por un cambio del carrito."""
+        if evento == "add":
+            self.cart_tree.insert(
+                "", "end", iid=prod_id, values=self.cart_row_values(prod_id, data)
+            )
+        elif evento == "update":
+            self.cart_tree.item(prod_id, values=self.cart_row_values(prod_id, data))
+        elif evento == "remove":
+            self.cart_tree.delete(prod_id)
+        else:
+            self.cart_tree.delete(*self.cart_tree.get_children())
+        self.update_cart_totals()
 
-            if desc_pct > 0:
-                productos_con_descuento += 1
+    def release_reservations(self, evento, prod_id, data):
+        """Libera el stock reservado de las líneas que salen del carrito."""
+        if evento == "remove":
+            self.db.release_stock(prod_id, caja=self.reservas)
+        elif evento == "clear":
+            self.db.release_stock(caja=self.reservas)
 
+    def update_cart_display(self):
+        """Redibuja el carrito completo."""
+        self.cart_tree.delete(*self.cart_tree.get_children())
+        for prod_id, data in self.cart.items():
             self.cart_tree.insert(
-                "",
-                "end",
-                iid=prod_id,
-                values=(
-                    prod_id,
-                    data["nombre"],
-                    cant,
-                    f"${precio:.2f}",
-                    f"{int(desc_pct*100)}%",
-                    f"${subtotal:.2f}",
-                ),
+                "", "end", iid=prod_id, values=self.cart_row_values(prod_id, data)
             )
+        self.update_cart_totals()
 
-        self.total_var.set(round(total, 2))
+    def update_cart_totals(self):
+        """Muestra los totales acumulados del carrito."""
+        self.total_var.set(float(self.cart.total))
 
+        productos_con_descuento = self.cart.con_descuento
         if productos_con_descuento > 0:
-            info_text = f"{productos_con_descuento} productos con descuento - Ahorro total: ${total_descuentos:.2f}"
+            info_text = f"{productos_con_descuento} productos con descuento - Ahorro total: ${self.cart.descuentos:.2f}"
             self.discount_info_label.config(text=info_text, foreground="#28a745")
         else:
             self.discount_info_label.config(text="", foreground="#666666")
@@ -489,15 +561,14 @@ class SalesFrame(ttk.Frame):
     def calculate_change(self, event=None):
         """Calcula el vuelto."""
         try:
-            total = self.total_var.get()
-            pagado = self.monto_pagado_var.get()
-            vuelto = pagado - total
+            pagado = a_centavos(self.monto_pagado_var.get())
+            vuelto = pagado - self.cart.total_centavos
 
-            self.vuelto_var.set(round(max(0, vuelto), 2))
+            self.vuelto_var.set(float(a_decimal(max(0, vuelto))))
 
             if vuelto < 0:
                 self.status_label.config(
-                    text=f"Falta: ${abs(vuelto):.2f}", foreground="#dc3545"
+                    text=f"Falta: ${a_decimal(-vuelto):.2f}", foreground="#dc3545"
                 )
             else:
                 self.status_label.config(
@@ -547,8 +618,7 @@ class SalesFrame(ttk.Frame):
         try:
             prod_id = int(self.cart_tree.item(selected, "values")[0])
             if prod_id in self.cart:
-                del self.cart[prod_id]
-                self.update_cart_display()
+                self.cart.remove(prod_id)
             else:
                 messagebox.showerror("Error", "Producto no encontrado en el carrito")
         except (ValueError, IndexError) as e:
@@ -560,8 +630,7 @@ class SalesFrame(ttk.Frame):
             return
 
         if messagebox.askyesno("Confirmar", "¿Limpiar todo el carrito?"):
-            self.cart = {}
-            self.update_cart_display()
+            self.cart.clear()
             self.monto_pagado_var.set(0.0)
             self.discount_combo.set("Sin descuento")
             # Resetear cliente a "Cliente General"
@@ -592,9 +661,7 @@ class SalesFrame(ttk.Frame):
                 return
 
             descuento_porcentaje = discount_info["porcentaje"]
-            self.cart[prod_id]["descuento_porcentaje"] = descuento_porcentaje
-
-            self.update_cart_display()
+            self.cart.update(prod_id, descuento_porcentaje=descuento_porcentaje)
 
             if descuento_porcentaje > 0:
                 messagebox.showinfo(
@@ -641,11 +708,9 @@ class SalesFrame(ttk.Frame):
             productos_afectados = 0
 
             for prod_id in self.cart:
-                self.cart[prod_id]["descuento_porcentaje"] = descuento_porcentaje
+                self.cart.update(prod_id, descuento_porcentaje=descuento_porcentaje)
                 productos_afectados += 1
 
-            self.update_cart_display()
-
             if descuento_porcentaje > 0:
                 messagebox.showinfo(
                     "Descuento Aplicado",
@@ -666,9 +731,7 @@ class SalesFrame(ttk.Frame):
             messagebox.showwarning("Advertencia", "El carrito está vacío")
             return
 
-        productos_con_descuento = sum(
-            1 for item in self.cart.values() if item.get("descuento_porcentaje", 0) > 0
-        )
+        productos_con_descuento = self.cart.con_descuento
 
         if productos_con_descuento == 0:
             messagebox.showinfo(
@@ -685,10 +748,9 @@ class SalesFrame(ttk.Frame):
             productos_afectados = 0
             for prod_id in self.cart:
                 if self.cart[prod_id].get("descuento_porcentaje", 0) > 0:
-                    self.cart[prod_id]["descuento_porcentaje"] = 0.0
+                    self.cart.update(prod_id, descuento_porcentaje=0.0)
                     productos_afectados += 1
 
-            self.update_cart_display()
             self.discount_combo.set("Sin descuento")
 
             messagebox.showinfo(
@@ -705,17 +767,20 @@ class SalesFrame(ttk.Frame):
             messagebox.showwarning("Advertencia", "El carrito está vacío")
             return
 
-        total = self.total_var.get()
-        pagado = self.monto_pagado_var.get()
+        total = self.cart.total
+        try:
+            pagado = a_decimal(a_centavos(self.monto_pagado_var.get()))
+        except tk.TclError:
+            messagebox.showerror("Error", "Monto recibido inválido")
+            return
 
         if pagado < total:
             messagebox.showerror("Error", "Monto insuficiente")
             return
 
-        vuelto = self.vuelto_var.get()
-        venta_id = (
-            f"V-{datetime.now().strftime('%Y%m%d%H%M%S')}-{random.randint(100, 999)}"
-        )
+        vuelto = pagado - total
+        # Número que tendrá la factura; se asigna definitivamente al confirmar
+        venta_id = self.db.peek_sale_id()
         fecha = datetime.now().strftime("%Y-%m-%d %H:%M:%S")
 
         # Guardar datos temporales para confirmar después
@@ -726,7 +791,7 @@ class SalesFrame(ttk.Frame):
             "pagado": pagado,
             "vuelto": vuelto,
             "cliente_id": self.selected_client_id,
-            "cart_snapshot": dict(self.cart),  # Copia del carrito
+            "cart_snapshot": self.cart.snapshot(),  # Copia del carrito
         }
 
         # Mostrar ventana de vista previa (sin procesar la venta)
@@ -1024,23 +1089,7 @@ class SalesFrame(ttk.Frame):
         cliente_info = self.get_client_info_for_receipt(venta_id)
 
         # Encabezado de la empresa
-        lines.append("=" * width)
-        lines.append("R.T.N.: 12011972000081".center(width))
-        lines.append("PODEGA Y COMERCIAL RIVERA".center(width))
-        lines.append("TEL.: 2774-1192 / 9967-7300".center(width))
-        lines.append(
-            "DIRECCIÓN: Bo. La Mercedes, Colonia la Ermita, 1ra Calle, 14-62, frente a Farmacia Santa, La Paz, Honduras".center(
-                width
-            )
-        )
-        lines.append("EMAIL: freddyrivera2015@gmail.com".center(width))
-        lines.append("=" * width)
-        lines.append("")
-        lines.append("FACTURA".center(width))
-        lines.append(f"No. 0000-0001-{venta_id.split('-')[-1]}".center(width))
-        lines.append("Página 1 de 1".center(width))
-        lines.append("=" * width)
-        lines.append("")
+        lines.extend(encabezado_texto(width, venta_id))
 
         # Información del cliente (si existe)
         if cliente_info:
@@ -1070,14 +1119,11 @@ class SalesFrame(ttk.Frame):
 
         # Items de la venta
         cart_data = self.pending_sale.get("cart_snapshot", self.cart)
-        subtotal_gravado = 0.0
+        filas, gravado_centavos = lineas_venta(cart_data)
 
-        for prod_id, data in cart_data.items():
+        for prod_id, data, subtotal in filas:
             cant = data["cantidad"]
             precio = data["precio_unitario"]
-            desc_pct = data["descuento_porcentaje"]
-            subtotal = (precio * cant) * (1 - desc_pct)
-            subtotal_gravado += subtotal
 
             codigo = str(prod_id).zfill(8)  # Código reducido para ticket
             nombre = data["nombre"][:10]  # Limitar nombre a 10 caracteres
@@ -1093,8 +1139,7 @@ class SalesFrame(ttk.Frame):
         lines.append("")
 
         # Monto en letras
-        total_entero = int(total)
-        total_centavos = int(round((total - total_entero) * 100))
+        total_entero, total_centavos = importe_en_palabras(a_centavos(total))
         lines.append(
             f"SON: {self.number_to_words(total_entero).upper()} LEMPIRAS CON {total_centavos:02d}/100"
         )
@@ -1107,19 +1152,7 @@ class SalesFrame(ttk.Frame):
         lines.append("")
 
         # Resumen de impuestos (ejemplo fijo: 15%)
-        impuesto_15 = subtotal_gravado * 0.15
-        total_con_impuesto = subtotal_gravado + impuesto_15
-
-        lines.append(f"{'Concepto':<15}{'Total':>10}")
-        lines.append("-" * 25)
-        lines.append(f"{'Sub Total':<15}L{subtotal_gravado:>8.2f}")
-        lines.append(f"{'Exento':<15}L{0.00:>8.2f}")
-        lines.append(f"{'Gravado 15%':<15}L{subtotal_gravado:>8.2f}")
-        lines.append(f"{'Gravado 18%':<15}L{0.00:>8.2f}")
-        lines.append(f"{'Impuesto 15%':<15}L{impuesto_15:>8.2f}")
-        lines.append(f"{'Impuesto 18%':<15}L{0.00:>8.2f}")
-        lines.append("-" * 25)
-        lines.append(f"{'TOTAL:':<15}L{total_con_impuesto:>8.2f}")
+        lines.extend(resumen_impuestos_texto(gravado_centavos, 15, 10))
         lines.append("")
 
         # Información de pago
@@ -1144,23 +1177,7 @@ class SalesFrame(ttk.Frame):
         cliente_info = self.get_client_info_for_receipt(venta_id)
 
         # Encabezado de la empresa
-        lines.append("=" * width)
-        lines.append("R.T.N.: 12011972000081".center(width))
-        lines.append("PODEGA Y COMERCIAL RIVERA".center(width))
-        lines.append("TEL.: 2774-1192 / 9967-7300".center(width))
-        lines.append(
-            "DIRECCIÓN: Bo. La Mercedes, Colonia la Ermita, 1ra Calle, 14-62, frente a Farmacia Santa, La Paz, Honduras".center(
-                width
-            )
-        )
-        lines.append("EMAIL: freddyrivera2015@gmail.com".center(width))
-        lines.append("=" * width)
-        lines.append("")
-        lines.append("FACTURA".center(width))
-        lines.append(f"No. 0000-0001-{venta_id.split('-')[-1]}".center(width))
-        lines.append("Página 1 de 1".center(width))
-        lines.append("=" * width)
-        lines.append("")
+        lines.extend(encabezado_texto(width, venta_id))
 
         # Información del cliente (si existe)
         if cliente_info:
@@ -1184,14 +1201,11 @@ class SalesFrame(ttk.Frame):
 
         # Items de la venta
         cart_data = self.pending_sale.get("cart_snapshot", self.cart)
-        subtotal_gravado = 0.0
+        filas, gravado_centavos = lineas_venta(cart_data)
 
-        for prod_id, data in cart_data.items():
+        for prod_id, data, subtotal in filas:
             cant = data["cantidad"]
             precio = data["precio_unitario"]
-            desc_pct = data["descuento_porcentaje"]
-            subtotal = (precio * cant) * (1 - desc_pct)
-            subtotal_gravado += subtotal
 
             codigo = str(prod_id).zfill(13)  # Código de 13 dígitos
             nombre = data["nombre"][:28]  # Limitar nombre a 28 caracteres
@@ -1207,8 +1221,7 @@ class SalesFrame(ttk.Frame):
         lines.append("")
 
         # Monto en letras
-        total_entero = int(total)
-        total_centavos = int(round((total - total_entero) * 100))
+        total_entero, total_centavos = importe_en_palabras(a_centavos(total))
         lines.append(
             f"SON: {self.number_to_words(total_entero).upper()} LEMPIRAS CON {total_centavos:02d}/100"
         )
@@ -1221,19 +1234,7 @@ class SalesFrame(ttk.Frame):
         lines.append("")
 
         # Resumen de impuestos (ejemplo fijo: 15%)
-        impuesto_15 = subtotal_gravado * 0.15
-        total_con_impuesto = subtotal_gravado + impuesto_15
-
-        lines.append(f"{'Concepto':<30}{'Total':>15}")
-        lines.append("-" * 45)
-        lines.append(f"{'Sub Total':<30}L{subtotal_gravado:>13.2f}")
-        lines.append(f"{'Exento':<30}L{0.00:>13.2f}")
-        lines.append(f"{'Gravado 15%':<30}L{subtotal_gravado:>13.2f}")
-        lines.append(f"{'Gravado 18%':<30}L{0.00:>13.2f}")
-        lines.append(f"{'Impuesto 15%':<30}L{impuesto_15:>13.2f}")
-        lines.append(f"{'Impuesto 18%':<30}L{0.00:>13.2f}")
-        lines.append("-" * 45)
-        lines.append(f"{'TOTAL:':<30}L{total_con_impuesto:>13.2f}")
+        lines.extend(resumen_impuestos_texto(gravado_centavos, 30, 15))
         lines.append("")
 
         # Información de pago
@@ -1434,11 +1435,14 @@ class SalesFrame(ttk.Frame):
         try:
             cart_data = self.pending_sale.get("cart_snapshot", {})
 
-            # 🔹 Guardar venta en base de datos
-            self.db.execute(
-                "INSERT INTO Ventas (id, fecha, total, monto_pagado, vuelto, usuario_id, id_cliente, tipo_recibo) VALUES (?, ?, ?, ?, ?, ?, ?, ?)",
+            # 🔹 Detalle de la venta
+            detalles = detalles_venta(cart_data)
+
+            # 🔹 Guardar venta, detalle y stock en una sola transacción (aquí
+            # se asigna el número de factura definitivo)
+            venta_id = self.db.register_sale(
                 (
-                    venta_id,
+                    None,
                     fecha,
                     total,
                     pagado,
@@ -1447,37 +1451,19 @@ class SalesFrame(ttk.Frame):
                     self.pending_sale.get("cliente_id"),
                     "HTML",
                 ),
+                detalles,
+                reservas=self.reservas,
             )
 
-            # 🔹 Guardar detalle y actualizar stock
-            for prod_id, data in cart_data.items():
-                cant = data["cantidad"]
-                precio = data["precio_unitario"]
-                desc_pct = data["descuento_porcentaje"]
-                desc_monto = (precio * cant) * desc_pct
-                subtotal = (precio * cant) - desc_monto
-
-                self.db.execute(
-                    "INSERT INTO DetalleVenta (venta_id, producto_id, nombre_producto, cantidad, precio_unitario, descuento, subtotal) VALUES (?, ?, ?, ?, ?, ?, ?)",
-                    (
-                        venta_id,
-                        prod_id,
-                        data["nombre"],
-                        cant,
-                        precio,
-                        desc_monto,
-                        subtotal,
-                    ),
-                )
-
-                self.db.execute(
-                    "UPDATE Productos SET stock = stock - ? WHERE id = ?",
-                    (cant, prod_id),
-                )
-
             # 🔹 Limpiar carrito y actualizar interfaz
-            self.cart = {}
-            self.update_cart_display()
+            self.cart.clear()
+            self.scan_status.config(text="")
+            # Recargar el catálogo (stock nuevo) en segundo plano, antes del
+            # próximo escaneo
+            self.db.run_async(
+                lambda: self.db.catalog.ensure_fresh(force=True),
+                key="catalogo_refresco",
+            )
             self.monto_pagado_var.set(0.0)
             self.discount_combo.set("Sin descuento")
 
@@ -1506,6 +1492,12 @@ class SalesFrame(ttk.Frame):
             if action == "yes":
                 self.print_receipt(html_content, window)
 
+        except InsufficientStockError as e:
+            # Nada se registró: el carrito queda igual para ajustarlo
+            messagebox.showerror(
+                "Stock Insuficiente",
+                f"{e}\n\nAjuste las cantidades del carrito y confirme de nuevo.",
+            )
         except Exception as e:
             messagebox.showerror("Error", f"Error al procesar venta: {e}")
 
@@ -1525,10 +1517,8 @@ class SalesFrame(ttk.Frame):
 
         for data in self.cart.values():
             cant = data["cantidad"]
-            precio = data["precio_unitario"]
             desc_pct = data["descuento_porcentaje"]
-            desc_monto = (precio * cant) * desc_pct
-            subtotal = (precio * cant) - desc_monto
+            subtotal = a_decimal(totales_linea(data)[2])
 
             nombre = data["nombre"][:18]
             desc_text = f" (-{int(desc_pct*100)}%)" if desc_pct > 0 else ""
@@ -1785,220 +1775,60 @@ class SalesFrame(ttk.Frame):
             cart_data = self.pending_sale.get("cart_snapshot", self.cart)
 
         # Obtener información del cliente
-        cliente_info = None
-        cliente_id = (
-            self.pending_sale.get("cliente_id")
-            if hasattr(self, "pending_sale") and self.pending_sale
-            else None
-        )
-
-        # Si no hay cliente_id en pending_sale, intentar obtenerlo de la venta en la BD
-        if not cliente_id and venta_id:
-            venta_data = self.db.fetch(
-                "SELECT id_cliente FROM Ventas WHERE id = ?", (venta_id,)
-            )
-            if venta_data and venta_data[0][0]:
-                cliente_id = venta_data[0][0]
-
-        if cliente_id:
-            cliente_data = self.db.fetch(
-                "SELECT nombre, apellido, dni, telefono, direccion FROM Clientes WHERE id = ?",
-                (cliente_id,),
-            )
-            if cliente_data:
-                cliente_info = {
-                    "nombre": cliente_data[0][0],
-                    "apellido": cliente_data[0][1],
-                    "dni": cliente_data[0][2],
-                    "telefono": cliente_data[0][3],
-                    "direccion": cliente_data[0][4],
-                }
+        cliente_info = self.get_client_info_for_receipt(venta_id)
 
         # Determinar formato (ticket/carta) según configuración o variable
         paper_size = getattr(self, "paper_size_var", None)
         mode = paper_size.get() if paper_size else "ticket"
 
-        # Encabezado de empresa
-        empresa = {
-            "rtn": "12011972000081",
-            "nombre": "PODEGA Y COMERCIAL RIVERA",
-            "tel": "2774-1192 / 9967-7300",
-            "direccion": "Bo. La Mercedes, Colonia la Ermita, 1ra Calle, 14-62, frente a Farmacia Santa, La Paz, Honduras",
-            "email": "freddyrivera2015@gmail.com",
-        }
-
         # Estilos básicos
         if mode == "ticket":
             width = "350px"
             font_size = "12px"
-            table_width = "100%"
         else:
             width = "700px"
             font_size = "15px"
-            table_width = "100%"
 
-        # Calcular totales e impuestos
-        subtotal_gravado = 0.0
-        items_html = ""
-        for prod_id, data in cart_data.items():
-            cant = data["cantidad"]
-            precio = data["precio_unitario"]
+        # Filas de productos y totales en una pasada
+        filas, gravado_centavos = lineas_venta(cart_data)
+        items = []
+        for prod_id, data, subtotal in filas:
             desc_pct = data["descuento_porcentaje"]
-            desc_monto = (precio * cant) * desc_pct
-            subtotal = (precio * cant) - desc_monto
-            subtotal_gravado += subtotal
-
-            codigo = str(prod_id).zfill(8 if mode == "ticket" else 13)
             nombre = data["nombre"][:10] if mode == "ticket" else data["nombre"][:28]
             desc_text = f" (-{int(desc_pct*100)}%)" if desc_pct > 0 else ""
+            items.append(
+                {
+                    "CANT": data["cantidad"],
+                    "CODIGO": str(prod_id).zfill(8 if mode == "ticket" else 13),
+                    "PRODUCTO": nombre + desc_text,
+                    "PRECIO": f"{data['precio_unitario']:.2f}",
+                    "SUBTOTAL": f"{subtotal:.2f}",
+                }
+            )
 
-            items_html += f"""
-            <tr>
-                <td>{cant}</td>
-                <td>{codigo}</td>
-                <td>{nombre}{desc_text}</td>
-                <td>L {precio:.2f}</td>
-                <td>L {subtotal:.2f}</td>
-            </tr>
-            """
-
-        impuesto_15 = subtotal_gravado * 0.15
-        total_con_impuesto = subtotal_gravado + impuesto_15
-        total_entero = int(total)
-        total_centavos = int(round((total - total_entero) * 100))
+        subtotal_gravado, impuesto_15, total_con_impuesto = impuestos(gravado_centavos)
+        total_entero, total_centavos = importe_en_palabras(a_centavos(total))
         monto_letras = f"{self.number_to_words(total_entero).upper()} LEMPIRAS CON {total_centavos:02d}/100"
 
-        # HTML completo
-        html_content = f"""
-        <html>
-        <head>
-            <meta charset="utf-8">
-            <title>Recibo de Venta {venta_id}</title>
-            <style>
-                body {{
-                    width: {width};
-                    font-family: 'Courier New', Courier, monospace;
-                    font-size: {font_size};
-                    margin: 0 auto;
-                    background: #fff;
-                    color: #222;
-                }}
-                .header, .footer {{
-                    text-align: center;
-                    margin-bottom: 10px;
-                }}
-                .title {{
-                    font-size: 1.2em;
-                    font-weight: bold;
-                    color: #dc3545;
-                }}
-                table {{
-                    width: {table_width};
-                    border-collapse: collapse;
-                    margin-bottom: 10px;
-                }}
-                th, td {{
-                    border-bottom: 1px solid #ddd;
-                    padding: 4px 6px;
-                    text-align: left;
-                }}
-                th {{
-                    background: #f8f8f8;
-                }}
-                .totals td {{
-                    font-weight: bold;
-                }}
-                .observaciones {{
-                    margin-top: 10px;
-                    font-size: 0.95em;
-                    color: #555;
-                }}
-            </style>
-        </head>
-        <body>
-            <div class="header">
-                <div>{empresa["nombre"]}</div>
-                <div>R.T.N.: {empresa["rtn"]}</div>
-                <div>Tel: {empresa["tel"]}</div>
-                <div>{empresa["direccion"]}</div>
-                <div>Email: {empresa["email"]}</div>
-                <hr>
-                <div class="title">FACTURA</div>
-                <div>No. 0000-0001-{venta_id.split('-')[-1]}</div>
-                <div>Fecha: {fecha}</div>
-            </div>"""
-
-        # Agregar información del cliente si existe
-        if cliente_info:
-            cliente_section = f"""
-            <div style="margin: 15px 0; padding: 8px; border: 1px solid #ddd; background: #f9f9f9;">
-                <div style="font-weight: bold; margin-bottom: 5px;">DATOS DEL CLIENTE:</div>
-                <div><strong>Nombre:</strong> {cliente_info['nombre']} {cliente_info['apellido']}</div>"""
-
-            if cliente_info["dni"]:
-                cliente_section += (
-                    f"""<div><strong>DNI:</strong> {cliente_info['dni']}</div>"""
-                )
-
-            if cliente_info["telefono"]:
-                cliente_section += f"""<div><strong>Teléfono:</strong> {cliente_info['telefono']}</div>"""
-
-            if cliente_info["direccion"]:
-                cliente_section += f"""<div><strong>Dirección:</strong> {cliente_info['direccion']}</div>"""
-
-            cliente_section += """
-            </div>"""
-
-            html_content += cliente_section
-
-        html_content += f"""
-            <table>
-                <tr>
-                    <th>Cant.</th>
-                    <th>Código</th>
-                    <th>Producto</th>
-                    <th>P.Unit</th>
-                    <th>Subtotal</th>
-                </tr>
-                {items_html}
-            </table>
-            <table>
-                <tr class="totals"><td colspan="4" style="text-align:right;">TOTAL:</td><td>L {total:.2f}</td></tr>
-                <tr><td colspan="5">{monto_letras}</td></tr>
-            </table>
-            <table>
-                <tr><td>Orden de Compra Exenta:</td></tr>
-                <tr><td>Constancia Registro Exento:</td></tr>
-                <tr><td>Desc. y Rebajas Otorgados:</td></tr>
-            </table>
-            <table>
-                <tr><th>Concepto</th><th>Total</th></tr>
-                <tr><td>Sub Total</td><td>L {subtotal_gravado:.2f}</td></tr>
-                <tr><td>Exento</td><td>L 0.00</td></tr>
-                <tr><td>Gravado 15%</td><td>L {subtotal_gravado:.2f}</td></tr>
-                <tr><td>Gravado 18%</td><td>L 0.00</td></tr>
-                <tr><td>Impuesto 15%</td><td>L {impuesto_15:.2f}</td></tr>
-                <tr><td>Impuesto 18%</td><td>L 0.00</td></tr>
-                <tr class="totals"><td>TOTAL:</td><td>L {total_con_impuesto:.2f}</td></tr>
-            </table>
-            <table>
-                <tr><td>Monto Recibido:</td><td>L {pagado:.2f}</td></tr>
-                <tr><td>Vuelto:</td><td>L {vuelto:.2f}</td></tr>
-            </table>
-            <div class="observaciones">
-                Observaciones:<br>
-                <br>
-            </div>
-            <div class="footer">
-                <hr>
-                Original - Cliente
-                <br>
-                Gracias por su compra
-            </div>
-        </body>
-        </html>
-        """
-        return html_content
+        return FACTURA_HTML.render(
+            {
+                "ID_VENTA": venta_id,
+                "ANCHO": width,
+                "FUENTE": font_size,
+                "ENCABEZADO": ENCABEZADO_HTML,
+                "NUMERO": numero_factura(venta_id),
+                "FECHA": fecha,
+                "CLIENTE": cliente_html(cliente_info),
+                "ITEMS": FILA_FACTURA_HTML.render_items(items),
+                "TOTAL": f"{total:.2f}",
+                "MONTO_LETRAS": monto_letras,
+                "SUBTOTAL": f"{subtotal_gravado:.2f}",
+                "IMPUESTO": f"{impuesto_15:.2f}",
+                "TOTAL_IMPUESTO": f"{total_con_impuesto:.2f}",
+                "MONTO_PAGADO": f"{pagado:.2f}",
+                "VUELTO": f"{vuelto:.2f}",
+            }
+        )
 
     def format_receipt_for_preview(self, venta_id, total, pagado, vuelto, fecha):
         """Método legacy para compatibilidad,,."""
@@ -6,9 +6,15 @@ Sistema de Ventas Mayoristas Profesional - Versión Corregida
 from tkinter import ttk, messagebox, Toplevel, filedialog, StringVar, IntVar
 import tkinter as tk
 from datetime import datetime
-import random
 import os
-import json
+
+from cart import CartModel, detalles_venta, totales_linea
+from database import InsufficientStockError
+from money import a_centavos, a_decimal, importe_en_palabras
+from receipts import EMPRESA, encabezado_texto, lineas_venta, numero_factura, resumen_impuestos_texto
+
+from .search_controller import SearchController
+from .virtual_tree import VirtualTreeview
 
 
 class WholesaleSalesFrame(ttk.Frame):
@@ -18,9 +24,13 @@ class WholesaleSalesFrame(ttk.Frame):
         super().__init__(parent, padding="10")
         self.app = app
         self.db = app.db
+        # Carrito dueño de las reservas de stock, distinto del de la pantalla POS
+        self.reservas = f"{self.db.terminal_name()}-MAY"
         
         # Variables de estado
-        self.cart = {}
+        self.cart = CartModel()
+        self.cart.subscribe(self.on_cart_change)
+        self.cart.subscribe(self.release_reservations)
         self.current_step = 1
         self.cliente_data = {}
         self.venta_id = None
@@ -126,7 +136,6 @@ class WholesaleSalesFrame(ttk.Frame):
         self.search_var = tk.StringVar()
         search_entry = ttk.Entry(search_frame, textvariable=self.search_var, font=("Arial", 11))
         search_entry.pack(side="left", fill="x", expand=True, padx=5)
-        search_entry.bind("<KeyRelease>", self.filter_products)
         
         ttk.Button(search_frame, text="🔄", command=self.load_products, width=3).pack(side="left")
         
@@ -134,21 +143,17 @@ class WholesaleSalesFrame(ttk.Frame):
         products_frame = ttk.LabelFrame(tab, text="📋 Catálogo", padding="10")
         products_frame.grid(row=1, column=0, sticky="nsew", padx=(0, 5))
         
-        # Scrollbars
-        scroll_y = ttk.Scrollbar(products_frame, orient="vertical")
-        scroll_x = ttk.Scrollbar(products_frame, orient="horizontal")
-        
-        self.products_tree = ttk.Treeview(
+        # Lista virtual: solo crea las filas visibles y pide páginas al desplazarse
+        self.products_list = VirtualTreeview(
             products_frame,
-            columns=("ID", "Producto", "Stock", "Estado", "Precio"),
-            show="headings",
-            yscrollcommand=scroll_y.set,
-            xscrollcommand=scroll_x.set,
-            height=12
+            ("ID", "Producto", "Stock", "Estado", "Precio"),
+            db=self.db,
+            height=12,
+            formatter=self.format_product,
+            row_key=lambda prod: prod.id,
+            xscroll=True
         )
-        
-        scroll_y.config(command=self.products_tree.yview)
-        scroll_x.config(command=self.products_tree.xview)
+        self.products_tree = self.products_list.tree
         
         # Configurar columnas
         self.products_tree.heading("ID", text="ID")
@@ -163,9 +168,7 @@ class WholesaleSalesFrame(ttk.Frame):
         self.products_tree.column("Estado", width=100, anchor="center")
         self.products_tree.column("Precio", width=90, anchor="center")
         
-        self.products_tree.grid(row=0, column=0, sticky="nsew")
-        scroll_y.grid(row=0, column=1, sticky="ns")
-        scroll_x.grid(row=1, column=0, sticky="ew")
+        self.products_list.grid(row=0, column=0, sticky="nsew")
         
         products_frame.grid_rowconfigure(0, weight=1)
         products_frame.grid_columnconfigure(0, weight=1)
@@ -176,7 +179,17 @@ class WholesaleSalesFrame(ttk.Frame):
         self.products_tree.tag_configure("normal", background="#e8f5e9", foreground="#2e7d32")
         self.products_tree.tag_configure("good", background="#ffffff", foreground="#424242")
         
-        self.products_tree.bind("<<TreeviewSelect>>", self.on_product_select)
+        self.products_list.on_select(self.on_product_select)
+        
+        # Búsqueda al escribir: por nombre o por ID
+        self.search = SearchController(
+            self,
+            self.search_var,
+            self.db,
+            fetch=self.search_products,
+            on_results=self.products_list.set_rows,
+            on_empty=self.load_products
+        )
         self.products_tree.bind("<Double-1>", lambda e: self.quick_add())
         
         # Panel derecho
@@ -472,105 +485,63 @@ class WholesaleSalesFrame(ttk.Frame):
     # ============ MÉTODOS DE PRODUCTOS ============
     
     def load_products(self):
-        """Carga productos con indicadores de stock."""
-        for item in self.products_tree.get_children():
-            self.products_tree.delete(item)
-        
-        try:
-            products = self.db.fetch(
-                "SELECT id, nombre, stock, precio, descripcion FROM Productos WHERE stock >= 0 ORDER BY nombre"
-            )
-            
-            for prod in products:
-                prod_id, nombre, stock, precio, desc = prod
-                
-                if stock == 0:
-                    estado = "❌ SIN STOCK"
-                    tag = "critical"
-                elif stock < 10:
-                    estado = "⚠️ MUY BAJO"
-                    tag = "critical"
-                elif stock < 50:
-                    estado = "⚡ BAJO"
-                    tag = "low"
-                elif stock < 100:
-                    estado = "✅ NORMAL"
-                    tag = "normal"
-                else:
-                    estado = "✅ DISPONIBLE"
-                    tag = "good"
-                
-                self.products_tree.insert(
-                    "",
-                    "end",
-                    values=(prod_id, nombre, stock, estado, f"L {precio:.2f}"),
-                    tags=(tag, json.dumps({"id": prod_id, "nombre": nombre, "stock": stock, "precio": precio, "desc": desc}))
-                )
-        except Exception as e:
-            messagebox.showerror("Error", f"Error al cargar productos: {e}")
+        """Carga productos con indicadores de stock (desde el catálogo en memoria)."""
+        self.db.run_async(
+            self.db.catalog.all,
+            self.products_list.set_rows,
+            key="mayorista_catalogo",
+            owner=self
+        )
 
-    def filter_products(self, event=None):
-        """Filtra productos en tiempo real."""
-        search_term = self.search_var.get().lower()
-        
-        for item in self.products_tree.get_children():
-            self.products_tree.delete(item)
+    def format_product(self, prod):
+        """Valores y tags de un producto en el catálogo, según su stock."""
+        prod_id, nombre, stock, precio = prod.id, prod.nombre, prod.stock, prod.precio
+        
+        if stock == 0:
+            estado = "❌ SIN STOCK"
+            tag = "critical"
+        elif stock < 10:
+            estado = "⚠️ MUY BAJO"
+            tag = "critical"
+        elif stock < 50:
+            estado = "⚡ BAJO"
+            tag = "low"
+        elif stock < 100:
+            estado = "✅ NORMAL"
+            tag = "normal"
+        else:
+            estado = "✅ DISPONIBLE"
+            tag = "good"
         
-        try:
-            products = self.db.fetch(
-                "SELECT id, nombre, stock, precio, descripcion FROM Productos WHERE stock >= 0 ORDER BY nombre"
-            )
-            
-            for prod in products:
-                prod_id, nombre, stock, precio, desc = prod
-                
-                if search_term in nombre.lower() or search_term in str(prod_id):
-                    if stock == 0:
-                        estado = "❌ SIN STOCK"
-                        tag = "critical"
-                    elif stock < 10:
-                        estado = "⚠️ MUY BAJO"
-                        tag = "critical"
-                    elif stock < 50:
-                        estado = "⚡ BAJO"
-                        tag = "low"
-                    elif stock < 100:
-                        estado = "✅ NORMAL"
-                        tag = "normal"
-                    else:
-                        estado = "✅ DISPONIBLE"
-                        tag = "good"
-                    
-                    self.products_tree.insert(
-                        "",
-                        "end",
-                        values=(prod_id, nombre, stock, estado, f"L {precio:.2f}"),
-                        tags=(tag, json.dumps({"id": prod_id, "nombre": nombre, "stock": stock, "precio": precio, "desc": desc}))
-                    )
-        except Exception as e:
-            pass
+        values = (prod_id, nombre, stock, estado, f"L {precio:.2f}")
+        return values, (tag,)
 
-    def on_product_select(self, event=None):
-        """Muestra detalle del producto seleccionado."""
+    def search_products(self, search_term, limit):
+        """Productos cuyo nombre coincide con el término, o con ese ID (catálogo)."""
+        return self.db.catalog.search(search_term, limit)
+
+    def selected_product(self):
+        """Registro del catálogo para la fila con foco (su iid es el ID del producto)."""
         selected = self.products_tree.focus()
         if not selected:
-            return
-        
-        tags = self.products_tree.item(selected, "tags")
-        if len(tags) < 2:
+            return None
+        return self.db.catalog.get(selected)
+
+    def on_product_select(self, event=None):
+        """Muestra detalle del producto seleccionado."""
+        data = self.selected_product()
+        if data is None:
             return
         
         try:
-            data = json.loads(tags[1])
-            
             self.detail_text.config(state="normal")
             self.detail_text.delete("1.0", tk.END)
             
-            detail = f"🏷️ {data['nombre']}\n\n"
-            detail += f"ID: {data['id']}\n"
-            detail += f"Stock: {data['stock']} unidades\n"
-            detail += f"Precio: L {data['precio']:.2f}\n\n"
-            detail += f"Descripción:\n{data['desc'] or 'N/A'}"
+            detail = f"🏷️ {data.nombre}\n\n"
+            detail += f"ID: {data.id}\n"
+            detail += f"Stock: {data.stock} unidades\n"
+            detail += f"Precio: L {data.precio:.2f}\n\n"
+            detail += f"Descripción:\n{data.descripcion or 'N/A'}"
             
             self.detail_text.insert("1.0", detail)
             self.detail_text.config(state="disabled")
@@ -579,130 +550,138 @@ class WholesaleSalesFrame(ttk.Frame):
 
     def add_to_cart(self):
         """Agrega producto al carrito con descuento."""
-        selected = self.products_tree.focus()
-        if not selected:
+        data = self.selected_product()
+        if data is None:
             messagebox.showwarning("Advertencia", "Seleccione un producto")
             return
         
-        tags = self.products_tree.item(selected, "tags")
-        if len(tags) < 2:
-            return
-        
         try:
-            data = json.loads(tags[1])
             quantity = self.qty_var.get()
             
-            if data['stock'] == 0:
+            if quantity <= 0:
+                messagebox.showerror("Error", "La cantidad debe ser mayor a 0")
+                return
+            
+            if data.stock == 0:
                 messagebox.showerror("Sin Stock", "Este producto no tiene stock disponible")
                 return
             
-            current_qty = self.cart.get(data['id'], {}).get('cantidad', 0)
-            if (current_qty + quantity) > data['stock']:
+            current_qty = self.cart.get(data.id, {}).get('cantidad', 0)
+            if (current_qty + quantity) > data.stock:
                 messagebox.showerror(
                     "Stock Insuficiente",
-                    f"Stock disponible: {data['stock']}\nEn carrito: {current_qty}\nTotal solicitado: {current_qty + quantity}"
+                    f"Stock disponible: {data.stock}\nEn carrito: {current_qty}\nTotal solicitado: {current_qty + quantity}"
                 )
                 return
             
+            if not self.reserve(data, current_qty + quantity):
+                return
+            
             # Obtener descuento seleccionado
             discount_idx = self.discount_combo.current()
             discount_info = self.discount_data.get(discount_idx, {"porcentaje": 0.0, "nombre": "Sin descuento"})
             
-            if data['id'] in self.cart:
-                self.cart[data['id']]['cantidad'] += quantity
-                self.cart[data['id']]['descuento_pct'] = discount_info['porcentaje']
-                self.cart[data['id']]['descuento_nombre'] = discount_info['nombre']
-            else:
-                self.cart[data['id']] = {
-                    'id': data['id'],
-                    'nombre': data['nombre'],
-                    'precio': data['precio'],
-                    'cantidad': quantity,
-                    'stock': data['stock'],
-                    'descuento_pct': discount_info['porcentaje'],
-                    'descuento_nombre': discount_info['nombre']
-                }
-            
-            self.update_cart_display()
+            self.cart.add(
+                data.id,
+                quantity,
+                nombre=data.nombre,
+                precio_unitario=data.precio,
+                stock=data.stock,
+                descuento_porcentaje=discount_info['porcentaje'],
+                descuento_nombre=discount_info['nombre']
+            )
             self.venta_en_progreso = True
             
-            messagebox.showinfo("Agregado", f"{data['nombre']}\nCantidad: {quantity}\nDescuento: {discount_info['nombre']}")
+            messagebox.showinfo("Agregado", f"{data.nombre}\nCantidad: {quantity}\nDescuento: {discount_info['nombre']}")
             self.qty_var.set(1)
             self.discount_combo.set("Sin descuento")
             
         except Exception as e:
             messagebox.showerror("Error", f"Error al agregar: {e}")
 
+    def reserve(self, data, cantidad):
+        """Reserva cantidad unidades del producto para esta caja; avisa si no alcanza."""
+        reservado, disponible = self.db.reserve_stock(data.id, cantidad, caja=self.reservas)
+        if not reservado:
+            messagebox.showerror(
+                "Stock Insuficiente",
+                f"Solo hay {disponible} unidades disponibles de {data.nombre}\n(el resto está vendido o reservado en otra caja)"
+            )
+        return reservado
+
+    def release_reservations(self, evento, prod_id, data):
+        """Libera el stock reservado de las líneas que salen del carrito."""
+        if evento == "remove":
+            self.db.release_stock(prod_id, caja=self.reservas)
+        elif evento == "clear":
+            self.db.release_stock(caja=self.reservas)
+
     def quick_add(self):
         """Agrega 1 unidad rápidamente."""
-        selected = self.products_tree.focus()
-        if not selected:
-            return
-        
-        tags = self.products_tree.item(selected, "tags")
-        if len(tags) < 2:
+        data = self.selected_product()
+        if data is None:
             return
         
         try:
-            data = json.loads(tags[1])
-            
-            if data['stock'] == 0:
+            if data.stock == 0:
                 messagebox.showerror("Sin Stock", "Producto sin stock")
                 return
             
-            current_qty = self.cart.get(data['id'], {}).get('cantidad', 0)
-            if (current_qty + 1) > data['stock']:
+            current_qty = self.cart.get(data.id, {}).get('cantidad', 0)
+            if (current_qty + 1) > data.stock:
                 messagebox.showerror("Stock Insuficiente", f"Ya tiene {current_qty} en el carrito")
                 return
             
-            if data['id'] in self.cart:
-                self.cart[data['id']]['cantidad'] += 1
-            else:
-                self.cart[data['id']] = {
-                    'id': data['id'],
-                    'nombre': data['nombre'],
-                    'precio': data['precio'],
-                    'cantidad': 1,
-                    'stock': data['stock'],
-                    'descuento_pct': 0.0,
-                    'descuento_nombre': 'Sin descuento'
-                }
+            if not self.reserve(data, current_qty + 1):
+                return
             
-            self.update_cart_display()
+            if data.id in self.cart:
+                self.cart.add(data.id, 1, stock=data.stock)
+            else:
+                self.cart.add(
+                    data.id,
+                    1,
+                    nombre=data.nombre,
+                    precio_unitario=data.precio,
+                    stock=data.stock,
+                    descuento_porcentaje=0.0,
+                    descuento_nombre='Sin descuento'
+                )
             self.venta_en_progreso = True
-            self.show_mini_notif(f"✅ +1 {data['nombre']}")
+            self.show_mini_notif(f"✅ +1 {data.nombre}")
             
         except:
             pass
 
+    def cart_row_values(self, data):
+        """Valores de la fila del carrito para una línea."""
+        _, _, total_item = totales_linea(data)
+        desc_text = f"{int(data['descuento_porcentaje']*100)}%" if data['descuento_porcentaje'] > 0 else "-"
+        return (data['nombre'][:15], data['cantidad'], desc_text, f"L {a_decimal(total_item):.2f}")
+
+    def on_cart_change(self, evento, prod_id, data):
+        """Redibuja solo la fila afectada por un cambio del carrito."""
+        if evento == "add":
+            self.cart_tree.insert("", "end", iid=str(prod_id), values=self.cart_row_values(data))
+        elif evento == "update":
+            self.cart_tree.item(str(prod_id), values=self.cart_row_values(data))
+        elif evento == "remove":
+            self.cart_tree.delete(str(prod_id))
+        else:
+            self.cart_tree.delete(*self.cart_tree.get_children())
+        self.update_cart_total()
+
     def update_cart_display(self):
-        """Actualiza visualización del carrito."""
-        for item in self.cart_tree.get_children():
-            self.cart_tree.delete(item)
-        
-        total = 0.0
+        """Redibuja el carrito completo."""
+        self.cart_tree.delete(*self.cart_tree.get_children())
         for prod_id, data in self.cart.items():
-            subtotal = data['precio'] * data['cantidad']
-            descuento = subtotal * data['descuento_pct']
-            total_item = subtotal - descuento
-            total += total_item
-            
-            desc_text = f"{int(data['descuento_pct']*100)}%" if data['descuento_pct'] > 0 else "-"
-            
-            self.cart_tree.insert(
-                "",
-                "end",
-                iid=str(prod_id),
-                values=(
-                    data['nombre'][:15],
-                    data['cantidad'],
-                    desc_text,
-                    f"L {total_item:.2f}"
-                )
-            )
-        
-        self.total_venta = total
-        self.cart_total_label.config(text=f"Total: L {total:,.2f}")
+            self.cart_tree.insert("", "end", iid=str(prod_id), values=self.cart_row_values(data))
+        self.update_cart_total()
+
+    def update_cart_total(self):
+        """Muestra el total acumulado del carrito."""
+        self.total_venta = self.cart.total
+        self.cart_total_label.config(text=f"Total: L {self.total_venta:,.2f}")
 
     def edit_cart_item(self):
         """Edita cantidad y descuento de producto en carrito."""
@@ -783,11 +762,20 @@ class WholesaleSalesFrame(ttk.Frame):
                 if disc_idx >= 0:
                     disc_info = self.discount_data.get(disc_idx, {"porcentaje": 0.0, "nombre": "Sin descuento"})
                     
-                    self.cart[prod_id]['cantidad'] = new_qty
-                    self.cart[prod_id]['descuento_pct'] = disc_info['porcentaje']
-                    self.cart[prod_id]['descuento_nombre'] = disc_info['nombre']
+                    reservado, disponible = self.db.reserve_stock(prod_id, new_qty, caja=self.reservas)
+                    if not reservado:
+                        messagebox.showerror(
+                            "Stock Insuficiente",
+                            f"Solo hay {disponible} unidades disponibles\n(el resto está vendido o reservado en otra caja)"
+                        )
+                        return
                     
-                    self.update_cart_display()
+                    self.cart.update(
+                        prod_id,
+                        cantidad=new_qty,
+                        descuento_porcentaje=disc_info['porcentaje'],
+                        descuento_nombre=disc_info['nombre']
+                    )
                     edit_win.destroy()
                     messagebox.showinfo("Actualizado", "Producto actualizado correctamente")
             
@@ -819,8 +807,7 @@ class WholesaleSalesFrame(ttk.Frame):
             if prod_id in self.cart:
                 nombre = self.cart[prod_id]['nombre']
                 if messagebox.askyesno("Confirmar", f"¿Eliminar {nombre}?"):
-                    del self.cart[prod_id]
-                    self.update_cart_display()
+                    self.cart.remove(prod_id)
                     
                     if not self.cart:
                         self.venta_en_progreso = False
@@ -833,8 +820,7 @@ class WholesaleSalesFrame(ttk.Frame):
             return
         
         if messagebox.askyesno("Confirmar", "¿Vaciar el carrito completo?"):
-            self.cart = {}
-            self.update_cart_display()
+            self.cart.clear()
             self.venta_en_progreso = False
             messagebox.showinfo("Carrito Vaciado", "Todos los productos fueron eliminados")
 
@@ -991,7 +977,7 @@ class WholesaleSalesFrame(ttk.Frame):
             try:
                 from datetime import datetime
                 
-                self.db.execute(
+                new_client_id = self.db.execute(
                     """INSERT INTO Clientes (nombre, apellido, dni, telefono, email, direccion, fecha_registro, activo)
                        VALUES (?, ?, ?, ?, ?, ?, ?, 1)""",
                     (
@@ -1005,9 +991,6 @@ class WholesaleSalesFrame(ttk.Frame):
                     )
                 )
                 
-                result = self.db.fetch("SELECT last_insert_rowid()")
-                new_client_id = result[0][0]
-                
                 # Simular sincronización
                 self.app.after(1000, lambda: finalize_sync(new_client_id, nombre, apellido))
                 
@@ -1072,7 +1055,8 @@ class WholesaleSalesFrame(ttk.Frame):
     
     def generate_documents(self):
         """Genera recibo y constancia."""
-        self.venta_id = f"VM-{datetime.now().strftime('%Y%m%d%H%M%S')}-{random.randint(100, 999)}"
+        # Número que tendrá la factura; se asigna definitivamente al registrar
+        self.venta_id = self.db.peek_sale_id()
         
         # Generar contenido
         receipt = self.generate_receipt()
@@ -1089,15 +1073,7 @@ class WholesaleSalesFrame(ttk.Frame):
         lines = []
         
         # Encabezado
-        lines.append("PODEGA Y COMERCIAL RIVERA")
-        lines.append("R.T.N.: 12011972000081")
-        lines.append("Tel: 2774-1192 / 9967-7300")
-        lines.append("Bo. La Mercedes, Colonia la Ermita, 1ra Calle, 14-62,")
-        lines.append("frente a Farmacia Santa, La Paz, Honduras")
-        lines.append("Email: freddyrivera2015@gmail.com")
-        lines.append("")
-        lines.append("FACTURA")
-        lines.append(f"No. 0000-0001-{self.venta_id.split('-')[-1]}")
+        lines.extend(encabezado_texto(70, self.venta_id))
         lines.append(f"Fecha: {datetime.now().strftime('%Y-%m-%d %H:%M:%S')}")
         lines.append("")
         
@@ -1117,16 +1093,12 @@ class WholesaleSalesFrame(ttk.Frame):
         lines.append(f"{'Cant.':<8}{'Código':<15}{'Producto':<25}{'P.Unit':>10}{'Subtotal':>12}")
         lines.append("-" * 70)
         
-        subtotal_total = 0.0
-        for prod_id, data in self.cart.items():
+        filas, gravado_centavos = lineas_venta(self.cart)
+        for prod_id, data, subtotal in filas:
             codigo = str(prod_id).zfill(8)
             nombre = data['nombre'][:23]
             cant = data['cantidad']
-            precio = data['precio']
-            desc_pct = data['descuento_pct']
-            
-            subtotal = (cant * precio) * (1 - desc_pct)
-            subtotal_total += subtotal
+            precio = data['precio_unitario']
             
             lines.append(f"{cant:<8}{codigo:<15}{nombre:<25}L{precio:>9.2f}L{subtotal:>10.2f}")
         
@@ -1134,8 +1106,7 @@ class WholesaleSalesFrame(ttk.Frame):
         lines.append(f"{'TOTAL:':>58}L{self.total_venta:>10.2f}")
         
         # Convertir a palabras
-        total_entero = int(self.total_venta)
-        total_centavos = int(round((self.total_venta - total_entero) * 100))
+        total_entero, total_centavos = importe_en_palabras(a_centavos(self.total_venta))
         lines.append(f"{self.numero_a_palabras(total_entero).upper()} LEMPIRAS CON {total_centavos:02d}/100")
         lines.append("")
         
@@ -1145,17 +1116,7 @@ class WholesaleSalesFrame(ttk.Frame):
         lines.append("")
         
         # Impuestos
-        impuesto = subtotal_total * 0.15
-        total_con_imp = subtotal_total + impuesto
-        
-        lines.append(f"{'Concepto':<30}{'Total':>15}")
-        lines.append(f"{'Sub Total':<30}L{subtotal_total:>13.2f}")
-        lines.append(f"{'Exento':<30}L{0.00:>13.2f}")
-        lines.append(f"{'Gravado 15%':<30}L{subtotal_total:>13.2f}")
-        lines.append(f"{'Gravado 18%':<30}L{0.00:>13.2f}")
-        lines.append(f"{'Impuesto 15%':<30}L{impuesto:>13.2f}")
-        lines.append(f"{'Impuesto 18%':<30}L{0.00:>13.2f}")
-        lines.append(f"{'TOTAL:':<30}L{total_con_imp:>13.2f}")
+        lines.extend(resumen_impuestos_texto(gravado_centavos, 30, 15))
         lines.append("")
         
         lines.append(f"Monto Recibido: L{self.total_venta:.2f}")
@@ -1175,8 +1136,8 @@ CONSTANCIA DE COMPRA MAYORISTA
 
 ━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━
 
-Por medio de la presente, PODEGA Y COMERCIAL RIVERA,
-con R.T.N. 12011972000081, HACE CONSTAR que:
+Por medio de la presente, {EMPRESA['nombre']},
+con R.T.N. {EMPRESA['rtn']}, HACE CONSTAR que:
 
 DATOS DEL CLIENTE:
 ━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━
@@ -1198,11 +1159,11 @@ PRODUCTOS:
 
 """
         for prod_id, data in self.cart.items():
-            subtotal = data['cantidad'] * data['precio'] * (1 - data['descuento_pct'])
+            subtotal = a_decimal(totales_linea(data)[2])
             content += f"  • {data['nombre']}\n"
-            content += f"    {data['cantidad']} unidades x L{data['precio']:.2f}"
-            if data['descuento_pct'] > 0:
-                content += f" (Desc: {int(data['descuento_pct']*100)}%)"
+            content += f"    {data['cantidad']} unidades x L{data['precio_unitario']:.2f}"
+            if data['descuento_porcentaje'] > 0:
+                content += f" (Desc: {int(data['descuento_porcentaje']*100)}%)"
             content += f" = L{subtotal:.2f}\n\n"
         
         content += f"""
@@ -1360,11 +1321,11 @@ Tel: {self.cliente_data.get('telefono', 'N/A')}
 """
         
         for prod_id, data in self.cart.items():
-            subtotal = data['cantidad'] * data['precio'] * (1 - data['descuento_pct'])
+            subtotal = a_decimal(totales_linea(data)[2])
             summary += f"• {data['nombre']}\n"
-            summary += f"  {data['cantidad']} x L{data['precio']:.2f}"
-            if data['descuento_pct'] > 0:
-                summary += f" (-{int(data['descuento_pct']*100)}%)"
+            summary += f"  {data['cantidad']} x L{data['precio_unitario']:.2f}"
+            if data['descuento_porcentaje'] > 0:
+                summary += f" (-{int(data['descuento_porcentaje']*100)}%)"
             summary += f" = L{subtotal:,.2f}\n\n"
         
         summary += f"""
@@ -1449,13 +1410,13 @@ Presione "PROCESAR VENTA" para finalizar.
                 progress['value'] = value
                 
                 if index == 1:
-                    # Registrar venta
+                    # Registrar venta, detalle e inventario en una sola transacción
                     try:
-                        self.db.execute(
-                            """INSERT INTO Ventas (id, fecha, total, monto_pagado, vuelto, usuario_id, id_cliente, tipo_recibo)
-                               VALUES (?, ?, ?, ?, ?, ?, ?, ?)""",
+                        detalles = detalles_venta(self.cart)
+
+                        venta_id = self.db.register_sale(
                             (
-                                self.venta_id,
+                                None,
                                 datetime.now().strftime('%Y-%m-%d %H:%M:%S'),
                                 self.total_venta,
                                 self.total_venta,
@@ -1463,35 +1424,27 @@ Presione "PROCESAR VENTA" para finalizar.
                                 self.app.current_user[0] if hasattr(self.app, 'current_user') else 1,
                                 self.cliente_data['id'],
                                 'PDF_MAYORISTA'
-                            )
+                            ),
+                            detalles,
+                            reservas=self.reservas
                         )
-                    except Exception as e:
-                        messagebox.showerror("Error", f"Error al registrar: {e}")
+                        if venta_id != self.venta_id:
+                            # Otra venta de esta caja tomó el número previsto
+                            for text in (self.receipt_text, self.constancia_text):
+                                contenido = text.get("1.0", "end-1c").replace(self.venta_id, venta_id)
+                                contenido = contenido.replace(numero_factura(self.venta_id), numero_factura(venta_id))
+                                text.delete("1.0", tk.END)
+                                text.insert("1.0", contenido)
+                            self.venta_id = venta_id
+                    except InsufficientStockError as e:
+                        messagebox.showerror("Stock Insuficiente", f"{e}\n\nAjuste las cantidades del carrito y genere de nuevo.")
                         process_win.destroy()
                         return
-                
-                elif index == 2:
-                    # Actualizar inventario
-                    try:
-                        for prod_id, data in self.cart.items():
-                            subtotal = data['cantidad'] * data['precio'] * (1 - data['descuento_pct'])
-                            descuento = data['cantidad'] * data['precio'] * data['descuento_pct']
-                            
-                            self.db.execute(
-                                """INSERT INTO DetalleVenta (venta_id, producto_id, nombre_producto, cantidad, precio_unitario, descuento, subtotal)
-                                   VALUES (?, ?, ?, ?, ?, ?, ?)""",
-                                (self.venta_id, prod_id, data['nombre'], data['cantidad'], data['precio'], descuento, subtotal)
-                            )
-                            
-                            self.db.execute(
-                                "UPDATE Productos SET stock = stock - ? WHERE id = ?",
-                                (data['cantidad'], prod_id)
-                            )
                     except Exception as e:
-                        messagebox.showerror("Error", f"Error al actualizar inventario: {e}")
+                        messagebox.showerror("Error", f"Error al registrar: {e}")
                         process_win.destroy()
                         return
-                
+
                 elif index == 3:
                     # Generar recibo
                     self.receipt_path = self.save_document(
@@ -1716,7 +1669,7 @@ Presione "PROCESAR VENTA" para finalizar.
 
     def reset_sale(self):
         """Resetea el sistema."""
-        self.cart = {}
+        self.cart.clear()
         self.cliente_data = {}
         self.venta_id = None
         self.total_venta = 0.0
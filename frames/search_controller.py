@@ -0,0 +1,109 @@
+"""
+frames/search_controller.py
+Búsqueda al escribir compartida por las pantallas: espera a que el usuario
+deje de teclear, consulta en segundo plano y reutiliza el último resultado
+cuando solo se está afinando el término
+"""
+
+
+class SearchController:
+    """Controla la búsqueda de un campo de texto (StringVar).
+
+    - Debounce: la consulta se lanza recién cuando pasan `delay` ms sin
+      cambios en el texto.
+    - Consultas obsoletas: cada búsqueda reemplaza a la anterior en
+      db.run_async (que la interrumpe y descarta su resultado).
+    - Afinado en memoria: si el nuevo término extiende al anterior y el
+      resultado anterior estaba completo (menos de `limit` filas), se filtra
+      ese resultado con matches(fila, termino) sin ir a la base.
+
+    fetch(termino, limit) se ejecuta en segundo plano y retorna las filas;
+    on_results(filas) las muestra. Con el término vacío se llama on_empty().
+    Si en cambio se da on_term(termino), la consulta queda a cargo de quien
+    llama (p. ej. una lista paginada con set_source, sin límite de filas) y
+    el controlador solo aplica el debounce.
+    """
+
+    def __init__(
+        self,
+        widget,
+        variable,
+        db,
+        fetch=None,
+        on_results=None,
+        on_empty=None,
+        matches=None,
+        delay=250,
+        limit=1000,
+        on_term=None,
+    ):
+        self.widget = widget
+        self.variable = variable
+        self.db = db
+        self.fetch = fetch
+        self.on_results = on_results
+        self.on_empty = on_empty
+        self.matches = matches
+        self.delay = delay
+        self.limit = limit
+        self.on_term = on_term
+
+        self._after_id = None
+        self._cache_term = None
+        self._cache_rows = None
+        self._key = f"busqueda-{id(self)}"
+        variable.trace_add("write", self.schedule)
+
+    def schedule(self, *args):
+        """Reprograma la búsqueda tras cada cambio del texto."""
+        if self._after_id is not None:
+            self.widget.after_cancel(self._after_id)
+        self._after_id = self.widget.after(self.delay, self.run)
+
+    def run(self):
+        """Ejecuta ya la búsqueda con el texto actual."""
+        self._after_id = None
+        term = self.variable.get().strip()
+
+        if not term:
+            self.db.cancel_async(self._key)
+            self._cache_term = self._cache_rows = None
+            if self.on_empty:
+                self.on_empty()
+            return
+
+        if self.on_term is not None:
+            self.on_term(term)
+            return
+
+        if (
+            self.matches is not None
+            and self._cache_rows is not None
+            and term.lower().startswith(self._cache_term.lower())
+        ):
+            # Afinar el resultado anterior sin consultar la base
+            self.db.cancel_async(self._key)
+            rows = [row for row in self._cache_rows if self.matches(row, term)]
+            self._cache_term, self._cache_rows = term, rows
+            self.on_results(rows)
+            return
+
+        self.db.run_async(
+            lambda: self.fetch(term, self.limit + 1),
+            lambda rows: self._on_fetched(term, rows),
+            key=self._key,
+            owner=self.widget,
+        )
+
+    def _on_fetched(self, term, rows):
+        if term != self.variable.get().strip():
+            return  # El texto cambió mientras se consultaba
+        completo = len(rows) <= self.limit
+        rows = rows[: self.limit]
+        # Solo un resultado completo sirve para afinar en memoria
+        self._cache_term, self._cache_rows = (term, rows) if completo else (None, None)
+        self.on_results(rows)
+
+    def clear_cache(self):
+        """Olvida el último resultado (p. ej. tras modificar datos)."""
+        self._cache_term = self._cache_rows = None
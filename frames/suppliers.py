@@ -5,6 +5,8 @@ Gestión completa de proveedores con CRUD
 from tkinter import ttk, messagebox
 import tkinter as tk
 
+from .virtual_tree import VirtualTreeview
+
 
 class SupplierFrame(ttk.Frame):
     """Frame para gestión de proveedores."""
@@ -36,13 +38,14 @@ class SupplierFrame(ttk.Frame):
             font=('Arial', 14, 'bold')
         ).pack(pady=(0, 10))
         
-        # Treeview
-        self.tree = ttk.Treeview(
+        # Treeview (virtual: solo crea las filas visibles)
+        self.supplier_list = VirtualTreeview(
             self.list_frame,
-            columns=("ID", "Nombre", "Contacto", "Teléfono"),
-            show="headings",
+            ("ID", "Nombre", "Contacto", "Teléfono"),
+            db=self.db,
             height=15
         )
+        self.tree = self.supplier_list.tree
         
         self.tree.heading("ID", text="ID")
         self.tree.heading("Nombre", text="Nombre Proveedor")
@@ -54,8 +57,8 @@ class SupplierFrame(ttk.Frame):
         self.tree.column("Contacto", width=150)
         self.tree.column("Teléfono", width=120)
         
-        self.tree.bind('<<TreeviewSelect>>', self.select_supplier)
-        self.tree.pack(fill="both", expand=True, pady=5)
+        self.supplier_list.on_select(self.select_supplier)
+        self.supplier_list.pack(fill="both", expand=True, pady=5)
         
         # Botones
         btn_frame = ttk.Frame(self.list_frame)
@@ -119,15 +122,9 @@ class SupplierFrame(ttk.Frame):
 
     def load_suppliers(self):
         """Carga todos los proveedores."""
-        for item in self.tree.get_children():
-            self.tree.delete(item)
-        
-        suppliers = self.db.fetch(
+        self.supplier_list.set_query(
             "SELECT id, nombre, contacto, telefono FROM Proveedores ORDER BY id DESC"
         )
-        
-        for sup in suppliers:
-            self.tree.insert("", "end", values=sup)
 
     def select_supplier(self, event):
         """Carga datos del proveedor seleccionado."""
@@ -0,0 +1,310 @@
+"""
+frames/virtual_tree.py
+Lista virtual para tablas grandes: solo crea en Tk las filas visibles y pide
+los datos a la base por páginas a medida que el usuario se desplaza
+"""
+
+from tkinter import ttk
+
+
+class VirtualTreeview(ttk.Frame):
+    """Treeview virtual con scrollbar propia.
+
+    El Treeview interno (self.tree) nunca tiene más ítems que filas visibles;
+    al desplazarse se reemplazan por las filas de la nueva posición. Las filas
+    salen de una lista en memoria (set_rows) o de la base de datos por páginas
+    (set_query / set_source), consultadas en segundo plano con db.run_async.
+
+    formatter(fila) -> (values, tags) define cómo se muestra cada fila y
+    row_key(fila) su iid (por defecto la primera columna), lo que permite
+    conservar la selección al desplazarse.
+    """
+
+    # Páginas que se conservan en memoria alrededor de la posición actual
+    MAX_PAGES = 8
+
+    def __init__(
+        self,
+        parent,
+        columns,
+        db=None,
+        height=15,
+        page_size=200,
+        formatter=None,
+        row_key=None,
+        xscroll=False,
+        **tree_options,
+    ):
+        super().__init__(parent)
+        self.db = db
+        self.visible = height
+        self.page_size = page_size
+        self.formatter = formatter or (lambda row: (row, ()))
+        self.row_key = row_key or (lambda row: row[0])
+
+        tree_options.setdefault("show", "headings")
+        self.tree = ttk.Treeview(self, columns=columns, height=height, **tree_options)
+        self.scrollbar = ttk.Scrollbar(self, orient="vertical", command=self.yview)
+        self.tree.grid(row=0, column=0, sticky="nsew")
+        self.scrollbar.grid(row=0, column=1, sticky="ns")
+        if xscroll:
+            x_scrollbar = ttk.Scrollbar(
+                self, orient="horizontal", command=self.tree.xview
+            )
+            self.tree.configure(xscrollcommand=x_scrollbar.set)
+            x_scrollbar.grid(row=1, column=0, sticky="ew")
+        self.grid_rowconfigure(0, weight=1)
+        self.grid_columnconfigure(0, weight=1)
+
+        self.total = 0
+        self.offset = 0
+        self._rows = None  # lista en memoria (set_rows)
+        self._count = None  # count() (set_source)
+        self._fetch_page = None  # fetch(offset, limit) (set_source)
+        self._pages = {}
+        self._requested = set()
+        self._generation = 0
+        self._selected = set()
+        self._focus = ""
+        self._restoring = False
+        self._on_select = None
+
+        self.tree.bind("<<TreeviewSelect>>", self._handle_select)
+        self.tree.bind("<Configure>", self._on_resize)
+        self.tree.bind("<MouseWheel>", self._on_mousewheel)
+        self.tree.bind("<Button-4>", lambda e: self.scroll(-3))
+        self.tree.bind("<Button-5>", lambda e: self.scroll(3))
+        self.tree.bind("<Down>", lambda e: self._on_arrow(1))
+        self.tree.bind("<Up>", lambda e: self._on_arrow(-1))
+        self.tree.bind("<Next>", lambda e: self._on_page_key(1))
+        self.tree.bind("<Prior>", lambda e: self._on_page_key(-1))
+
+    # -------------------- Fuentes de datos --------------------
+    def set_rows(self, rows):
+        """Muestra una lista de filas ya cargada en memoria."""
+        self._reset()
+        self._rows = list(rows)
+        self.total = len(self._rows)
+        self.refresh_view()
+
+    def set_source(self, count, fetch):
+        """Muestra filas paginadas desde una fuente externa.
+
+        count() retorna el total de filas y fetch(offset, limit) una página;
+        ambas se ejecutan en segundo plano si el widget tiene db.
+        """
+        self._reset()
+        self._count = count
+        self._fetch_page = fetch
+        self._load()
+
+    def set_query(self, query, params=()):
+        """Muestra el resultado de un SELECT, paginado con LIMIT/OFFSET."""
+        params = tuple(params)
+        self.set_source(
+            lambda: self.db.query(f"SELECT COUNT(*) FROM ({query})", params)[0][0],
+            lambda offset, limit: self.db.query(
+                f"{query} LIMIT ? OFFSET ?", params + (limit, offset)
+            ),
+        )
+
+    def reload(self):
+        """Vuelve a consultar la fuente actual conservando la posición."""
+        if self._fetch_page is None:
+            self.refresh_view()
+            return
+        self._generation += 1
+        self._pages.clear()
+        self._requested.clear()
+        self._load()
+
+    def _reset(self):
+        self._generation += 1
+        if self.db is not None:
+            for page in self._requested:
+                self.db.cancel_async(self._job_key(page))
+        self._rows = None
+        self._count = None
+        self._fetch_page = None
+        self._pages.clear()
+        self._requested.clear()
+        self.total = 0
+        self.offset = 0
+
+    def _load(self):
+        """Pide el total y la página de la posición actual."""
+        generation = self._generation
+        page = self.offset // self.page_size
+        count, fetch = self._count, self._fetch_page
+        self._run(
+            lambda: (count(), fetch(page * self.page_size, self.page_size)),
+            lambda result: self._on_total(generation, page, result),
+            "total",
+        )
+
+    def _job_key(self, page):
+        return f"vtree-{id(self)}-{page}"
+
+    def _run(self, func, callback, page):
+        """Ejecuta func en segundo plano (o en línea si no hay db)."""
+        if self.db is None:
+            callback(func())
+            return
+        self._requested.add(page)
+        self.db.run_async(func, callback, key=self._job_key(page), owner=self)
+
+    def _on_total(self, generation, page, result):
+        if generation != self._generation:
+            return
+        self._requested.discard("total")
+        self.total, rows = result
+        self._pages[page] = rows
+        self.refresh_view()
+
+    def _request_page(self, page):
+        if page in self._requested or self._fetch_page is None:
+            return
+        generation = self._generation
+        fetch = self._fetch_page
+        self._run(
+            lambda: fetch(page * self.page_size, self.page_size),
+            lambda rows: self._on_page(generation, page, rows),
+            page,
+        )
+
+    def _on_page(self, generation, page, rows):
+        if generation != self._generation:
+            return
+        self._requested.discard(page)
+        self._pages[page] = rows
+        # Descartar las páginas más lejanas a la posición actual
+        current = self.offset // self.page_size
+        while len(self._pages) > self.MAX_PAGES:
+            del self._pages[max(self._pages, key=lambda p: abs(p - current))]
+        self.refresh_view()
+
+    def _row(self, index):
+        """Fila en la posición index, o None si su página aún no llegó."""
+        if self._rows is not None:
+            return self._rows[index]
+        page, pos = divmod(index, self.page_size)
+        rows = self._pages.get(page)
+        if rows is None:
+            if self.db is not None:
+                self._request_page(page)
+                return None
+            rows = self._pages[page] = self._fetch_page(
+                page * self.page_size, self.page_size
+            )
+        return rows[pos] if pos < len(rows) else None
+
+    # -------------------- Dibujo --------------------
+    def refresh_view(self):
+        """Reemplaza los ítems del Treeview por las filas visibles."""
+        self.offset = max(0, min(self.offset, self.total - self.visible))
+
+        # Borrar y reinsertar no debe contar como una selección del usuario
+        self._restoring = True
+        self.tree.delete(*self.tree.get_children())
+        for index in range(self.offset, min(self.offset + self.visible, self.total)):
+            row = self._row(index)
+            if row is None:
+                self.tree.insert("", "end", iid=f"#{index}", values=("…",))
+                continue
+            values, tags = self.formatter(row)
+            iid = str(self.row_key(row))
+            if self.tree.exists(iid):
+                iid = f"#{index}"
+            self.tree.insert("", "end", iid=iid, values=values, tags=tags)
+
+        visibles = [iid for iid in self._selected if self.tree.exists(iid)]
+        if visibles:
+            self.tree.selection_set(visibles)
+        if self._focus and self.tree.exists(self._focus):
+            self.tree.focus(self._focus)
+        self.after_idle(self._end_restore)
+
+        if self.total:
+            self.scrollbar.set(
+                self.offset / self.total,
+                min(1.0, (self.offset + self.visible) / self.total),
+            )
+        else:
+            self.scrollbar.set(0.0, 1.0)
+        self._fit_rows()
+
+    def _end_restore(self):
+        self._restoring = False
+
+    # -------------------- Desplazamiento --------------------
+    def yview(self, *args):
+        """Comando de la scrollbar (moveto / scroll)."""
+        if args[0] == "moveto":
+            self.offset = int(float(args[1]) * self.total)
+        elif args[0] == "scroll":
+            amount = int(args[1])
+            if args[2] == "pages":
+                amount *= self.visible
+            self.offset += amount
+        self.refresh_view()
+
+    def scroll(self, rows):
+        """Desplaza la vista rows filas (negativo hacia arriba)."""
+        self.offset += rows
+        self.refresh_view()
+        return "break"
+
+    def _on_mousewheel(self, event):
+        return self.scroll(-3 if event.delta > 0 else 3)
+
+    def _on_arrow(self, direction):
+        """Flechas: al llegar al borde de lo visible, desplaza la lista."""
+        children = self.tree.get_children()
+        if not children:
+            return None
+        edge = children[-1] if direction > 0 else children[0]
+        if self.tree.focus() != edge:
+            return None  # Movimiento normal del Treeview
+        self.scroll(direction)
+        children = self.tree.get_children()
+        target = children[-1] if direction > 0 else children[0]
+        self._selected = {target}
+        self._focus = target
+        self.tree.focus(target)
+        self.tree.selection_set(target)
+        # El evento de selección queda suprimido durante el redibujo
+        if self._on_select:
+            self._on_select(None)
+        return "break"
+
+    def _on_page_key(self, direction):
+        return self.scroll(direction * self.visible)
+
+    def _on_resize(self, event=None):
+        self._fit_rows()
+
+    def _fit_rows(self):
+        """Ajusta la cantidad de filas visibles al alto del Treeview."""
+        height = self.tree.winfo_height()
+        children = self.tree.get_children()
+        bbox = self.tree.bbox(children[0]) if children and height > 1 else None
+        if not bbox:
+            return
+        _, header, _, row_height = bbox
+        visible = max(1, (height - header) // row_height)
+        if visible != self.visible:
+            self.visible = visible
+            self.refresh_view()
+
+    # -------------------- Selección --------------------
+    def on_select(self, callback):
+        """Registra callback(event) para las selecciones hechas por el usuario."""
+        self._on_select = callback
+
+    def _handle_select(self, event):
+        if self._restoring:
+            return
+        self._selected = set(self.tree.selection())
+        self._focus = self.tree.focus()
+        if self._on_select:
+            self._on_select(event)
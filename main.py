@@ -3,21 +3,22 @@ main.py
 Punto de entrada de la aplicación ERP fusionado
 """
 
+import time
+
+INICIO = time.perf_counter()
+
+import logging
 import tkinter as tk
 from tkinter import ttk, messagebox
 from database import DBManager
 from file_manager import FileManager
-from frames import (
-    DashboardFrame,
-    ProductFrame,
-    SupplierFrame,
-    ConfigFrame,
-    SalesFrame,
-    ClientsFrame,
-)
+# Los frames se importan al abrirlos por primera vez (ver frames/__init__.py)
+import frames
 # 🔔 Importar notificaciones
 from frames.notificaciones import NotificationManager
 
+IMPORTS_LISTOS = time.perf_counter()
+
 
 class ERPApp(tk.Tk):
     """Aplicación principal del sistema ERP."""
@@ -31,8 +32,12 @@ class ERPApp(tk.Tk):
         self.configure(bg="#f0f0f0")
 
         # Inicializar base de datos y gestor de archivos
+        db_inicio = time.perf_counter()
         self.db = DBManager()
         self.file_manager = FileManager(self.db)
+        self.db_segundos = time.perf_counter() - db_inicio
+        self.report_db_settings()
+        self.poll_db_results()
 
         # Inicializar notificaciones
         self.notification_manager = NotificationManager(self, self.db)
@@ -45,6 +50,35 @@ class ERPApp(tk.Tk):
 
         # Mostrar login
         self.show_login()
+        self.after_idle(self.report_startup)
+
+    def report_startup(self):
+        """Informa en consola cuánto tardó el arranque hasta ver el login."""
+        print(
+            f"Arranque: importaciones {(IMPORTS_LISTOS - INICIO) * 1000:.0f} ms, "
+            f"base de datos {self.db_segundos * 1000:.0f} ms; "
+            f"login visible a los {(time.perf_counter() - INICIO) * 1000:.0f} ms"
+        )
+
+    def report_db_settings(self):
+        """Informa en consola la configuración efectiva de SQLite."""
+        report = self.db.check_pragmas()
+        print(
+            "SQLite: "
+            + ", ".join(f"{nombre}={efectivo}" for nombre, _, efectivo, _ in report)
+        )
+        for nombre, solicitado, efectivo, coincide in report:
+            if not coincide:
+                print(f"⚠ PRAGMA {nombre}: solicitado {solicitado}, efectivo {efectivo}")
+        if self.db.fts_unavailable:
+            print(f"⚠ FTS5 no disponible: la búsqueda en {', '.join(self.db.fts_unavailable)} usará LIKE")
+
+    def poll_db_results(self):
+        """Entrega en el hilo de Tk los resultados de las consultas en segundo plano."""
+        try:
+            self.db.process_async_results()
+        finally:
+            self.after(30, self.poll_db_results)
 
     def configure_styles(self):
         """Configura los estilos visuales de la aplicación."""
@@ -149,14 +183,14 @@ class ERPApp(tk.Tk):
                 ttk.Label(self, text="Centro de Notificaciones 🔔", font=("Arial", 14, "bold")).pack(pady=20)
 
 
-        # Diccionario de frames
+        # Diccionario de frames (por nombre los del paquete frames, que se importan al abrirlos)
         self.frames = {
-            "Dashboard": DashboardFrame,
+            "Dashboard": "DashboardFrame",
             "Ventas (POS)": CompuertaFrame,
-            "Clientes": ClientsFrame,
-            "Productos": ProductFrame,
-            "Proveedores": SupplierFrame,
-            "Configuración": ConfigFrame,
+            "Clientes": "ClientsFrame",
+            "Productos": "ProductFrame",
+            "Proveedores": "SupplierFrame",
+            "Configuración": "ConfigFrame",
             "Notificaciones": NotificationsFrame
         }
 
@@ -183,7 +217,7 @@ class ERPApp(tk.Tk):
         ttk.Separator(nav_frame, orient="horizontal").pack(fill="x", pady=20)
         ttk.Button(nav_frame, text="Cerrar Sesión", command=self.logout).pack(side="bottom", fill="x", pady=10)
 
-        self.show_frame(DashboardFrame, "Dashboard")
+        self.show_frame("DashboardFrame", "Dashboard")
 
         # ⚙️ Verificar stock cada 5 minutos
         def check_stock_periodically():
@@ -194,7 +228,14 @@ class ERPApp(tk.Tk):
         self.notification_manager.notify_system_info("v1.0.0")
 
     def show_frame(self, FrameClass, title):
-        """Muestra el frame solicitado."""
+        """Muestra el frame solicitado (la clase o su nombre en el paquete frames)."""
+        if isinstance(FrameClass, str):
+            nombre = FrameClass
+            cargado = nombre in vars(frames)
+            inicio = time.perf_counter()
+            FrameClass = getattr(frames, nombre)
+            if not cargado:
+                print(f"{nombre} cargado en {(time.perf_counter() - inicio) * 1000:.0f} ms")
         for widget in self.content_frame.winfo_children():
             widget.destroy()
         ttk.Label(self.content_frame, text=title, style="Header.TLabel").pack(fill="x", pady=(0, 20))
@@ -244,6 +285,8 @@ class CompuertaFrame(ttk.Frame):
 
 def main():
     """Función principal."""
+    # Migraciones aplicadas y avisos de la base de datos, en la consola
+    logging.basicConfig(level=logging.INFO, format="%(message)s")
     app = ERPApp()
     app.protocol("WM_DELETE_WINDOW", app.on_closing)
     app.mainloop()
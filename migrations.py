@@ -0,0 +1,591 @@
+"""
+migrations.py - Migraciones versionadas del esquema
+Cada migración se aplica una sola vez; la versión aplicada se guarda en PRAGMA user_version
+"""
+
+import sqlite3
+
+# Esquema original. Usa IF NOT EXISTS para adoptar bases creadas antes de
+# existir las migraciones (user_version = 0).
+ESQUEMA_BASE = [
+    # Tabla de Clientes
+    """
+        CREATE TABLE IF NOT EXISTS Clientes (
+            id INTEGER PRIMARY KEY AUTOINCREMENT,
+            nombre TEXT NOT NULL,
+            apellido TEXT NOT NULL,
+            dni TEXT UNIQUE,
+            telefono TEXT,
+            email TEXT,
+            direccion TEXT,
+            fecha_registro TEXT NOT NULL,
+            activo INTEGER DEFAULT 1
+        )
+    """,
+
+    # Tabla de Productos
+    """
+        CREATE TABLE IF NOT EXISTS Productos (
+            id INTEGER PRIMARY KEY AUTOINCREMENT,
+            nombre TEXT NOT NULL,
+            descripcion TEXT,
+            precio REAL NOT NULL,
+            stock INTEGER NOT NULL,
+            proveedor_id INTEGER,
+            FOREIGN KEY (proveedor_id) REFERENCES Proveedores(id)
+        )
+    """,
+
+    # Tabla de Proveedores
+    """
+        CREATE TABLE IF NOT EXISTS Proveedores (
+            id INTEGER PRIMARY KEY AUTOINCREMENT,
+            nombre TEXT NOT NULL,
+            contacto TEXT,
+            telefono TEXT
+        )
+    """,
+
+    # Tabla de Usuarios
+    """
+        CREATE TABLE IF NOT EXISTS Usuarios (
+            id INTEGER PRIMARY KEY AUTOINCREMENT,
+            nombre TEXT NOT NULL,
+            usuario TEXT UNIQUE NOT NULL,
+            contrasena TEXT NOT NULL,
+            rol TEXT NOT NULL
+        )
+    """,
+
+    # Tabla de Descuentos
+    """
+        CREATE TABLE IF NOT EXISTS Descuentos (
+            id INTEGER PRIMARY KEY AUTOINCREMENT,
+            nombre TEXT NOT NULL,
+            tipo TEXT,
+            porcentaje REAL NOT NULL
+        )
+    """,
+
+    # Tabla de Configuración
+    """
+        CREATE TABLE IF NOT EXISTS Configuracion (
+            clave TEXT PRIMARY KEY,
+            valor TEXT
+        )
+    """,
+
+    # Tabla de Ventas
+    """
+        CREATE TABLE IF NOT EXISTS Ventas (
+            id TEXT PRIMARY KEY,
+            fecha TEXT NOT NULL,
+            total REAL NOT NULL,
+            monto_pagado REAL,
+            vuelto REAL,
+            usuario_id INTEGER,
+            id_cliente INTEGER,
+            tipo_recibo TEXT,
+            FOREIGN KEY (id_cliente) REFERENCES Clientes(id)
+        )
+    """,
+
+    # Tabla de Detalle de Venta
+    """
+        CREATE TABLE IF NOT EXISTS DetalleVenta (
+            id INTEGER PRIMARY KEY AUTOINCREMENT,
+            venta_id TEXT,
+            producto_id INTEGER,
+            nombre_producto TEXT,
+            cantidad INTEGER,
+            precio_unitario REAL,
+            descuento REAL DEFAULT 0,
+            subtotal REAL,
+            FOREIGN KEY (venta_id) REFERENCES Ventas(id)
+        )
+    """,
+]
+
+# Índices para las consultas frecuentes (dashboard, clientes, stock)
+INDICES_SECUNDARIOS = [
+    "CREATE INDEX IF NOT EXISTS idx_ventas_fecha ON Ventas(fecha)",
+    "CREATE INDEX IF NOT EXISTS idx_ventas_cliente ON Ventas(id_cliente)",
+    "CREATE INDEX IF NOT EXISTS idx_detalle_venta ON DetalleVenta(venta_id)",
+    "CREATE INDEX IF NOT EXISTS idx_detalle_producto ON DetalleVenta(nombre_producto, cantidad)",
+    "CREATE INDEX IF NOT EXISTS idx_productos_stock ON Productos(stock)",
+    "CREATE INDEX IF NOT EXISTS idx_clientes_activo ON Clientes(activo, apellido, nombre)",
+    "CREATE INDEX IF NOT EXISTS idx_clientes_apellido ON Clientes(apellido, nombre)",
+    "ANALYZE",
+]
+
+# Resúmenes de ventas para el dashboard, mantenidos por triggers en la misma
+# transacción que registra (o elimina) cada venta
+RESUMENES_VENTAS = [
+    """
+        CREATE TABLE IF NOT EXISTS VentasDiarias (
+            dia TEXT PRIMARY KEY,
+            total REAL NOT NULL DEFAULT 0,
+            cantidad INTEGER NOT NULL DEFAULT 0
+        )
+    """,
+    """
+        CREATE TABLE IF NOT EXISTS VentasMensuales (
+            mes TEXT PRIMARY KEY,
+            total REAL NOT NULL DEFAULT 0,
+            cantidad INTEGER NOT NULL DEFAULT 0
+        )
+    """,
+    """
+        CREATE TABLE IF NOT EXISTS VentasProducto (
+            nombre_producto TEXT PRIMARY KEY,
+            cantidad INTEGER NOT NULL DEFAULT 0,
+            total REAL NOT NULL DEFAULT 0
+        )
+    """,
+    "CREATE INDEX IF NOT EXISTS idx_ventas_producto_cantidad ON VentasProducto(cantidad)",
+    # Ventas: alta, baja y modificación de fecha/total
+    """
+        CREATE TRIGGER IF NOT EXISTS trg_ventas_resumen_ins AFTER INSERT ON Ventas
+        BEGIN
+            INSERT INTO VentasDiarias (dia, total, cantidad)
+            VALUES (substr(NEW.fecha, 1, 10), NEW.total, 1)
+            ON CONFLICT(dia) DO UPDATE SET
+                total = total + excluded.total, cantidad = cantidad + 1;
+            INSERT INTO VentasMensuales (mes, total, cantidad)
+            VALUES (substr(NEW.fecha, 1, 7), NEW.total, 1)
+            ON CONFLICT(mes) DO UPDATE SET
+                total = total + excluded.total, cantidad = cantidad + 1;
+        END
+    """,
+    """
+        CREATE TRIGGER IF NOT EXISTS trg_ventas_resumen_del AFTER DELETE ON Ventas
+        BEGIN
+            UPDATE VentasDiarias SET total = total - OLD.total, cantidad = cantidad - 1
+            WHERE dia = substr(OLD.fecha, 1, 10);
+            UPDATE VentasMensuales SET total = total - OLD.total, cantidad = cantidad - 1
+            WHERE mes = substr(OLD.fecha, 1, 7);
+        END
+    """,
+    """
+        CREATE TRIGGER IF NOT EXISTS trg_ventas_resumen_upd AFTER UPDATE OF fecha, total ON Ventas
+        BEGIN
+            UPDATE VentasDiarias SET total = total - OLD.total, cantidad = cantidad - 1
+            WHERE dia = substr(OLD.fecha, 1, 10);
+            UPDATE VentasMensuales SET total = total - OLD.total, cantidad = cantidad - 1
+            WHERE mes = substr(OLD.fecha, 1, 7);
+            INSERT INTO VentasDiarias (dia, total, cantidad)
+            VALUES (substr(NEW.fecha, 1, 10), NEW.total, 1)
+            ON CONFLICT(dia) DO UPDATE SET
+                total = total + excluded.total, cantidad = cantidad + 1;
+            INSERT INTO VentasMensuales (mes, total, cantidad)
+            VALUES (substr(NEW.fecha, 1, 7), NEW.total, 1)
+            ON CONFLICT(mes) DO UPDATE SET
+                total = total + excluded.total, cantidad = cantidad + 1;
+        END
+    """,
+    # Detalle: unidades e importe por producto
+    """
+        CREATE TRIGGER IF NOT EXISTS trg_detalle_resumen_ins AFTER INSERT ON DetalleVenta
+        BEGIN
+            INSERT INTO VentasProducto (nombre_producto, cantidad, total)
+            VALUES (NEW.nombre_producto, NEW.cantidad, NEW.subtotal)
+            ON CONFLICT(nombre_producto) DO UPDATE SET
+                cantidad = cantidad + excluded.cantidad, total = total + excluded.total;
+        END
+    """,
+    """
+        CREATE TRIGGER IF NOT EXISTS trg_detalle_resumen_del AFTER DELETE ON DetalleVenta
+        BEGIN
+            UPDATE VentasProducto
+            SET cantidad = cantidad - OLD.cantidad, total = total - OLD.subtotal
+            WHERE nombre_producto = OLD.nombre_producto;
+        END
+    """,
+    """
+        CREATE TRIGGER IF NOT EXISTS trg_detalle_resumen_upd
+        AFTER UPDATE OF nombre_producto, cantidad, subtotal ON DetalleVenta
+        BEGIN
+            UPDATE VentasProducto
+            SET cantidad = cantidad - OLD.cantidad, total = total - OLD.subtotal
+            WHERE nombre_producto = OLD.nombre_producto;
+            INSERT INTO VentasProducto (nombre_producto, cantidad, total)
+            VALUES (NEW.nombre_producto, NEW.cantidad, NEW.subtotal)
+            ON CONFLICT(nombre_producto) DO UPDATE SET
+                cantidad = cantidad + excluded.cantidad, total = total + excluded.total;
+        END
+    """,
+    # Carga inicial con el historial existente
+    "DELETE FROM VentasDiarias",
+    "DELETE FROM VentasMensuales",
+    "DELETE FROM VentasProducto",
+    """
+        INSERT INTO VentasDiarias (dia, total, cantidad)
+        SELECT substr(fecha, 1, 10), SUM(total), COUNT(*) FROM Ventas
+        GROUP BY substr(fecha, 1, 10)
+    """,
+    """
+        INSERT INTO VentasMensuales (mes, total, cantidad)
+        SELECT substr(fecha, 1, 7), SUM(total), COUNT(*) FROM Ventas
+        GROUP BY substr(fecha, 1, 7)
+    """,
+    """
+        INSERT INTO VentasProducto (nombre_producto, cantidad, total)
+        SELECT nombre_producto, SUM(cantidad), SUM(subtotal) FROM DetalleVenta
+        GROUP BY nombre_producto
+    """,
+]
+
+# Los KPIs de hoy/mes suman total por rango de fecha: índice cubriente
+INDICE_VENTAS_FECHA_TOTAL = [
+    "DROP INDEX IF EXISTS idx_ventas_fecha",
+    "CREATE INDEX IF NOT EXISTS idx_ventas_fecha_total ON Ventas(fecha, total)",
+]
+
+def indice_fts(tabla, columnas, prefix="2 3"):
+    """Paso de migración que crea el índice FTS5 <tabla>FTS, sincronizado por triggers.
+
+    Es una tabla de contenido externo (solo guarda el índice) con tokenizador
+    unicode61 sin acentos. El paso retorna False si el SQLite instalado no
+    incluye FTS5: no crea nada y las búsquedas sobre la tabla siguen usando
+    LIKE. Es idempotente; DBManager.ensure_fts_indexes() lo repite al iniciar
+    mientras la tabla falte, así el índice aparece al actualizar SQLite.
+    """
+    fts = f"{tabla}FTS"
+    trigger = f"trg_{tabla.lower()}_fts"
+    cols = ", ".join(columnas)
+    nuevos = ", ".join(f"NEW.{c}" for c in columnas)
+    viejos = ", ".join(f"OLD.{c}" for c in columnas)
+
+    def crear(db):
+        try:
+            db.cursor.execute(
+                f"""
+                CREATE VIRTUAL TABLE IF NOT EXISTS {fts} USING fts5(
+                    {cols},
+                    content='{tabla}', content_rowid='id',
+                    tokenize='unicode61 remove_diacritics 2',
+                    prefix='{prefix}'
+                )
+                """
+            )
+        except sqlite3.OperationalError:
+            return False
+
+        db.cursor.execute(
+            f"""
+            CREATE TRIGGER IF NOT EXISTS {trigger}_ins AFTER INSERT ON {tabla}
+            BEGIN
+                INSERT INTO {fts} (rowid, {cols}) VALUES (NEW.id, {nuevos});
+            END
+            """
+        )
+        db.cursor.execute(
+            f"""
+            CREATE TRIGGER IF NOT EXISTS {trigger}_del AFTER DELETE ON {tabla}
+            BEGIN
+                INSERT INTO {fts} ({fts}, rowid, {cols})
+                VALUES ('delete', OLD.id, {viejos});
+            END
+            """
+        )
+        db.cursor.execute(
+            f"""
+            CREATE TRIGGER IF NOT EXISTS {trigger}_upd AFTER UPDATE OF {cols} ON {tabla}
+            BEGIN
+                INSERT INTO {fts} ({fts}, rowid, {cols})
+                VALUES ('delete', OLD.id, {viejos});
+                INSERT INTO {fts} (rowid, {cols}) VALUES (NEW.id, {nuevos});
+            END
+            """
+        )
+        # Indexar las filas existentes
+        db.cursor.execute(f"INSERT INTO {fts} ({fts}) VALUES ('rebuild')")
+        return True
+
+    return crear
+
+
+# Índices de texto completo por tabla (migraciones 5 y 6)
+INDICES_FTS = {
+    "Clientes": indice_fts(
+        "Clientes", ["nombre", "apellido", "dni", "telefono", "email"]
+    ),
+    "Productos": indice_fts("Productos", ["nombre", "descripcion"]),
+}
+
+
+# Contador de cambios de Productos para invalidar el catálogo en memoria
+VERSION_PRODUCTOS = [
+    "INSERT OR IGNORE INTO Configuracion (clave, valor) VALUES ('productos_version', '0')",
+    """
+        CREATE TRIGGER IF NOT EXISTS trg_productos_version_insert AFTER INSERT ON Productos
+        BEGIN
+            UPDATE Configuracion SET valor = CAST(valor AS INTEGER) + 1
+            WHERE clave = 'productos_version';
+        END
+    """,
+    """
+        CREATE TRIGGER IF NOT EXISTS trg_productos_version_update AFTER UPDATE ON Productos
+        BEGIN
+            UPDATE Configuracion SET valor = CAST(valor AS INTEGER) + 1
+            WHERE clave = 'productos_version';
+        END
+    """,
+    """
+        CREATE TRIGGER IF NOT EXISTS trg_productos_version_delete AFTER DELETE ON Productos
+        BEGIN
+            UPDATE Configuracion SET valor = CAST(valor AS INTEGER) + 1
+            WHERE clave = 'productos_version';
+        END
+    """,
+]
+
+# Código de barras / SKU para el ingreso por escáner en el POS. El índice
+# único admite varios NULL (productos sin código).
+CODIGO_BARRAS = [
+    "ALTER TABLE Productos ADD COLUMN codigo_barras TEXT",
+    """
+        CREATE UNIQUE INDEX IF NOT EXISTS idx_productos_codigo_barras
+        ON Productos(codigo_barras)
+    """,
+]
+
+# Triggers que mantienen VentasDiarias/VentasMensuales (en centavos) al
+# insertar, borrar o modificar ventas
+TRIGGERS_RESUMEN_VENTAS = [
+    """
+        CREATE TRIGGER trg_ventas_resumen_ins AFTER INSERT ON Ventas
+        BEGIN
+            INSERT INTO VentasDiarias (dia, total_centavos, cantidad)
+            VALUES (substr(NEW.fecha, 1, 10), NEW.total_centavos, 1)
+            ON CONFLICT(dia) DO UPDATE SET
+                total_centavos = total_centavos + excluded.total_centavos,
+                cantidad = cantidad + 1;
+            INSERT INTO VentasMensuales (mes, total_centavos, cantidad)
+            VALUES (substr(NEW.fecha, 1, 7), NEW.total_centavos, 1)
+            ON CONFLICT(mes) DO UPDATE SET
+                total_centavos = total_centavos + excluded.total_centavos,
+                cantidad = cantidad + 1;
+        END
+    """,
+    """
+        CREATE TRIGGER trg_ventas_resumen_del AFTER DELETE ON Ventas
+        BEGIN
+            UPDATE VentasDiarias
+            SET total_centavos = total_centavos - OLD.total_centavos, cantidad = cantidad - 1
+            WHERE dia = substr(OLD.fecha, 1, 10);
+            UPDATE VentasMensuales
+            SET total_centavos = total_centavos - OLD.total_centavos, cantidad = cantidad - 1
+            WHERE mes = substr(OLD.fecha, 1, 7);
+        END
+    """,
+    """
+        CREATE TRIGGER trg_ventas_resumen_upd AFTER UPDATE OF fecha, total_centavos ON Ventas
+        BEGIN
+            UPDATE VentasDiarias
+            SET total_centavos = total_centavos - OLD.total_centavos, cantidad = cantidad - 1
+            WHERE dia = substr(OLD.fecha, 1, 10);
+            UPDATE VentasMensuales
+            SET total_centavos = total_centavos - OLD.total_centavos, cantidad = cantidad - 1
+            WHERE mes = substr(OLD.fecha, 1, 7);
+            INSERT INTO VentasDiarias (dia, total_centavos, cantidad)
+            VALUES (substr(NEW.fecha, 1, 10), NEW.total_centavos, 1)
+            ON CONFLICT(dia) DO UPDATE SET
+                total_centavos = total_centavos + excluded.total_centavos,
+                cantidad = cantidad + 1;
+            INSERT INTO VentasMensuales (mes, total_centavos, cantidad)
+            VALUES (substr(NEW.fecha, 1, 7), NEW.total_centavos, 1)
+            ON CONFLICT(mes) DO UPDATE SET
+                total_centavos = total_centavos + excluded.total_centavos,
+                cantidad = cantidad + 1;
+        END
+    """,
+]
+
+# Importes en centavos (enteros) como fuente de verdad: los totales y los
+# resúmenes se suman con aritmética entera, sin error de redondeo. Las
+# columnas REAL se siguen escribiendo (total = total_centavos / 100) para
+# las lecturas y exportaciones existentes.
+IMPORTES_CENTAVOS = [
+    "ALTER TABLE Ventas ADD COLUMN total_centavos INTEGER NOT NULL DEFAULT 0",
+    "ALTER TABLE Ventas ADD COLUMN pagado_centavos INTEGER NOT NULL DEFAULT 0",
+    "ALTER TABLE Ventas ADD COLUMN vuelto_centavos INTEGER NOT NULL DEFAULT 0",
+    "ALTER TABLE DetalleVenta ADD COLUMN precio_centavos INTEGER NOT NULL DEFAULT 0",
+    "ALTER TABLE DetalleVenta ADD COLUMN descuento_centavos INTEGER NOT NULL DEFAULT 0",
+    "ALTER TABLE DetalleVenta ADD COLUMN subtotal_centavos INTEGER NOT NULL DEFAULT 0",
+    """
+        UPDATE Ventas SET
+            total_centavos = CAST(ROUND(total * 100) AS INTEGER),
+            pagado_centavos = CAST(ROUND(IFNULL(monto_pagado, 0) * 100) AS INTEGER),
+            vuelto_centavos = CAST(ROUND(IFNULL(vuelto, 0) * 100) AS INTEGER)
+    """,
+    """
+        UPDATE DetalleVenta SET
+            precio_centavos = CAST(ROUND(IFNULL(precio_unitario, 0) * 100) AS INTEGER),
+            descuento_centavos = CAST(ROUND(IFNULL(descuento, 0) * 100) AS INTEGER),
+            subtotal_centavos = CAST(ROUND(IFNULL(subtotal, 0) * 100) AS INTEGER)
+    """,
+    "DROP INDEX IF EXISTS idx_ventas_fecha_total",
+    "CREATE INDEX IF NOT EXISTS idx_ventas_fecha_centavos ON Ventas(fecha, total_centavos)",
+    # Resúmenes de la migración 3, ahora en centavos
+    "DROP TRIGGER IF EXISTS trg_ventas_resumen_ins",
+    "DROP TRIGGER IF EXISTS trg_ventas_resumen_del",
+    "DROP TRIGGER IF EXISTS trg_ventas_resumen_upd",
+    "DROP TRIGGER IF EXISTS trg_detalle_resumen_ins",
+    "DROP TRIGGER IF EXISTS trg_detalle_resumen_del",
+    "DROP TRIGGER IF EXISTS trg_detalle_resumen_upd",
+    "DROP TABLE IF EXISTS VentasDiarias",
+    "DROP TABLE IF EXISTS VentasMensuales",
+    "DROP TABLE IF EXISTS VentasProducto",
+    """
+        CREATE TABLE VentasDiarias (
+            dia TEXT PRIMARY KEY,
+            total_centavos INTEGER NOT NULL DEFAULT 0,
+            cantidad INTEGER NOT NULL DEFAULT 0
+        )
+    """,
+    """
+        CREATE TABLE VentasMensuales (
+            mes TEXT PRIMARY KEY,
+            total_centavos INTEGER NOT NULL DEFAULT 0,
+            cantidad INTEGER NOT NULL DEFAULT 0
+        )
+    """,
+    """
+        CREATE TABLE VentasProducto (
+            nombre_producto TEXT PRIMARY KEY,
+            cantidad INTEGER NOT NULL DEFAULT 0,
+            total_centavos INTEGER NOT NULL DEFAULT 0
+        )
+    """,
+    "CREATE INDEX IF NOT EXISTS idx_ventas_producto_cantidad ON VentasProducto(cantidad)",
+    *TRIGGERS_RESUMEN_VENTAS,
+    """
+        CREATE TRIGGER trg_detalle_resumen_ins AFTER INSERT ON DetalleVenta
+        BEGIN
+            INSERT INTO VentasProducto (nombre_producto, cantidad, total_centavos)
+            VALUES (NEW.nombre_producto, NEW.cantidad, NEW.subtotal_centavos)
+            ON CONFLICT(nombre_producto) DO UPDATE SET
+                cantidad = cantidad + excluded.cantidad,
+                total_centavos = total_centavos + excluded.total_centavos;
+        END
+    """,
+    """
+        CREATE TRIGGER trg_detalle_resumen_del AFTER DELETE ON DetalleVenta
+        BEGIN
+            UPDATE VentasProducto
+            SET cantidad = cantidad - OLD.cantidad,
+                total_centavos = total_centavos - OLD.subtotal_centavos
+            WHERE nombre_producto = OLD.nombre_producto;
+        END
+    """,
+    """
+        CREATE TRIGGER trg_detalle_resumen_upd
+        AFTER UPDATE OF nombre_producto, cantidad, subtotal_centavos ON DetalleVenta
+        BEGIN
+            UPDATE VentasProducto
+            SET cantidad = cantidad - OLD.cantidad,
+                total_centavos = total_centavos - OLD.subtotal_centavos
+            WHERE nombre_producto = OLD.nombre_producto;
+            INSERT INTO VentasProducto (nombre_producto, cantidad, total_centavos)
+            VALUES (NEW.nombre_producto, NEW.cantidad, NEW.subtotal_centavos)
+            ON CONFLICT(nombre_producto) DO UPDATE SET
+                cantidad = cantidad + excluded.cantidad,
+                total_centavos = total_centavos + excluded.total_centavos;
+        END
+    """,
+    """
+        INSERT INTO VentasDiarias (dia, total_centavos, cantidad)
+        SELECT substr(fecha, 1, 10), SUM(total_centavos), COUNT(*) FROM Ventas
+        GROUP BY substr(fecha, 1, 10)
+    """,
+    """
+        INSERT INTO VentasMensuales (mes, total_centavos, cantidad)
+        SELECT substr(fecha, 1, 7), SUM(total_centavos), COUNT(*) FROM Ventas
+        GROUP BY substr(fecha, 1, 7)
+    """,
+    """
+        INSERT INTO VentasProducto (nombre_producto, cantidad, total_centavos)
+        SELECT nombre_producto, SUM(cantidad), SUM(subtotal_centavos) FROM DetalleVenta
+        GROUP BY nombre_producto
+    """,
+]
+
+# Numeración de ventas: una secuencia sin huecos por prefijo de caja y
+# Ventas reconstruida con clave entera (numero) para que las altas se
+# agreguen al final del árbol. El id de texto (número de factura) se
+# conserva como clave única, referenciada por DetalleVenta.
+NUMERACION_VENTAS = [
+    """
+        CREATE TABLE IF NOT EXISTS SecuenciasFactura (
+            prefijo TEXT PRIMARY KEY,
+            ultimo INTEGER NOT NULL DEFAULT 0
+        )
+    """,
+    """
+        CREATE TABLE Ventas_nueva (
+            numero INTEGER PRIMARY KEY,
+            id TEXT NOT NULL UNIQUE,
+            fecha TEXT NOT NULL,
+            total REAL NOT NULL,
+            monto_pagado REAL,
+            vuelto REAL,
+            usuario_id INTEGER,
+            id_cliente INTEGER,
+            tipo_recibo TEXT,
+            total_centavos INTEGER NOT NULL DEFAULT 0,
+            pagado_centavos INTEGER NOT NULL DEFAULT 0,
+            vuelto_centavos INTEGER NOT NULL DEFAULT 0,
+            FOREIGN KEY (id_cliente) REFERENCES Clientes(id)
+        )
+    """,
+    """
+        INSERT INTO Ventas_nueva (
+            id, fecha, total, monto_pagado, vuelto, usuario_id, id_cliente,
+            tipo_recibo, total_centavos, pagado_centavos, vuelto_centavos
+        )
+        SELECT id, fecha, total, monto_pagado, vuelto, usuario_id, id_cliente,
+               tipo_recibo, total_centavos, pagado_centavos, vuelto_centavos
+        FROM Ventas ORDER BY fecha, id
+    """,
+    # Borrar la tabla elimina también sus índices y triggers
+    "DROP TABLE Ventas",
+    "ALTER TABLE Ventas_nueva RENAME TO Ventas",
+    "CREATE INDEX IF NOT EXISTS idx_ventas_cliente ON Ventas(id_cliente)",
+    "CREATE INDEX IF NOT EXISTS idx_ventas_fecha_centavos ON Ventas(fecha, total_centavos)",
+    *TRIGGERS_RESUMEN_VENTAS,
+    "ANALYZE Ventas",
+]
+
+# Reservas de stock de los carritos abiertos en cada caja. Vencen solas
+# (expira, en UTC como datetime('now')) si la caja no vende ni renueva.
+RESERVAS_STOCK = [
+    """
+        CREATE TABLE IF NOT EXISTS ReservasStock (
+            producto_id INTEGER NOT NULL,
+            caja TEXT NOT NULL,
+            cantidad INTEGER NOT NULL,
+            expira TEXT NOT NULL,
+            PRIMARY KEY (producto_id, caja),
+            FOREIGN KEY (producto_id) REFERENCES Productos(id)
+        )
+    """,
+    "CREATE INDEX IF NOT EXISTS idx_reservas_expira ON ReservasStock(expira)",
+]
+
+# (versión, descripción, pasos). Un paso es una sentencia SQL o una función
+# que recibe el DBManager. Nunca modificar una migración ya publicada:
+# los cambios nuevos se agregan al final con la siguiente versión.
+MIGRATIONS = [
+    (1, "Esquema base", ESQUEMA_BASE),
+    (2, "Índices secundarios", INDICES_SECUNDARIOS),
+    (3, "Resúmenes de ventas", RESUMENES_VENTAS),
+    (4, "Índice cubriente de ventas por fecha", INDICE_VENTAS_FECHA_TOTAL),
+    (5, "Búsqueda de texto completo de clientes", [INDICES_FTS["Clientes"]]),
+    (6, "Búsqueda de texto completo de productos", [INDICES_FTS["Productos"]]),
+    (7, "Versión del catálogo de productos", VERSION_PRODUCTOS),
+    (8, "Código de barras de productos", CODIGO_BARRAS),
+    (9, "Importes en centavos", IMPORTES_CENTAVOS),
+    (10, "Numeración de ventas por caja", NUMERACION_VENTAS),
+    (11, "Reservas de stock", RESERVAS_STOCK),
+]
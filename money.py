@@ -0,0 +1,48 @@
+"""
+money.py - Importes exactos en centavos
+Subtotales, descuentos, impuestos y vuelto se calculan con enteros
+(centavos); Decimal solo se usa para convertir y redondear
+"""
+
+from decimal import ROUND_HALF_UP, Decimal
+
+# Tasa del impuesto sobre ventas que se muestra en los recibos
+ISV = Decimal("0.15")
+
+
+def redondear(valor):
+    """Entero más cercano a un Decimal (las mitades hacia arriba)."""
+    return int(valor.quantize(Decimal(1), rounding=ROUND_HALF_UP))
+
+
+def a_centavos(importe):
+    """Centavos (int) de un importe en float, str o Decimal."""
+    if importe is None or importe == "":
+        return 0
+    # str() evita arrastrar el error binario del float (0.1 -> 0.1000000000000000055)
+    return redondear(Decimal(str(importe)) * 100)
+
+
+def a_decimal(centavos):
+    """Importe Decimal con dos decimales a partir de centavos."""
+    return Decimal(int(centavos)).scaleb(-2)
+
+
+def aplicar_tasa(centavos, tasa):
+    """Centavos de aplicar una tasa (0.15 = 15 %) a un importe en centavos."""
+    return redondear(Decimal(centavos) * Decimal(str(tasa)))
+
+
+def importes_linea(precio_unitario, cantidad, descuento_porcentaje=0):
+    """(bruto, descuento, subtotal) en centavos de una línea de venta.
+
+    El descuento se redondea una vez por línea, sobre el bruto de la línea.
+    """
+    bruto = a_centavos(precio_unitario) * int(cantidad)
+    descuento = aplicar_tasa(bruto, descuento_porcentaje or 0)
+    return bruto, descuento, bruto - descuento
+
+
+def importe_en_palabras(centavos):
+    """(parte entera, centavos 0-99) de un importe, para el total en letras."""
+    return divmod(int(centavos), 100)
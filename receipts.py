@@ -0,0 +1,308 @@
+"""
+receipts.py - Plantillas de recibos y facturas
+Una plantilla ({{CAMPO}} y <!-- ITEMS_PLACEHOLDER -->) se compila una sola
+vez en texto fijo y campos, y se llena con un único join; el encabezado de
+la empresa y el resumen de impuestos son los mismos para ticket, carta y
+ventas mayoristas
+"""
+
+import re
+from functools import lru_cache
+
+from cart import totales_linea
+from money import ISV, a_decimal, aplicar_tasa
+
+# Datos fiscales que encabezan todos los comprobantes
+EMPRESA = {
+    "nombre": "PODEGA Y COMERCIAL RIVERA",
+    "rtn": "12011972000081",
+    "tel": "2774-1192 / 9967-7300",
+    "direccion": "Bo. La Mercedes, Colonia la Ermita, 1ra Calle, 14-62, frente a Farmacia Santa, La Paz, Honduras",
+    "email": "freddyrivera2015@gmail.com",
+}
+
+# {{CAMPO}} o el marcador de ítems de la plantilla configurable
+_MARCAS = re.compile(r"\{\{(\w+)\}\}|<!-- ITEMS_PLACEHOLDER -->")
+
+
+class Plantilla:
+    """Plantilla compilada: texto fijo intercalado con campos.
+
+    render(campos) pone str(campos["CAMPO"]) en cada {{CAMPO}} y
+    campos["ITEMS"] en <!-- ITEMS_PLACEHOLDER -->; un campo que no viene
+    queda escrito tal cual en el resultado.
+    """
+
+    __slots__ = ("texto", "_fijos", "_campos")
+
+    def __init__(self, texto):
+        self.texto = texto
+        fijos, campos = [], []
+        inicio = 0
+        for marca in _MARCAS.finditer(texto):
+            fijos.append(texto[inicio : marca.start()])
+            campos.append((marca.group(1) or "ITEMS", marca.group(0)))
+            inicio = marca.end()
+        fijos.append(texto[inicio:])
+        self._fijos = tuple(fijos)
+        self._campos = tuple(campos)
+
+    @property
+    def campos(self):
+        """Nombres de los campos que usa la plantilla."""
+        return {nombre for nombre, _ in self._campos}
+
+    def render(self, campos):
+        partes = [self._fijos[0]]
+        for (nombre, marca), fijo in zip(self._campos, self._fijos[1:]):
+            valor = campos.get(nombre)
+            partes.append(marca if valor is None else str(valor))
+            partes.append(fijo)
+        return "".join(partes)
+
+    def render_items(self, filas):
+        """Concatena la plantilla llenada con cada fila (dicts de campos)."""
+        return "".join([self.render(fila) for fila in filas])
+
+
+@lru_cache(maxsize=16)
+def compilar(texto):
+    """Plantilla compilada de un texto; el mismo texto no se vuelve a analizar."""
+    return Plantilla(texto)
+
+
+# -------------------- Datos comunes --------------------
+def numero_factura(venta_id):
+    """Número de factura impreso para un id de venta.
+
+    El prefijo de la caja es el punto de emisión (C002-00000042 ->
+    0000-0002-00000042), así dos cajas nunca imprimen el mismo número. Un
+    prefijo fiscal configurado a mano (que no sea C<número>) se imprime tal
+    cual delante del correlativo.
+    """
+    prefijo, _, correlativo = str(venta_id).rpartition("-")
+    if not prefijo:
+        return f"0000-0001-{correlativo}"  # ventas anteriores a la numeración por caja
+    if re.fullmatch(r"C\d+", prefijo):
+        return f"0000-{prefijo[1:].zfill(4)}-{correlativo}"
+    return f"{prefijo}-{correlativo}"
+
+
+def lineas_venta(lineas):
+    """[(prod_id, linea, subtotal Decimal)] y el gravado en centavos, en una pasada."""
+    filas = []
+    gravado_centavos = 0
+    for prod_id, linea in lineas.items():
+        subtotal_centavos = totales_linea(linea)[2]
+        gravado_centavos += subtotal_centavos
+        filas.append((prod_id, linea, a_decimal(subtotal_centavos)))
+    return filas, gravado_centavos
+
+
+def impuestos(gravado_centavos):
+    """(subtotal gravado, impuesto, total con impuesto) en Decimal."""
+    impuesto_centavos = aplicar_tasa(gravado_centavos, ISV)
+    return (
+        a_decimal(gravado_centavos),
+        a_decimal(impuesto_centavos),
+        a_decimal(gravado_centavos + impuesto_centavos),
+    )
+
+
+# -------------------- Texto (ticket, carta, mayorista) --------------------
+def encabezado_texto(ancho, venta_id):
+    """Líneas del encabezado de la empresa y de la factura, centradas en ancho."""
+    return [
+        "=" * ancho,
+        f"R.T.N.: {EMPRESA['rtn']}".center(ancho),
+        EMPRESA["nombre"].center(ancho),
+        f"TEL.: {EMPRESA['tel']}".center(ancho),
+        f"DIRECCIÓN: {EMPRESA['direccion']}".center(ancho),
+        f"EMAIL: {EMPRESA['email']}".center(ancho),
+        "=" * ancho,
+        "",
+        "FACTURA".center(ancho),
+        f"No. {numero_factura(venta_id)}".center(ancho),
+        "Página 1 de 1".center(ancho),
+        "=" * ancho,
+        "",
+    ]
+
+
+def resumen_impuestos_texto(gravado_centavos, ancho_concepto, ancho_total):
+    """Líneas del cuadro de impuestos (el importe ocupa ancho_total - 2)."""
+    subtotal, impuesto, total = impuestos(gravado_centavos)
+    ancho = ancho_total - 2
+    separador = "-" * (ancho_concepto + ancho_total)
+    filas = [
+        ("Sub Total", subtotal),
+        ("Exento", 0.00),
+        ("Gravado 15%", subtotal),
+        ("Gravado 18%", 0.00),
+        ("Impuesto 15%", impuesto),
+        ("Impuesto 18%", 0.00),
+    ]
+    lines = [f"{'Concepto':<{ancho_concepto}}{'Total':>{ancho_total}}", separador]
+    lines.extend(
+        f"{concepto:<{ancho_concepto}}L{importe:>{ancho}.2f}"
+        for concepto, importe in filas
+    )
+    lines.append(separador)
+    lines.append(f"{'TOTAL:':<{ancho_concepto}}L{total:>{ancho}.2f}")
+    return lines
+
+
+# -------------------- HTML --------------------
+ENCABEZADO_HTML = f"""<div>{EMPRESA["nombre"]}</div>
+                <div>R.T.N.: {EMPRESA["rtn"]}</div>
+                <div>Tel: {EMPRESA["tel"]}</div>
+                <div>{EMPRESA["direccion"]}</div>
+                <div>Email: {EMPRESA["email"]}</div>"""
+
+
+def cliente_html(cliente):
+    """Bloque DATOS DEL CLIENTE de la factura HTML ("" sin cliente)."""
+    if not cliente:
+        return ""
+    partes = [
+        """
+            <div style="margin: 15px 0; padding: 8px; border: 1px solid #ddd; background: #f9f9f9;">
+                <div style="font-weight: bold; margin-bottom: 5px;">DATOS DEL CLIENTE:</div>
+                <div><strong>Nombre:</strong> """,
+        f"{cliente['nombre']} {cliente['apellido']}</div>",
+    ]
+    if cliente["dni"]:
+        partes.append(f"<div><strong>DNI:</strong> {cliente['dni']}</div>")
+    if cliente["telefono"]:
+        partes.append(f"<div><strong>Teléfono:</strong> {cliente['telefono']}</div>")
+    if cliente["direccion"]:
+        partes.append(f"<div><strong>Dirección:</strong> {cliente['direccion']}</div>")
+    partes.append(
+        """
+            </div>"""
+    )
+    return "".join(partes)
+
+
+# Fila de producto de la factura HTML
+FILA_FACTURA_HTML = Plantilla(
+    """
+            <tr>
+                <td>{{CANT}}</td>
+                <td>{{CODIGO}}</td>
+                <td>{{PRODUCTO}}</td>
+                <td>L {{PRECIO}}</td>
+                <td>L {{SUBTOTAL}}</td>
+            </tr>
+            """
+)
+
+# Fila de producto para <!-- ITEMS_PLACEHOLDER --> de la plantilla configurable
+FILA_RECIBO_HTML = Plantilla(
+    """
+            <div class="item"><span>{{PRODUCTO}}</span><span>{{CANT}} / ${{SUBTOTAL}}</span></div>"""
+)
+
+# Factura HTML del punto de venta (ticket o carta según ANCHO y FUENTE)
+FACTURA_HTML = Plantilla(
+    """
+        <html>
+        <head>
+            <meta charset="utf-8">
+            <title>Recibo de Venta {{ID_VENTA}}</title>
+            <style>
+                body {
+                    width: {{ANCHO}};
+                    font-family: 'Courier New', Courier, monospace;
+                    font-size: {{FUENTE}};
+                    margin: 0 auto;
+                    background: #fff;
+                    color: #222;
+                }
+                .header, .footer {
+                    text-align: center;
+                    margin-bottom: 10px;
+                }
+                .title {
+                    font-size: 1.2em;
+                    font-weight: bold;
+                    color: #dc3545;
+                }
+                table {
+                    width: 100%;
+                    border-collapse: collapse;
+                    margin-bottom: 10px;
+                }
+                th, td {
+                    border-bottom: 1px solid #ddd;
+                    padding: 4px 6px;
+                    text-align: left;
+                }
+                th {
+                    background: #f8f8f8;
+                }
+                .totals td {
+                    font-weight: bold;
+                }
+                .observaciones {
+                    margin-top: 10px;
+                    font-size: 0.95em;
+                    color: #555;
+                }
+            </style>
+        </head>
+        <body>
+            <div class="header">
+                {{ENCABEZADO}}
+                <hr>
+                <div class="title">FACTURA</div>
+                <div>No. {{NUMERO}}</div>
+                <div>Fecha: {{FECHA}}</div>
+            </div>{{CLIENTE}}
+            <table>
+                <tr>
+                    <th>Cant.</th>
+                    <th>Código</th>
+                    <th>Producto</th>
+                    <th>P.Unit</th>
+                    <th>Subtotal</th>
+                </tr>
+                {{ITEMS}}
+            </table>
+            <table>
+                <tr class="totals"><td colspan="4" style="text-align:right;">TOTAL:</td><td>L {{TOTAL}}</td></tr>
+                <tr><td colspan="5">{{MONTO_LETRAS}}</td></tr>
+            </table>
+            <table>
+                <tr><td>Orden de Compra Exenta:</td></tr>
+                <tr><td>Constancia Registro Exento:</td></tr>
+                <tr><td>Desc. y Rebajas Otorgados:</td></tr>
+            </table>
+            <table>
+                <tr><th>Concepto</th><th>Total</th></tr>
+                <tr><td>Sub Total</td><td>L {{SUBTOTAL}}</td></tr>
+                <tr><td>Exento</td><td>L 0.00</td></tr>
+                <tr><td>Gravado 15%</td><td>L {{SUBTOTAL}}</td></tr>
+                <tr><td>Gravado 18%</td><td>L 0.00</td></tr>
+                <tr><td>Impuesto 15%</td><td>L {{IMPUESTO}}</td></tr>
+                <tr><td>Impuesto 18%</td><td>L 0.00</td></tr>
+                <tr class="totals"><td>TOTAL:</td><td>L {{TOTAL_IMPUESTO}}</td></tr>
+            </table>
+            <table>
+                <tr><td>Monto Recibido:</td><td>L {{MONTO_PAGADO}}</td></tr>
+                <tr><td>Vuelto:</td><td>L {{VUELTO}}</td></tr>
+            </table>
+            <div class="observaciones">
+                Observaciones:<br>
+                <br>
+            </div>
+            <div class="footer">
+                <hr>
+                Original - Cliente
+                <br>
+                Gracias por su compra
+            </div>
+        </body>
+        </html>
+        """
+)
@@ -0,0 +1,17 @@
+import os
+import sys
+
+import pytest
+
+# Los módulos del ERP están en la raíz del repositorio
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from database import DBManager  # noqa: E402
+
+
+@pytest.fixture
+def db(tmp_path):
+    """Base de datos nueva con todas las migraciones aplicadas."""
+    manager = DBManager(str(tmp_path / "erp.db"), interactive=False)
+    yield manager
+    manager.close()
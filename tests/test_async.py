@@ -0,0 +1,30 @@
+"""Trabajos en segundo plano de DBManager (run_async / process_async_results)."""
+
+import time
+
+
+def esperar_resultados(db, esperados, salida):
+    limite = time.monotonic() + 5
+    while len(salida) < esperados and time.monotonic() < limite:
+        db.process_async_results()
+        time.sleep(0.01)
+
+
+def test_keys_de_trabajos_terminados_no_se_acumulan(db):
+    salida = []
+    for pagina in range(20):
+        db.run_async(lambda p=pagina: p, salida.append, key=f"pagina-{pagina}")
+    esperar_resultados(db, 20, salida)
+    assert sorted(salida) == list(range(20))
+    assert db._async_generation == {}
+
+
+def test_trabajo_cancelado_no_entrega_resultado(db):
+    salida = []
+    db.run_async(lambda: time.sleep(0.1) or "viejo", salida.append, key="k")
+    db.cancel_async("k")
+    db.run_async(lambda: "nuevo", salida.append, key="k")
+    time.sleep(0.2)
+    esperar_resultados(db, 1, salida)
+    assert salida == ["nuevo"]
+    assert db._async_generation == {}
@@ -0,0 +1,35 @@
+"""Catálogo de productos en memoria (catalog.ProductCatalog)."""
+
+import threading
+import time
+
+
+def agregar_producto(db, nombre):
+    db.execute(
+        "INSERT INTO Productos (nombre, precio, stock) VALUES (?, 10, 5)", (nombre,)
+    )
+
+
+def test_busqueda_con_digitos_no_ascii(db):
+    agregar_producto(db, "Tubo 2 pulgadas")
+    nombres = [p.nombre for p in db.catalog.search("²")]
+    assert "Tubo 2 pulgadas" in nombres
+
+
+def test_recarga_no_bloquea_consultas(db):
+    catalogo = db.catalog
+    catalogo.ensure_fresh()
+    cargar = catalogo._load
+    catalogo._load = lambda: time.sleep(0.5) or cargar()
+    agregar_producto(db, "Producto nuevo")
+
+    recarga = threading.Thread(target=catalogo.ensure_fresh, kwargs={"force": True})
+    recarga.start()
+    time.sleep(0.05)
+    inicio = time.monotonic()
+    assert catalogo.get(1) is not None
+    assert catalogo.search("nuevo") == []  # aún con los índices anteriores
+    assert time.monotonic() - inicio < 0.25
+    recarga.join()
+
+    assert [p.nombre for p in catalogo.search("nuevo")] == ["Producto nuevo"]
@@ -0,0 +1,66 @@
+"""Línea de comandos (erp.py)."""
+
+import pytest
+
+import erp
+from database import DBManager
+
+
+@pytest.fixture
+def ruta_db(tmp_path):
+    ruta = str(tmp_path / "erp.db")
+    DBManager(ruta, interactive=False).close()
+    return ruta
+
+
+def consultar(ruta, sql, params=()):
+    db = DBManager(ruta, interactive=False)
+    try:
+        return db.query(sql, params)
+    finally:
+        db.close()
+
+
+@pytest.mark.parametrize("item", ["1:-5", "1:0", "1:x", "1:²", ":2"])
+def test_venta_rechaza_cantidad_invalida(ruta_db, item, capsys):
+    stock = consultar(ruta_db, "SELECT stock FROM Productos WHERE id = 1")
+    assert erp.main(["--db", ruta_db, "venta", item, "--pagado", "0"]) == 1
+    assert "Error:" in capsys.readouterr().err
+    assert consultar(ruta_db, "SELECT COUNT(*) FROM Ventas") == [(0,)]
+    assert consultar(ruta_db, "SELECT stock FROM Productos WHERE id = 1") == stock
+
+
+def test_venta_usa_su_propia_caja(ruta_db, capsys):
+    db = DBManager(ruta_db, interactive=False)
+    stock = db.query("SELECT stock FROM Productos WHERE id = 1")[0][0]
+    # Un carrito abierto en la caja de este equipo reserva todo menos 1
+    assert db.reserve_stock(1, stock - 1)[0]
+    db.close()
+
+    assert erp.main(["--db", ruta_db, "venta", "1:2"]) == 1
+    assert "Stock insuficiente" in capsys.readouterr().err
+    assert erp.main(["--db", ruta_db, "venta", "1"]) == 0
+
+    reservas = consultar(ruta_db, "SELECT caja, cantidad FROM ReservasStock")
+    assert reservas == [(DBManager.terminal_name(), stock - 1)]
+    ventas = consultar(ruta_db, "SELECT id FROM Ventas")
+    prefijo = consultar(
+        ruta_db, "SELECT valor FROM Configuracion WHERE clave = 'caja_prefijo:CLI'"
+    )
+    assert ventas == [(f"{prefijo[0][0]}-00000001",)]
+
+
+@pytest.mark.parametrize("pagado", ["abc", "nan", "-5", "1e400"])
+def test_venta_rechaza_monto_pagado_invalido(ruta_db, pagado, capsys):
+    with pytest.raises(SystemExit) as salida:
+        erp.main(["--db", ruta_db, "venta", "1", "--pagado", pagado])
+    assert salida.value.code == 2
+    assert "--pagado: monto" in capsys.readouterr().err
+    assert consultar(ruta_db, "SELECT COUNT(*) FROM Ventas") == [(0,)]
+
+
+def test_venta_con_monto_pagado(ruta_db, capsys):
+    precio = consultar(ruta_db, "SELECT precio FROM Productos WHERE id = 1")[0][0]
+    pagado = f"{precio + 0.5:.2f}"
+    assert erp.main(["--db", ruta_db, "venta", "1", "--pagado", pagado]) == 0
+    assert "vuelto 0.50" in capsys.readouterr().out
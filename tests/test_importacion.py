@@ -0,0 +1,35 @@
+"""Importación de clientes desde CSV (FileManager.import_clients)."""
+
+import threading
+
+from file_manager import FileManager
+
+
+def escribir_csv(ruta, filas):
+    lineas = ["Nombre,Apellido,DNI,Teléfono,Email,Dirección"]
+    lineas += [",".join(fila) for fila in filas]
+    ruta.write_text("\n".join(lineas) + "\n", encoding="utf-8")
+
+
+def test_importa_en_bloques_sin_retener_la_escritura(db, tmp_path):
+    archivo = tmp_path / "clientes.csv"
+    escribir_csv(
+        archivo,
+        [(f"Nombre{i}", f"Apellido{i}", f"{i:013d}", "", "", "") for i in range(25)],
+    )
+    escrituras = []
+
+    def progreso(leidas):
+        # Otro hilo (la interfaz, otra caja) puede escribir entre bloques
+        hilo = threading.Thread(
+            target=lambda: db.set_config(f"prueba_{leidas}", str(leidas))
+        )
+        hilo.start()
+        hilo.join(timeout=2)
+        escrituras.append(not hilo.is_alive())
+
+    resumen = FileManager(db).import_clients(str(archivo), progreso, chunk_size=10)
+
+    assert resumen == {"insertados": 25, "actualizados": 0, "rechazados": 0}
+    assert escrituras == [True, True, True]
+    assert db.query("SELECT COUNT(*) FROM Clientes WHERE dni LIKE '00%'")[0][0] == 25
@@ -0,0 +1,44 @@
+"""Migraciones que dependen de extensiones opcionales de SQLite."""
+
+import logging
+
+import migrations
+from database import DBManager
+
+
+def test_migraciones_se_informan_por_logging(tmp_path, caplog, capsys):
+    with caplog.at_level(logging.INFO, logger="database"):
+        DBManager(str(tmp_path / "erp.db"), interactive=False).close()
+    assert capsys.readouterr().out == ""
+    aplicadas = [r.getMessage() for r in caplog.records]
+    assert len(aplicadas) == len(migrations.MIGRATIONS)
+    assert aplicadas[0] == "Migración 1 aplicada: Esquema base"
+
+
+def test_indice_fts_se_crea_al_iniciar_si_falta(tmp_path, monkeypatch):
+    ruta = str(tmp_path / "erp.db")
+    db = DBManager(ruta, interactive=False)
+    # Base migrada con un SQLite sin FTS5: la migración 6 quedó sin índice
+    db.execute("DROP TABLE ProductosFTS")
+    for sufijo in ("ins", "del", "upd"):
+        db.execute(f"DROP TRIGGER trg_productos_fts_{sufijo}")
+    db.execute(
+        "INSERT INTO Productos (nombre, descripcion, precio, stock) "
+        "VALUES ('Café molido', 'Bolsa de 500 g', 50, 10)"
+    )
+    db.close()
+
+    # Sigue sin FTS5: se informa y la búsqueda usa LIKE
+    monkeypatch.setitem(migrations.INDICES_FTS, "Productos", lambda db: False)
+    db = DBManager(ruta, interactive=False)
+    assert db.fts_unavailable == ["Productos"]
+    assert not db.table_exists("ProductosFTS")
+    db.close()
+
+    # Con FTS5 disponible el siguiente inicio crea el índice e indexa lo existente
+    monkeypatch.undo()
+    db = DBManager(ruta, interactive=False)
+    assert db.fts_unavailable == []
+    assert db.table_exists("ProductosFTS")
+    assert [fila[1] for fila in db.search_products("cafe")] == ["Café molido"]
+    db.close()
@@ -0,0 +1,67 @@
+"""Importes en centavos: money.py, el carrito y lo que guarda register_sale."""
+
+from decimal import Decimal
+
+from cart import CartModel, detalles_venta, totales_linea
+from money import ISV, a_centavos, a_decimal, aplicar_tasa, importes_linea
+from receipts import impuestos
+
+
+def test_conversiones_sin_error_binario():
+    assert a_centavos(0.1 + 0.2) == 30
+    assert a_centavos("19.99") == 1999
+    assert a_centavos(Decimal("2.675")) == 268  # mitad hacia arriba
+    assert a_centavos(None) == a_centavos("") == 0
+    assert a_decimal(1999) == Decimal("19.99")
+
+
+def test_linea_con_descuento_e_impuesto():
+    # 3 x 19.99 con 10 % de descuento: el descuento se redondea una vez por línea
+    assert importes_linea(19.99, 3, 0.10) == (5997, 600, 5397)
+    assert aplicar_tasa(5397, ISV) == 810  # 809.55
+    assert impuestos(5397) == (Decimal("53.97"), Decimal("8.10"), Decimal("62.07"))
+
+
+def test_totales_del_carrito_coinciden_con_recalcular():
+    cart = CartModel()
+    cart.add(1, 3, nombre="Monitor", precio_unitario=19.99, descuento_porcentaje=0.10)
+    cart.add(2, 1, nombre="Teclado", precio_unitario=0.05)
+    cart.add(3, 7, nombre="Cable", precio_unitario=1.15, descuento_porcentaje=0.15)
+    cart.add(2, 2)
+    cart.update(3, cantidad=2)
+    cart.update(1, descuento_porcentaje=0.0)
+    cart.remove(3)
+    cart.add(4, 1, nombre="Mouse", precio_unitario=12.345, descuento_porcentaje=0.5)
+
+    brutos, descuentos, subtotales = zip(
+        *(totales_linea(linea) for linea in cart.values())
+    )
+    assert cart.bruto_centavos == sum(brutos)
+    assert cart.descuentos_centavos == sum(descuentos)
+    assert cart.total_centavos == sum(subtotales)
+    assert cart.con_descuento == sum(1 for d in descuentos if d)
+
+
+def test_register_sale_guarda_centavos_y_copias_real(db):
+    cart = CartModel()
+    cart.add(1, 3, nombre="Monitor", precio_unitario=19.99, descuento_porcentaje=0.10)
+    cart.add(2, 1, nombre="Teclado", precio_unitario=0.10)
+    pagado = Decimal("100.00")
+    vuelto = pagado - cart.total
+    venta = (None, "2025-01-15 10:00:00", cart.total, pagado, vuelto, 1, None, "HTML")
+    venta_id = db.register_sale(venta, detalles_venta(cart))
+
+    assert db.query(
+        "SELECT total, monto_pagado, vuelto, total_centavos, pagado_centavos,"
+        " vuelto_centavos FROM Ventas WHERE id = ?",
+        (venta_id,),
+    ) == [(54.07, 100.0, 45.93, 5407, 10000, 4593)]
+    assert db.query(
+        "SELECT producto_id, cantidad, precio_unitario, descuento, subtotal,"
+        " precio_centavos, descuento_centavos, subtotal_centavos"
+        " FROM DetalleVenta WHERE venta_id = ? ORDER BY producto_id",
+        (venta_id,),
+    ) == [
+        (1, 3, 19.99, 6.0, 53.97, 1999, 600, 5397),
+        (2, 1, 0.1, 0.0, 0.1, 10, 0, 10),
+    ]
@@ -0,0 +1,13 @@
+"""Las consultas frecuentes deben resolverse con un índice, no recorriendo la tabla."""
+
+import re
+
+from database import DBManager
+
+USA_INDICE = re.compile(r"^SEARCH \w+ USING (COVERING )?INDEX ")
+
+
+def test_ventas_por_rango_usa_indice(db):
+    pasos = db.explain(DBManager.VENTAS_RANGO_SQL, ("2000-01-01", "2000-02-01"))
+    assert any(USA_INDICE.match(paso) for paso in pasos), pasos
+    assert not any(paso.startswith("SCAN") for paso in pasos), pasos
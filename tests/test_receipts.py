@@ -0,0 +1,54 @@
+"""Comprobantes: numeración impresa y plantillas (receipts.py)."""
+
+from receipts import Plantilla, compilar, numero_factura
+
+
+def test_numero_factura_distinto_por_caja():
+    assert numero_factura("C001-00000001") == "0000-0001-00000001"
+    assert numero_factura("C002-00000001") == "0000-0002-00000001"
+    assert numero_factura("C001-00000001") != numero_factura("C002-00000001")
+
+
+def test_numero_factura_prefijo_fiscal_y_ventas_antiguas():
+    assert numero_factura("001-002-01-00000042") == "001-002-01-00000042"
+    assert numero_factura("42") == "0000-0001-42"
+
+
+def test_dos_cajas_imprimen_numeros_distintos(db):
+    detalle = [(1, "Monitor", 1, 10, 0, 10)]
+    venta = (None, "2025-01-15 10:00:00", 10, 10, 0, 1, None, "HTML")
+    impresos = {
+        numero_factura(db.register_sale(venta, detalle, caja=caja))
+        for caja in ("caja-1", "caja-2")
+    }
+    assert len(impresos) == 2
+
+
+def test_plantilla_reemplaza_campos_e_items():
+    plantilla = compilar("<h1>{{TITULO}}</h1><!-- ITEMS_PLACEHOLDER -->{{TOTAL}}")
+    assert plantilla.campos == {"TITULO", "ITEMS", "TOTAL"}
+    assert (
+        plantilla.render({"TITULO": "Recibo", "ITEMS": "<li>x</li>", "TOTAL": 12.5})
+        == "<h1>Recibo</h1><li>x</li>12.5"
+    )
+
+
+def test_plantilla_deja_los_campos_que_faltan():
+    plantilla = compilar("{{A}}-{{B}}-<!-- ITEMS_PLACEHOLDER -->")
+    assert plantilla.render({"A": 0}) == "0-{{B}}-<!-- ITEMS_PLACEHOLDER -->"
+    assert plantilla.render({"A": None, "B": ""}) == "{{A}}--<!-- ITEMS_PLACEHOLDER -->"
+
+
+def test_plantilla_sin_campos_y_filas():
+    assert compilar("sin campos").render({"X": 1}) == "sin campos"
+    fila = Plantilla("<tr><td>{{CANT}}</td></tr>")
+    assert fila.render_items([{"CANT": 1}, {"CANT": 2}]) == (
+        "<tr><td>1</td></tr><tr><td>2</td></tr>"
+    )
+
+
+def test_compilar_reutiliza_la_plantilla():
+    texto = "Hola {{NOMBRE}}"
+    assert compilar(texto) is compilar(texto)
+    assert compilar(texto).render({"NOMBRE": "Ana"}) == "Hola Ana"
+    assert compilar(texto).render({"NOMBRE": "Luis"}) == "Hola Luis"
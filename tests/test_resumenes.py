@@ -0,0 +1,73 @@
+"""Tablas de resumen de ventas mantenidas por triggers (migraciones 3 y 9).
+
+El dashboard y el comando reporte leen solo estas tablas: deben coincidir
+siempre con sumar Ventas y DetalleVenta.
+"""
+
+RESUMENES = {
+    "VentasDiarias": (
+        "SELECT dia, total_centavos, cantidad FROM VentasDiarias",
+        "SELECT substr(fecha, 1, 10), SUM(total_centavos), COUNT(*) FROM Ventas"
+        " GROUP BY 1",
+    ),
+    "VentasMensuales": (
+        "SELECT mes, total_centavos, cantidad FROM VentasMensuales",
+        "SELECT substr(fecha, 1, 7), SUM(total_centavos), COUNT(*) FROM Ventas"
+        " GROUP BY 1",
+    ),
+    "VentasProducto": (
+        "SELECT nombre_producto, total_centavos, cantidad FROM VentasProducto",
+        "SELECT nombre_producto, SUM(subtotal_centavos), SUM(cantidad)"
+        " FROM DetalleVenta GROUP BY 1",
+    ),
+}
+
+
+def comprobar_resumenes(db):
+    for tabla, (resumen, recalculo) in RESUMENES.items():
+        # Un grupo que se quedó sin ventas queda en cero en el resumen
+        guardado = {fila[0]: fila[1:] for fila in db.query(resumen) if fila[2]}
+        esperado = {fila[0]: fila[1:] for fila in db.query(recalculo)}
+        assert guardado == esperado, tabla
+
+
+def vender(db, fecha, lineas):
+    """Registra una venta de [(producto_id, nombre, cantidad, precio)]."""
+    detalles = [
+        (pid, nombre, cant, precio, 0, cant * precio)
+        for pid, nombre, cant, precio in lineas
+    ]
+    total = sum(d[5] for d in detalles)
+    return db.register_sale((None, fecha, total, total, 0, 1, None, "HTML"), detalles)
+
+
+def test_resumenes_siguen_altas_cambios_y_bajas(db):
+    a = vender(db, "2025-01-31 09:00:00", [(1, "Monitor", 1, 150.25)])
+    b = vender(
+        db, "2025-01-31 18:30:00", [(1, "Monitor", 2, 150.25), (2, "Teclado", 1, 9.99)]
+    )
+    c = vender(db, "2025-02-01 08:00:00", [(2, "Teclado", 3, 9.99)])
+    comprobar_resumenes(db)
+
+    # Cambiar de día (y de mes) y de importe una venta
+    db.execute(
+        "UPDATE Ventas SET fecha = '2025-02-01 12:00:00', total_centavos = 1000"
+        " WHERE id = ?",
+        (a,),
+    )
+    # Corregir una línea: otra cantidad y otro producto
+    db.execute(
+        "UPDATE DetalleVenta SET cantidad = 1, subtotal_centavos = 999,"
+        " nombre_producto = 'Teclado' WHERE venta_id = ? AND producto_id = 1",
+        (b,),
+    )
+    comprobar_resumenes(db)
+
+    # Anular una venta completa
+    db.execute("DELETE FROM DetalleVenta WHERE venta_id = ?", (c,))
+    db.execute("DELETE FROM Ventas WHERE id = ?", (c,))
+    comprobar_resumenes(db)
+
+    assert db.query(
+        "SELECT total_centavos, cantidad FROM VentasMensuales WHERE mes = '2025-02'"
+    ) == [(1000, 1)]
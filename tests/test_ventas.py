@@ -0,0 +1,61 @@
+"""Registro de ventas y reservas de stock (DBManager.register_sale)."""
+
+import pytest
+
+from database import InsufficientStockError
+
+
+def venta(total):
+    return (None, "2025-01-15 10:00:00", total, total, 0, 1, None, "HTML")
+
+
+def stock(db, producto_id):
+    return db.query("SELECT stock FROM Productos WHERE id = ?", (producto_id,))[0][0]
+
+
+@pytest.mark.parametrize("cantidad", [0, -5, 1.5, "2", True])
+def test_cantidad_invalida_no_registra_nada(db, cantidad):
+    antes = stock(db, 1)
+    with pytest.raises(ValueError):
+        db.register_sale(venta(-100), [(1, "Monitor", cantidad, 20, 0, -100)])
+    assert stock(db, 1) == antes
+    assert db.query("SELECT COUNT(*) FROM Ventas")[0][0] == 0
+
+
+@pytest.mark.parametrize("cantidad", [0, -1])
+def test_reserva_con_cantidad_invalida(db, cantidad):
+    with pytest.raises(ValueError):
+        db.reserve_stock(1, cantidad)
+
+
+def test_venta_descuenta_stock(db):
+    antes = stock(db, 1)
+    venta_id = db.register_sale(venta(40), [(1, "Monitor", 2, 20, 0, 40)])
+    assert venta_id.endswith("-00000001")
+    assert stock(db, 1) == antes - 2
+
+
+def test_stock_insuficiente(db):
+    antes = stock(db, 1)
+    with pytest.raises(InsufficientStockError):
+        db.register_sale(venta(20), [(1, "Monitor", antes + 1, 20, 0, 20)])
+    assert stock(db, 1) == antes
+
+
+def test_reservas_separadas_por_pantalla(db):
+    disponible = stock(db, 1)
+    assert db.reserve_stock(1, disponible - 2, caja="caja-POS")[0]
+    # La pantalla mayorista del mismo equipo no puede tomar lo del POS
+    assert db.reserve_stock(1, 3, caja="caja-MAY") == (False, 2)
+    assert db.reserve_stock(1, 2, caja="caja-MAY")[0]
+
+    db.release_stock(caja="caja-POS")
+    assert db.query("SELECT caja, cantidad FROM ReservasStock") == [("caja-MAY", 2)]
+
+    # El POS vende sin contar su propia reserva, pero sí la mayorista
+    with pytest.raises(InsufficientStockError):
+        db.register_sale(
+            venta(20), [(1, "Monitor", disponible - 1, 20, 0, 20)], reservas="caja-POS"
+        )
+    db.register_sale(venta(20), [(1, "Monitor", 2, 20, 0, 40)], reservas="caja-MAY")
+    assert db.query("SELECT COUNT(*) FROM ReservasStock") == [(0,)]